@@ -1,16 +1,44 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+from bs4.dammit import EntitySubstitution, UnicodeDammit
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # pages are parsed with html.parser instead
+    lxml = None
 import json
 import csv
+import io
+import codecs
+import gzip
 import os
+import glob
 import random
 import re
 import time
+import heapq
+import math
+import hashlib
 import logging
 import argparse
-from collections import defaultdict, Counter
-from urllib.parse import urljoin, urlparse, parse_qs
-from datetime import datetime
+import asyncio
+import sqlite3
+import pickle
+import signal
+import shlex
+import subprocess
+import sys
+import threading
+from array import array
+from collections import defaultdict, deque, Counter, OrderedDict
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit, parse_qs
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
+from xml.etree import ElementTree
 
 # Configure logging
 logging.basicConfig(
@@ -53,13 +81,96 @@ USER_AGENTS = [
     "Mozilla/5.0 (Linux; Android 11; SM-G991B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.120 Mobile Safari/537.36"
 ]
 
+# Content codings we can decode. brotli and zstd are only advertised when
+# the optional decoder that urllib3 relies on is installed.
+ACCEPT_ENCODINGS = ['gzip', 'deflate']
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODINGS.append('br')
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODINGS.append('br')
+    except ImportError:
+        pass
+try:
+    import zstandard  # noqa: F401
+    ACCEPT_ENCODINGS.append('zstd')
+except ImportError:
+    pass
+
+MAX_RETRY_AFTER = 600
+MAX_RATE_LIMIT_RETRIES = 5
+
+def parse_retry_after(value):
+    """Return the seconds a Retry-After header asks us to wait, or None.
+
+    Accepts both delay-seconds and an HTTP date; waits are capped at
+    MAX_RETRY_AFTER so one host cannot park a crawl indefinitely.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        seconds = float(value)
+    else:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+def is_rate_limited(response):
+    """Check for a 429, or a 503 that says when to come back"""
+    return response.status_code == 429 or (
+        response.status_code == 503 and 'Retry-After' in response.headers
+    )
+
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 1
+RETRY_MAX_DELAY = 60
+
+def is_transient(error):
+    """Check whether a failed request is worth trying again later.
+
+    Timeouts, refused or reset connections, bodies cut off mid-stream and
+    5xx responses usually pass; other 4xx responses, bad URLs and redirect
+    loops will fail the same way every time.
+    """
+    if isinstance(error, (requests.Timeout, requests.ConnectionError,
+                          requests.exceptions.ChunkedEncodingError)):
+        return True
+    response = getattr(error, 'response', None)
+    return isinstance(error, requests.HTTPError) and response is not None and response.status_code >= 500
+
+def retry_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """Seconds to wait before retry number `attempt` (1 for the first).
+
+    The backoff doubles with each attempt up to cap, and a random half of
+    it is jitter, so pages that failed together do not retry together.
+    """
+    backoff = min(cap, base * 2 ** (attempt - 1))
+    return backoff / 2 + random.uniform(0, backoff / 2)
+
 class RateLimiter:
-    """Smart rate limiter with domain-specific delays and user agent rotation"""
+    """Smart rate limiter with domain-specific delays and user agent rotation
+
+    Each domain has a token bucket holding up to `burst` tokens that refills
+    at one token per delays[domain] seconds. The limiter never sleeps
+    itself: try_acquire() and next_eligible() tell the caller when a domain
+    may be requested, so a scheduler can move on to other hosts meanwhile.
+    """
     
-    def __init__(self, initial_requests_per_second=2, rotate_agent_after=10):
+    def __init__(self, initial_requests_per_second=2, rotate_agent_after=10, burst=1):
         self.initial_delay = 1.0 / initial_requests_per_second
         self.delays = defaultdict(lambda: self.initial_delay)
-        self.last_request_time = defaultdict(float)
+        # Per-domain floors on the delay, e.g. from robots.txt Crawl-delay
+        self.min_delays = {}
+        self.burst = burst
+        self.tokens = {}
+        self.updated = {}
+        # Set by 429 responses and Retry-After: no tokens before this time
+        self.blocked_until = defaultdict(float)
         self.rotate_agent_after = rotate_agent_after
         self.request_count = 0
         self.user_agents = USER_AGENTS.copy()
@@ -67,27 +178,78 @@ class RateLimiter:
         self.current_agent_index = 0
         self.start_time = time.time()
     
+    def _refill(self, domain, now):
+        """Top up domain's bucket for the time since it was last used"""
+        tokens = self.tokens.get(domain, self.burst)
+        if domain in self.updated:
+            tokens = min(self.burst, tokens + (now - self.updated[domain]) / self.delays[domain])
+        self.tokens[domain] = tokens
+        self.updated[domain] = now
+        return tokens
+
+    def next_eligible(self, domain, now=None):
+        """Return the time at which domain may next be requested"""
+        now = time.time() if now is None else now
+        tokens = self._refill(domain, now)
+        ready = now if tokens >= 1 else now + (1 - tokens) * self.delays[domain]
+        return max(ready, self.blocked_until[domain])
+
+    def try_acquire(self, domain):
+        """Take a token for domain if one is available now.
+
+        Returns 0 when the request may be sent; otherwise returns the
+        seconds until domain is eligible and takes nothing.
+        """
+        now = time.time()
+        wait = self.next_eligible(domain, now) - now
+        # Sub-millisecond waits are float noise from the refill arithmetic
+        if wait > 0.001:
+            return wait
+        self.tokens[domain] -= 1
+        return 0
+
+    def reserve(self, domain):
+        """Claim the next request slot for domain without blocking.
+
+        Unlike try_acquire, always takes a token, running the bucket into
+        debt, and returns the number of seconds the caller should wait
+        before sending.
+        """
+        now = time.time()
+        tokens = self._refill(domain, now)
+        self.tokens[domain] = tokens - 1
+        ready = now if tokens >= 1 else now + (1 - tokens) * self.delays[domain]
+        return max(ready, self.blocked_until[domain]) - now
+
     def wait(self, domain):
-        """Wait appropriate time for domain"""
-        current_time = time.time()
-        elapsed = current_time - self.last_request_time[domain]
-        delay = self.delays[domain]
-        
-        if elapsed < delay:
-            time.sleep(delay - elapsed)
-        
-        self.last_request_time[domain] = time.time()
+        """Block until a request to domain is allowed, for one-off requests"""
+        time.sleep(self.reserve(domain))
     
-    def handle_429(self, domain):
-        """Handle rate limiting (HTTP 429)"""
+    def handle_429(self, domain, retry_after=None):
+        """Handle rate limiting (HTTP 429), returning the seconds domain is paused for"""
         # Exponential backoff
         self.delays[domain] *= 2
-        return self.delays[domain]
+        pause = self.delays[domain] if retry_after is None else retry_after
+        self.blocked_until[domain] = max(self.blocked_until[domain], time.time() + pause)
+        return pause
     
-    def handle_success(self, domain):
-        """Handle successful request"""
+    def handle_success(self, domain, latency=None):
+        """Handle successful request; latency (seconds to the response headers) is unused here"""
         # Gradually reduce delay on success, but not below initial
-        self.delays[domain] = max(self.initial_delay, self.delays[domain] * 0.95)
+        floor = self.min_delays.get(domain, self.initial_delay)
+        self.delays[domain] = max(floor, self.delays[domain] * 0.95)
+
+    def handle_error(self, domain):
+        """Handle a server error or timeout; only the adaptive limiter reacts"""
+
+    def get_host_stats(self, domain):
+        """Return the current rate for domain; the fixed limiter learns nothing else"""
+        return {'requests_per_second': 1.0 / self.delays[domain], 'concurrency': None, 'latency': None}
+
+    def set_min_delay(self, domain, delay):
+        """Never send requests to domain more often than every delay seconds"""
+        self.min_delays[domain] = max(self.initial_delay, delay)
+        self.delays[domain] = max(self.delays[domain], self.min_delays[domain])
     
     def get_next_user_agent(self):
         """Get next user agent, rotating if needed"""
@@ -99,6 +261,26 @@ class RateLimiter:
         
         return self.user_agents[self.current_agent_index]
     
+    def get_state(self):
+        """Return the learned delays and rotation position, for checkpoints"""
+        return {
+            'delays': dict(self.delays),
+            'min_delays': self.min_delays,
+            'blocked_until': dict(self.blocked_until),
+            'request_count': self.request_count,
+            'user_agents': self.user_agents,
+            'current_agent_index': self.current_agent_index,
+        }
+
+    def set_state(self, state):
+        """Restore state saved by get_state"""
+        self.delays.update(state['delays'])
+        self.min_delays.update(state['min_delays'])
+        self.blocked_until.update(state['blocked_until'])
+        self.request_count = state['request_count']
+        self.user_agents = state['user_agents']
+        self.current_agent_index = state['current_agent_index']
+
     def get_stats(self):
         """Get rate limiting statistics"""
         elapsed_time = time.time() - self.start_time
@@ -108,6 +290,707 @@ class RateLimiter:
             'request_count': self.request_count
         }
 
+class AdaptiveRateLimiter(RateLimiter):
+    """RateLimiter that learns each host's request rate and concurrency.
+
+    A Vegas-style controller: the fastest response seen from a host is its
+    uncongested baseline. While the smoothed response time stays within
+    `tolerance` of that baseline the host is keeping up, so the rate grows
+    by a fixed step and the in-flight limit by one per window of successes
+    (additive increase). Once latency climbs past the tolerance the server
+    is queueing our requests, and both are trimmed by 10%; a 429, a 5xx or
+    a timeout halves them (multiplicative decrease). The rate stays between
+    max_requests_per_second and any Crawl-delay floor, and the in-flight
+    limit between 1 and max_concurrency.
+    """
+
+    def __init__(self, initial_requests_per_second=2, rotate_agent_after=10, burst=1,
+                 max_requests_per_second=10, max_concurrency=4, tolerance=0.5):
+        super().__init__(initial_requests_per_second, rotate_agent_after, burst)
+        self.min_delay = 1.0 / max_requests_per_second
+        self.rate_step = initial_requests_per_second / 10
+        self.max_concurrency = max_concurrency
+        self.tolerance = tolerance
+        self.limits = {}
+        self.base_latency = {}
+        self.latency = {}
+
+    def concurrency(self, domain):
+        """How many requests may be in flight to domain"""
+        return int(self.limits.get(domain, 1))
+
+    def _set_rate(self, domain, rate):
+        floor = max(self.min_delay, self.min_delays.get(domain, 0))
+        self.delays[domain] = max(floor, 1.0 / rate)
+
+    def handle_success(self, domain, latency=None):
+        if latency is None:
+            return
+        base = min(self.base_latency.get(domain, latency), latency)
+        self.base_latency[domain] = base
+        smoothed = 0.8 * self.latency.get(domain, latency) + 0.2 * latency
+        self.latency[domain] = smoothed
+
+        limit = self.limits.get(domain, 1.0)
+        rate = 1.0 / self.delays[domain]
+        if smoothed <= base * (1 + self.tolerance):
+            self.limits[domain] = min(self.max_concurrency, limit + 1 / limit)
+            self._set_rate(domain, rate + self.rate_step)
+        else:
+            self.limits[domain] = max(1.0, limit * 0.9)
+            self._set_rate(domain, rate * 0.9)
+
+    def _back_off(self, domain):
+        self.limits[domain] = max(1.0, self.limits.get(domain, 1.0) / 2)
+        self._set_rate(domain, 0.5 / self.delays[domain])
+
+    def handle_429(self, domain, retry_after=None):
+        self._back_off(domain)
+        pause = self.delays[domain] if retry_after is None else retry_after
+        self.blocked_until[domain] = max(self.blocked_until[domain], time.time() + pause)
+        return pause
+
+    def handle_error(self, domain):
+        self._back_off(domain)
+
+    def get_host_stats(self, domain):
+        """Return the learned rate, in-flight limit and smoothed latency for domain"""
+        return {
+            'requests_per_second': 1.0 / self.delays[domain],
+            'concurrency': self.concurrency(domain),
+            'latency': self.latency.get(domain),
+        }
+
+    def get_state(self):
+        return {
+            **super().get_state(),
+            'limits': self.limits,
+            'base_latency': self.base_latency,
+            'latency': self.latency,
+        }
+
+    def set_state(self, state):
+        super().set_state(state)
+        self.limits.update(state.get('limits', {}))
+        self.base_latency.update(state.get('base_latency', {}))
+        self.latency.update(state.get('latency', {}))
+
+class CrawlFrontier:
+    """Breadth-first queue of (url, depth) pairs waiting to be fetched.
+
+    URLs are deduplicated when they are pushed, so each one is queued at most
+    once however many pages link to it. Pages are popped level by level, and
+    anything deeper than max_depth is never queued.
+    """
+
+    # Nothing pushed once the queue holds the remaining page budget could
+    # ever be popped, so the crawler may stop pushing at that point
+    fifo = True
+    # Number of the checkpoint the frontier was last saved in
+    generation = 0
+
+    def __init__(self, max_depth=None, seen=None):
+        self.max_depth = max_depth
+        self.queue = deque()
+        self.seen = set() if seen is None else seen
+        self.duplicates = 0
+
+    def push(self, url, depth):
+        """Queue url at depth, returning False if it was already seen or too deep"""
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        if url in self.seen:
+            self.duplicates += 1
+            return False
+        self.seen.add(url)
+        self.queue.append((url, depth))
+        return True
+
+    def pop(self):
+        """Return the next (url, depth) pair, shallowest first"""
+        return self.queue.popleft()
+
+    def requeue(self, url, depth):
+        """Put back a seen URL whose fetch never finished, ahead of the rest"""
+        self.queue.appendleft((url, depth))
+
+    def __len__(self):
+        return len(self.queue)
+
+    def commit(self):
+        """Make the frontier's state durable, for checkpoints"""
+
+    def committed_generation(self):
+        """The generation of the state made durable by the last commit()"""
+        return self.generation
+
+    def close(self):
+        """Release any resources held by the frontier"""
+
+def url_fingerprint(url):
+    """Return a stable, non-zero 64-bit fingerprint of url"""
+    fingerprint = int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+    return fingerprint or 1
+
+class FingerprintSet:
+    """Compact seen-set storing 64-bit URL fingerprints instead of strings.
+
+    Fingerprints live in an array-backed open-addressing table with linear
+    probing that doubles once it is half full, so each URL costs 16-32 bytes
+    rather than a full string. Two URLs sharing a fingerprint is possible
+    but vanishingly rare (about n^2 / 2^65 for n URLs).
+    """
+
+    def __init__(self, capacity=1024):
+        size = 8
+        while size < 2 * capacity:
+            size *= 2
+        self.table = array('Q', bytes(8 * size))
+        self.mask = size - 1
+        self.count = 0
+
+    def _slot(self, fingerprint):
+        """Return the index holding fingerprint, or the empty slot where it belongs"""
+        table = self.table
+        mask = self.mask
+        index = fingerprint & mask
+        while table[index] and table[index] != fingerprint:
+            index = (index + 1) & mask
+        return index
+
+    def add(self, url):
+        fingerprint = url_fingerprint(url)
+        index = self._slot(fingerprint)
+        if self.table[index]:
+            return
+        self.table[index] = fingerprint
+        self.count += 1
+        if 2 * self.count > len(self.table):
+            self._grow()
+
+    def _grow(self):
+        old_table = self.table
+        self.table = array('Q', bytes(16 * len(old_table)))
+        self.mask = len(self.table) - 1
+        for fingerprint in old_table:
+            if fingerprint:
+                self.table[self._slot(fingerprint)] = fingerprint
+
+    def __contains__(self, url):
+        return bool(self.table[self._slot(url_fingerprint(url))])
+
+    def __len__(self):
+        return self.count
+
+class BloomFilter:
+    """Approximate seen-set sized for capacity URLs at a given false-positive rate.
+
+    Uses a fixed bit array of about 1.44 * log2(1 / error_rate) bits per URL.
+    A false positive makes the crawler skip a URL it never fetched; there are
+    no false negatives. Past capacity the error rate climbs steadily.
+    """
+
+    def __init__(self, capacity=1_000_000, error_rate=0.001):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, url):
+        # Double hashing: derive every probe from the two halves of one digest
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, url):
+        added = False
+        for position in self._positions(url):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, url):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(url))
+
+    def __len__(self):
+        return self.count
+
+def create_seen_set(kind='set', capacity=1_000_000, error_rate=0.001):
+    """Create the seen-set a frontier dedupes against.
+
+    kind is 'set' for exact strings, 'fingerprint' for a FingerprintSet or
+    'bloom' for a BloomFilter sized for capacity URLs at error_rate.
+    """
+    if kind == 'fingerprint':
+        return FingerprintSet()
+    if kind == 'bloom':
+        return BloomFilter(capacity=capacity, error_rate=error_rate)
+    return set()
+
+def open_frontier_db(path, reset=False):
+    """Open the SQLite file backing a DiskFrontier and its seen-set.
+
+    The data is scratch state, so durability is traded for write speed, and
+    the page cache is capped so the process stays within a fixed budget.
+    reset drops anything left over from a previous crawl.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    db = sqlite3.connect(path)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.execute('PRAGMA synchronous=OFF')
+    db.execute('PRAGMA cache_size=-8192')
+    if reset:
+        db.execute('DROP TABLE IF EXISTS seen')
+        db.execute('DROP TABLE IF EXISTS queue')
+        db.execute('DROP TABLE IF EXISTS meta')
+        db.commit()
+    db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)')
+    return db
+
+class DiskSeenSet:
+    """Set of URLs stored in SQLite with a small in-memory write buffer.
+
+    Supports the `in`, add() and len() operations the frontier uses, so it
+    can stand in for the plain set when a crawl discovers more URLs than fit
+    in memory.
+    """
+
+    def __init__(self, db, buffer_size=10000):
+        self.db = db
+        self.db.execute('CREATE TABLE IF NOT EXISTS seen (url TEXT PRIMARY KEY) WITHOUT ROWID')
+        self.buffer = set()
+        self.buffer_size = buffer_size
+        self.stored = self.db.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+
+    def add(self, url):
+        # Duplicates of stored URLs are dropped by the INSERT OR IGNORE in flush()
+        self.buffer.add(url)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered URLs to disk"""
+        changes = self.db.total_changes
+        self.db.executemany('INSERT OR IGNORE INTO seen (url) VALUES (?)',
+                            ((url,) for url in self.buffer))
+        self.stored += self.db.total_changes - changes
+        self.buffer.clear()
+
+    def __getstate__(self):
+        # Pickled along with its DiskFrontier, which reattaches the database
+        self.flush()
+        return {**self.__dict__, 'db': None}
+
+    def __contains__(self, url):
+        if url in self.buffer:
+            return True
+        return self.db.execute('SELECT 1 FROM seen WHERE url = ?', (url,)).fetchone() is not None
+
+    def __len__(self):
+        # May overcount until the next flush if add() was given a stored URL
+        return self.stored + len(self.buffer)
+
+class DiskFrontier(CrawlFrontier):
+    """Breadth-first frontier that spills to SQLite past a hot buffer.
+
+    Only the next buffer_size entries to pop and the last buffer_size pushed
+    are held in memory; everything in between lives in the queue table, so
+    memory stays flat however many URLs are discovered. Uses a DiskSeenSet
+    in the same database unless another seen-set is given.
+
+    Changes are only committed by commit() and close(), so after a crash
+    the database rolls back to the state of the last checkpoint. Each commit
+    also records the frontier's generation, which save_checkpoint counts, so
+    load_checkpoint can tell which checkpoint file the database matches.
+    """
+
+    def __init__(self, db, max_depth=None, seen=None, buffer_size=10000):
+        if seen is None:
+            seen = DiskSeenSet(db, buffer_size=buffer_size)
+        super().__init__(max_depth=max_depth, seen=seen)
+        self.db = db
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS queue (id INTEGER PRIMARY KEY, url TEXT, depth INTEGER)'
+        )
+        self.buffer_size = buffer_size
+        self.head = deque()
+        self.spilled = self.db.execute('SELECT COUNT(*) FROM queue').fetchone()[0]
+
+    def push(self, url, depth):
+        if not super().push(url, depth):
+            return False
+        if len(self.queue) >= self.buffer_size:
+            self._spill()
+        return True
+
+    def pop(self):
+        if not self.head:
+            if self.spilled:
+                self._refill()
+            else:
+                self.head, self.queue = self.queue, deque()
+        return self.head.popleft()
+
+    def _spill(self):
+        """Move the push-side buffer to the end of the on-disk queue"""
+        self.db.executemany('INSERT INTO queue (url, depth) VALUES (?, ?)', self.queue)
+        self.spilled += len(self.queue)
+        self.queue.clear()
+
+    def _refill(self):
+        """Load the oldest on-disk entries into the pop-side buffer"""
+        rows = self.db.execute(
+            'SELECT id, url, depth FROM queue ORDER BY id LIMIT ?', (self.buffer_size,)
+        ).fetchall()
+        self.db.execute('DELETE FROM queue WHERE id <= ?', (rows[-1][0],))
+        self.spilled -= len(rows)
+        self.head.extend((url, depth) for _, url, depth in rows)
+
+    def requeue(self, url, depth):
+        self.head.appendleft((url, depth))
+
+    def __len__(self):
+        return len(self.head) + self.spilled + len(self.queue)
+
+    def commit(self):
+        if isinstance(self.seen, DiskSeenSet):
+            self.seen.flush()
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)", (self.generation,))
+        self.db.commit()
+
+    def committed_generation(self):
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+    def __getstate__(self):
+        # The in-memory buffers are pickled; the database is reopened by path
+        path = self.db.execute('PRAGMA database_list').fetchone()[2]
+        return {**self.__dict__, 'db': None, 'path': path}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.db = open_frontier_db(self.path)
+        if isinstance(self.seen, DiskSeenSet):
+            self.seen.db = self.db
+
+def score_url(url, depth, inlinks):
+    """Default best-first score for a queued URL; lower scores are fetched first.
+
+    Favors short, shallow paths without query parameters and pages that many
+    already-crawled pages link to.
+    """
+    structure = analyze_url_structure(url)
+    return (
+        depth
+        + structure['path_depth']
+        + 2 * structure['params_count']
+        + structure['url_length'] / 50
+        - 2 * math.log2(1 + inlinks)
+    )
+
+class PriorityFrontier(CrawlFrontier):
+    """Best-first frontier that pops the lowest-scoring URL first.
+
+    score(url, depth, inlinks) ranks each URL, where inlinks counts the pages
+    seen linking to it so far. Re-discovering a queued URL rescores it by
+    pushing a fresh heap entry and leaving the old one as stale, so push and
+    pop stay O(log n); stale entries are compacted away once they outnumber
+    the live ones.
+    """
+
+    fifo = False
+
+    def __init__(self, max_depth=None, seen=None, score=score_url):
+        super().__init__(max_depth=max_depth, seen=seen)
+        self.score = score
+        self.heap = []
+        self.entries = {}
+        self.inlinks = Counter()
+        self.sequence = 0
+
+    def push(self, url, depth):
+        """Queue url at depth, or rescore it if it is already queued"""
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        entry = self.entries.get(url)
+        if entry is None and url in self.seen:
+            self.duplicates += 1
+            return False
+
+        self.inlinks[url] += 1
+        if entry is not None:
+            self.duplicates += 1
+            depth = min(depth, entry[3])
+        else:
+            self.seen.add(url)
+
+        self.sequence += 1
+        entry = [self.score(url, depth, self.inlinks[url] - 1), self.sequence, url, depth]
+        self.entries[url] = entry
+        heapq.heappush(self.heap, entry)
+
+        if len(self.heap) > 2 * len(self.entries) + 1024:
+            self.heap = list(self.entries.values())
+            heapq.heapify(self.heap)
+        return True
+
+    def requeue(self, url, depth):
+        self.sequence += 1
+        entry = [self.score(url, depth, self.inlinks[url]), self.sequence, url, depth]
+        self.entries[url] = entry
+        heapq.heappush(self.heap, entry)
+
+    def __getstate__(self):
+        # Scoring functions may not pickle; the crawler sets score on resume
+        return {**self.__dict__, 'score': None}
+
+    def peek(self):
+        """Return the best-scoring (url, depth) pair without removing it"""
+        while self.entries.get(self.heap[0][2]) is not self.heap[0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][2], self.heap[0][3]
+
+    def pop(self):
+        """Return the best-scoring (url, depth) pair"""
+        while True:
+            entry = heapq.heappop(self.heap)
+            url = entry[2]
+            if self.entries.get(url) is entry:
+                del self.entries[url]
+                del self.inlinks[url]
+                return url, entry[3]
+
+    def __len__(self):
+        return len(self.entries)
+
+class HostScheduler:
+    """Hand out frontier URLs whose host the rate limiter allows right now.
+
+    Instead of sleeping on a URL whose host is not yet eligible, it is
+    parked with that host's other waiting URLs and the next URL is tried.
+    Parked URLs come back in the order they were popped, and at most
+    max_parked are held in memory; past that, take() returns None and
+    wait_time() says how long until the first parked host is eligible.
+    A frontier that is not FIFO is never parked from, as that would fetch
+    its URLs in pop order: its best URL stays queued, keeping any better
+    score it gets meanwhile, until its host is eligible.
+
+    host_limit(host), if given, caps the requests in flight to a host:
+    every URL handed out holds one of its host's slots until release(url).
+    URLs for which exempt(url) is true need no request, so they are handed
+    out straight away without a token or a slot.
+
+    defer(url, depth, delay) holds a URL that failed back for delay seconds
+    before parking it again, ahead of its host's other URLs.
+    """
+
+    def __init__(self, frontier, rate_limiter, max_parked=1000, exempt=None, host_limit=None):
+        self.frontier = frontier
+        self.rate_limiter = rate_limiter
+        self.max_parked = max_parked
+        self.exempt = exempt
+        self.host_limit = host_limit
+        self.parked = {}
+        self.parked_count = 0
+        # (eligible_time, host) for parked hosts waiting on the rate limiter
+        self.waiting = []
+        # Parked hosts waiting for one of their requests to finish
+        self.full = set()
+        self.active = Counter()
+        self.holders = {}
+        # (retry_time, url, depth) for failed URLs waiting to be retried
+        self.deferred = []
+        # Host of the best URL of a frontier that is not FIFO, while it is held back
+        self.held = None
+
+    def park(self, url, depth, front=False):
+        """Hold url until its host is eligible; front puts it ahead of the host's other URLs"""
+        host = urlparse(url).netloc
+        if host not in self.parked:
+            self.parked[host] = deque()
+            heapq.heappush(self.waiting, (self.rate_limiter.next_eligible(host), host))
+        if front:
+            self.parked[host].appendleft((url, depth))
+        else:
+            self.parked[host].append((url, depth))
+        self.parked_count += 1
+
+    def defer(self, url, depth, delay):
+        """Hold a failed url for delay seconds, then park it to be fetched again"""
+        heapq.heappush(self.deferred, (time.time() + delay, url, depth))
+
+    def _has_slot(self, host):
+        return self.host_limit is None or self.active[host] < self.host_limit(host)
+
+    def _hand_out(self, url, host):
+        self.active[host] += 1
+        self.holders[url] = host
+
+    def take(self):
+        """Return a (url, depth) pair to fetch now, taking a rate limit token for it"""
+        now = time.time()
+        while self.deferred and self.deferred[0][0] <= now:
+            _, url, depth = heapq.heappop(self.deferred)
+            self.park(url, depth, front=True)
+            # park() reads the clock after `now`; catch up so the host is
+            # tried on this pass if it is eligible
+            now = time.time()
+        while self.waiting and self.waiting[0][0] <= now:
+            _, host = heapq.heappop(self.waiting)
+            if not self._has_slot(host):
+                self.full.add(host)
+                continue
+            wait = self.rate_limiter.try_acquire(host)
+            if wait:
+                heapq.heappush(self.waiting, (now + wait, host))
+                continue
+            queue = self.parked[host]
+            url, depth = queue.popleft()
+            self.parked_count -= 1
+            if queue:
+                heapq.heappush(self.waiting, (self.rate_limiter.next_eligible(host), host))
+            else:
+                del self.parked[host]
+            self._hand_out(url, host)
+            return url, depth
+
+        if not self.frontier.fifo:
+            return self._take_best() if self.frontier else None
+        while self.frontier and self.parked_count < self.max_parked:
+            url, depth = self.frontier.pop()
+            if self.exempt is not None and self.exempt(url):
+                return url, depth
+            host = urlparse(url).netloc
+            if host not in self.parked and self._has_slot(host) and not self.rate_limiter.try_acquire(host):
+                self._hand_out(url, host)
+                return url, depth
+            self.park(url, depth)
+        return None
+
+    def _take_best(self):
+        """Hand out the best URL of a frontier that is not FIFO, unless its host is held back"""
+        url, depth = self.frontier.peek()
+        self.held = None
+        if self.exempt is not None and self.exempt(url):
+            return self.frontier.pop()
+        host = urlparse(url).netloc
+        # URLs of the host parked after a 429 go first
+        if host in self.parked or not self._has_slot(host) or self.rate_limiter.try_acquire(host):
+            self.held = host
+            return None
+        self.frontier.pop()
+        self._hand_out(url, host)
+        return url, depth
+
+    def release(self, url):
+        """Give back the host slot held by url once its request is done"""
+        host = self.holders.pop(url, None)
+        if host is None:
+            return
+        self.active[host] -= 1
+        if host in self.full:
+            self.full.discard(host)
+            heapq.heappush(self.waiting, (time.time(), host))
+
+    def wait_time(self):
+        """Seconds until a parked host becomes eligible or a deferred URL is
+        due, or None if every parked host is waiting for a request to finish"""
+        due = [queue[0][0] for queue in (self.waiting, self.deferred) if queue]
+        if self.held is not None and self.held not in self.parked and self._has_slot(self.held):
+            due.append(self.rate_limiter.next_eligible(self.held))
+        if not due:
+            return None if self.full or self.held is not None else 0
+        return max(min(due) - time.time(), 0)
+
+    def parked_urls(self):
+        return ([item for queue in self.parked.values() for item in queue]
+                + [(url, depth) for _, url, depth in self.deferred])
+
+    def __len__(self):
+        return self.parked_count + len(self.deferred)
+
+    def __bool__(self):
+        return self.parked_count > 0 or bool(self.deferred) or bool(self.frontier)
+
+class FairShare:
+    """Share a number of request slots between the seeds of a batch crawl.
+
+    At most `slots` requests are in flight across all seeds. When several
+    seeds are waiting, the next free slot goes to the one that has been
+    served least: with 'round-robin' every request counts the same, with
+    'weighted' a request for a seed of weight w counts 1/w, so busy seeds
+    get slots in proportion to their weights. A seed that was idle starts
+    level with the others instead of catching up on the turns it missed.
+    """
+
+    def __init__(self, slots, weights=None, fairness='round-robin'):
+        self.slots = slots
+        self.weights = weights or {}
+        self.fairness = fairness
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        # Virtual service time of each seed, and the time of the last grant
+        self.served = defaultdict(float)
+        self.clock = 0.0
+        self.waiting = Counter()
+        self.closed = False
+
+    def _next(self):
+        return min((seed for seed, count in self.waiting.items() if count), key=self.served.__getitem__)
+
+    def acquire(self, seed):
+        """Block until seed may send a request.
+
+        Raises KeyboardInterrupt once the share is closed, so every crawl
+        of the batch stops at its next request.
+        """
+        with self.condition:
+            if not self.waiting[seed]:
+                self.served[seed] = max(self.served[seed], self.clock)
+            self.waiting[seed] += 1
+            try:
+                self.condition.wait_for(
+                    lambda: self.closed or (self.in_flight < self.slots and self._next() == seed)
+                )
+            finally:
+                self.waiting[seed] -= 1
+            if self.closed:
+                raise KeyboardInterrupt
+            self.in_flight += 1
+            self.clock = self.served[seed]
+            weight = self.weights.get(seed, 1) if self.fairness == 'weighted' else 1
+            self.served[seed] += 1 / weight
+            # Another seed may be next in line for a slot that is still free
+            self.condition.notify_all()
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    @contextmanager
+    def slot(self, seed):
+        """Hold one of seed's request slots for the duration of a with block"""
+        self.acquire(seed)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
 def format_size(size_bytes):
     """Format size in bytes to human-readable format"""
     if size_bytes < 1024:
@@ -119,6 +1002,90 @@ def format_size(size_bytes):
     else:
         return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
 
+def create_session(max_hosts=10, connections_per_host=1):
+    """Create a pooled HTTP session for the crawler.
+
+    Connections are kept alive in one pool per host; max_hosts is how many
+    host pools are cached and connections_per_host how many sockets each
+    pool holds, which should match the number of requests in flight per host.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=connections_per_host)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Accept-Encoding'] = ', '.join(ACCEPT_ENCODINGS)
+    return session
+
+def get_wire_size(response, body=None):
+    """Return the number of body bytes received on the wire, before decoding.
+
+    For a streamed response, pass the body that was read from it.
+    """
+    try:
+        wire_size = response.raw.tell()
+    except Exception:
+        wire_size = 0
+    return wire_size or len(response.content if body is None else body)
+
+def is_html(response):
+    """Check the Content-Type header, before any of the body is downloaded"""
+    return response.headers.get('content-type', '').startswith('text/html')
+
+class DeadlineExceeded(Exception):
+    """A body was still downloading when the crawl's time budget ran out"""
+
+def read_body(response, max_body_size, chunk_size=64 * 1024, deadline=None):
+    """Read a streamed response's body in chunks and release the connection.
+
+    Returns None, having stopped reading, once the decoded body grows past
+    max_body_size bytes (0 means no limit). Raises DeadlineExceeded once
+    deadline, a time.time() value, passes.
+    """
+    chunks = []
+    size = 0
+    try:
+        for chunk in response.iter_content(chunk_size):
+            if deadline is not None and time.time() >= deadline:
+                raise DeadlineExceeded(response.url)
+            size += len(chunk)
+            if max_body_size and size > max_body_size:
+                return None
+            chunks.append(chunk)
+    finally:
+        response.close()
+    return b''.join(chunks)
+
+def stream_body(response, extractor, max_body_size, on_links=None, chunk_size=64 * 1024, deadline=None):
+    """Feed a streamed response's body to a StreamingExtractor as it arrives
+    and release the connection.
+
+    After each chunk, on_links (if given) is called with the internal links
+    found in it. Returns the closed extractor, or None, having stopped
+    reading, once the decoded body grows past max_body_size bytes (0 means
+    no limit). Raises DeadlineExceeded once deadline passes, as read_body.
+    """
+    try:
+        for chunk in response.iter_content(chunk_size):
+            if deadline is not None and time.time() >= deadline:
+                raise DeadlineExceeded(response.url)
+            if max_body_size and extractor.size + len(chunk) > max_body_size:
+                return None
+            extractor.feed_bytes(chunk)
+            links = extractor.new_links()
+            if links and on_links is not None:
+                on_links(links)
+    finally:
+        response.close()
+    extractor.close()
+    return extractor
+
+def declared_size(response):
+    """Return the Content-Length of a response, or 0 if it did not send one"""
+    try:
+        return int(response.headers.get('content-length', 0))
+    except ValueError:
+        return 0
+
 def is_valid_url(url):
     """Check if the URL is valid and well-formed"""
     try:
@@ -127,6 +1094,121 @@ def is_valid_url(url):
     except:
         return False
 
+# hrefs that resolve the same on every page of a host: root-relative, with
+# a host of their own, or with a scheme other than http(s)
+BASE_INDEPENDENT_HREF = re.compile(r'/|[a-z][a-z0-9+.-]*://|(?!https?:)[a-z][a-z0-9+.-]*:', re.IGNORECASE)
+
+class UrlResolver:
+    """Resolve hrefs against the page they are on, remembering recent answers.
+
+    The same navigation, footer and asset links recur on every page of a
+    site, so resolve() keeps its last capacity answers in an LRU keyed on
+    (base, href). For an href that resolves the same anywhere on a host
+    (see BASE_INDEPENDENT_HREF), base is cut down to its scheme and host,
+    so a site-wide link takes one entry however many pages carry it. hits
+    and misses count lookups. Safe to share between threads.
+    """
+
+    def __init__(self, capacity=50_000):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        # The last base and its origin and host, as a page's hrefs come in a row
+        self.base = (None, None, None)
+
+    def resolve(self, base, href):
+        """Return (url, host, valid, internal) for href on the page at base.
+
+        url is urljoin(base, href), host its netloc, valid whether
+        is_valid_url(url) and internal whether host is base's host.
+        """
+        last_base, origin, base_host = self.base
+        if base != last_base:
+            parsed = urlparse(base)
+            origin, base_host = f'{parsed.scheme}://{parsed.netloc}', parsed.netloc
+            self.base = (base, origin, base_host)
+        key = (origin if BASE_INDEPENDENT_HREF.match(href) else base, href)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        url = urljoin(base, href)
+        try:
+            parsed = urlparse(url)
+        except ValueError:
+            entry = (url, None, False, False)
+        else:
+            valid = bool(parsed.netloc) and parsed.scheme in ('http', 'https')
+            entry = (url, parsed.netloc, valid, parsed.netloc == base_host)
+        with self.lock:
+            self.entries[key] = entry
+            if len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+        return entry
+
+# Shared by every page analyzed in this process
+url_resolver = UrlResolver()
+
+# Query parameters that only track where a visitor came from. A trailing
+# '*' matches any parameter with that prefix.
+TRACKING_PARAMS = (
+    'utm_*', 'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', 'igshid', 'ref_src', 'spm',
+)
+
+def is_tracking_param(name, strip_params=TRACKING_PARAMS):
+    """Check if a query parameter name matches one of strip_params"""
+    for pattern in strip_params:
+        if pattern.endswith('*'):
+            if name.startswith(pattern[:-1]):
+                return True
+        elif name == pattern:
+            return True
+    return False
+
+def canonicalize_url(url, strip_params=TRACKING_PARAMS, strip_trailing_slash=False):
+    """Return the canonical form of url used to decide whether it was seen.
+
+    Lowercases the scheme and host, drops default ports, fragments and
+    tracking parameters, sorts the remaining query parameters and, with
+    strip_trailing_slash, drops a trailing slash from the path. That is
+    off by default: /docs/ and /docs are different pages to relative links.
+    Query parameters keep their original encoding. URLs that cannot be
+    parsed are returned unchanged.
+    """
+    try:
+        parsed = urlsplit(url)
+        scheme = parsed.scheme.lower()
+        host = parsed.hostname or ''
+        port = parsed.port
+    except ValueError:
+        return url
+
+    if ':' in host:
+        host = f'[{host}]'
+    if port and (scheme, port) not in (('http', 80), ('https', 443)):
+        host = f'{host}:{port}'
+    userinfo = parsed.netloc.rpartition('@')[0]
+    netloc = f'{userinfo}@{host}' if userinfo else host
+
+    path = parsed.path or '/'
+    if strip_trailing_slash and len(path) > 1:
+        path = path.rstrip('/') or '/'
+
+    params = [
+        param for param in parsed.query.split('&')
+        if param and not is_tracking_param(param.split('=', 1)[0], strip_params)
+    ]
+    query = '&'.join(sorted(params))
+
+    return urlunsplit((scheme, netloc, path, query, ''))
+
 def analyze_url_structure(url):
     """Analyze URL structure and return metrics"""
     parsed_url = urlparse(url)
@@ -149,10 +1231,284 @@ def analyze_url_structure(url):
         'path_parts': path_parts
     }
 
-def analyze_link_quality(soup, base_url):
+# SIMHASH_SPREAD[i][b] holds the bits of byte b, found at byte i of a digest,
+# as separate 32-bit fields of one big integer, so summing the spread bytes
+# of every digest counts all 64 bit positions at once
+SIMHASH_FIELD = 32
+SIMHASH_SPREAD = [
+    [
+        sum(1 << ((8 * index + bit) * SIMHASH_FIELD) for bit in range(8) if value >> bit & 1)
+        for value in range(256)
+    ]
+    for index in range(8)
+]
+
+# Pages with fewer words than this are not checked for near-duplicates: with
+# little or no text (an image gallery, a script-rendered shell) fingerprints
+# say nothing about the content, and all text-less pages share one
+NEAR_DUPLICATE_MIN_WORDS = 20
+
+def simhash(words, shingle_size=3):
+    """Return the 64-bit SimHash of a page's text, given as a list of words.
+
+    Each run of shingle_size lowercase words is hashed, and a bit of the
+    result is set when it is set in most shingle hashes, so pages sharing
+    most of their text get fingerprints a few bits apart.
+    """
+    hasher = SimHasher(shingle_size)
+    hasher.update(words)
+    return hasher.digest()
+
+class SimHasher:
+    """Compute a simhash() from a page's words as they arrive, keeping only
+    a batch of words not hashed yet and a packed bit count."""
+
+    # Words are hashed in batches of this many, as update() is often
+    # given a word or two at a time
+    batch_size = 1024
+
+    def __init__(self, shingle_size=3):
+        self.shingle_size = shingle_size
+        self.word_count = 0
+        self.shingles = 0
+        self.counts = 0
+        # Words not hashed yet, after the last shingle_size - 1 words hashed,
+        # which start the next shingles
+        self.pending = []
+        self.carried = 0
+
+    def update(self, words):
+        self.word_count += len(words)
+        self.pending += words
+        if len(self.pending) - self.carried >= self.batch_size:
+            self._hash()
+
+    def _hash(self):
+        words = [word.lower() for word in self.pending[self.carried:]]
+        words[:0] = self.pending[:self.carried]
+        size = self.shingle_size
+        counts = 0
+        for i in range(len(words) - size + 1):
+            digest = hashlib.blake2b(' '.join(words[i:i + size]).encode('utf-8'), digest_size=8).digest()
+            for spread, value in zip(SIMHASH_SPREAD, digest):
+                counts += spread[value]
+        self.counts += counts
+        self.shingles += max(len(words) - size + 1, 0)
+        self.pending = words[max(len(words) - size + 1, 0):] if size > 1 else []
+        self.carried = len(self.pending)
+
+    def digest(self):
+        self._hash()
+        counts, shingles = self.counts, self.shingles
+        if self.word_count < self.shingle_size:
+            # Too few words for a full shingle: they make one together
+            digest = hashlib.blake2b(' '.join(self.pending).encode('utf-8'), digest_size=8).digest()
+            counts = sum(spread[value] for spread, value in zip(SIMHASH_SPREAD, digest))
+            shingles = 1
+
+        fingerprint = 0
+        field_mask = (1 << SIMHASH_FIELD) - 1
+        for bit in range(64):
+            if 2 * ((counts >> (bit * SIMHASH_FIELD)) & field_mask) > shingles:
+                fingerprint |= 1 << bit
+        return fingerprint
+
+class SimHashIndex:
+    """Find pages whose SimHash is within threshold bits of one already added.
+
+    The 64 bits are split into threshold + 1 blocks. Two fingerprints within
+    threshold bits must agree exactly on at least one block, so only
+    fingerprints sharing a block value are compared.
+    """
+
+    def __init__(self, threshold=3):
+        self.threshold = threshold
+        blocks = threshold + 1
+        bounds = [64 * i // blocks for i in range(blocks + 1)]
+        self.blocks = [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+        self.tables = [defaultdict(list) for _ in self.blocks]
+
+    def find(self, fingerprint):
+        """Return the url of a near-duplicate of fingerprint, or None"""
+        for table, (shift, mask) in zip(self.tables, self.blocks):
+            for other, url in table.get((fingerprint >> shift) & mask, ()):
+                if bin(fingerprint ^ other).count('1') <= self.threshold:
+                    return url
+        return None
+
+    def add(self, fingerprint, url):
+        for table, (shift, mask) in zip(self.tables, self.blocks):
+            table[(fingerprint >> shift) & mask].append((fingerprint, url))
+
+class SoupDocument:
+    """A page parsed by BeautifulSoup with Python's html.parser.
+
+    Pages are read through the same small interface whatever the parser
+    (see HTML_PARSERS): find() and find_all() return elements in document
+    order, which attrs(), get(), text() and string() take apart, and words() splits
+    the page's text. events() walks the whole page once instead. Text
+    inside script, style, template, rt and rp elements, and comments, is
+    never part of the page's text.
+    """
+
+    def __init__(self, html):
+        self.soup = BeautifulSoup(html, 'html.parser')
+
+    def find(self, name):
+        return self.soup.find(name)
+
+    def name(self, element):
+        return element.name
+
+    def find_all(self, *names):
+        return self.soup.find_all(list(names))
+
+    def attrs(self, element):
+        """The element's attributes; multi-valued ones like rel as lists"""
+        return element.attrs
+
+    def get(self, element, attr, default=None):
+        """An attribute's value; multi-valued ones like rel as one string"""
+        value = element.get(attr, default)
+        return ' '.join(value) if isinstance(value, list) else value
+
+    def text(self, element):
+        """The element's text, each piece stripped, run together"""
+        return element.get_text(strip=True)
+
+    def string(self, element):
+        """The element's only string, or None if it has none or several"""
+        return element.string
+
+    def words(self):
+        return self.soup.get_text(separator=' ', strip=True).split()
+
+    def events(self):
+        """Yield ('start', element), ('end', element) and ('text', string)
+        in document order, with ('cdata', string) for CDATA sections, which
+        text() and words() count as text too"""
+        contents = [iter(self.soup.contents)]
+        open_tags = []
+        while contents:
+            node = next(contents[-1], None)
+            if node is None:
+                contents.pop()
+                if open_tags:
+                    yield 'end', open_tags.pop()
+            elif isinstance(node, Tag):
+                yield 'start', node
+                contents.append(iter(node.contents))
+                open_tags.append(node)
+            elif type(node) is NavigableString:
+                # Subclasses are comments, doctypes and script, style,
+                # template and ruby annotation text
+                yield 'text', node
+            elif type(node) is CData:
+                yield 'cdata', node
+
+
+class LxmlDocument(SoupDocument):
+    """A page parsed by lxml, many times faster than html.parser.
+
+    lxml follows the HTML spec where html.parser does not: <title> holds
+    only text, <![CDATA[...]]> is a comment and the first of two duplicate
+    attributes wins. Well-formed pages give the same results either way.
+    """
+
+    # Text nodes that are part of the page's text, as BeautifulSoup counts it
+    _strings = etree.XPath(
+        './/text()[not(ancestor::script or ancestor::style or ancestor::template'
+        ' or ancestor::rt or ancestor::rp)]',
+        smart_strings=False
+    ) if lxml else None
+
+    def __init__(self, html):
+        try:
+            self.root = lxml.html.document_fromstring(html)
+        except ValueError:
+            # lxml refuses str input with an XML encoding declaration
+            try:
+                self.root = lxml.html.document_fromstring(html.encode('utf-8'), parser=lxml.html.HTMLParser(encoding='utf-8'))
+            except etree.ParserError:
+                # Nothing but whitespace
+                self.root = lxml.html.Element('html')
+        except etree.ParserError:
+            self.root = lxml.html.Element('html')
+
+    def find(self, name):
+        return next(self.root.iter(name), None)
+
+    def name(self, element):
+        return element.tag
+
+    def find_all(self, *names):
+        return list(self.root.iter(*names))
+
+    def attrs(self, element):
+        return element.attrib
+
+    def get(self, element, attr, default=None):
+        return element.get(attr, default)
+
+    def text(self, element):
+        return ''.join(piece.strip() for piece in self._strings(element))
+
+    def string(self, element):
+        children = [child for child in element if child.tag is not etree.ProcessingInstruction]
+        if element.text:
+            return element.text if not children else None
+        if len(children) != 1 or children[0].tail:
+            return None
+        if children[0].tag is etree.Comment:
+            return children[0].text
+        return self.string(children[0])
+
+    def words(self):
+        return [word for piece in self._strings(self.root) for word in piece.split()]
+
+    def events(self):
+        skipping = 0
+        for event, element in etree.iterwalk(self.root, events=('start', 'end', 'comment', 'pi')):
+            if event == 'start':
+                if element.tag in TEXTLESS_TAGS:
+                    skipping += 1
+                yield 'start', element
+                if element.text and not skipping:
+                    yield 'text', element.text
+                continue
+            if event == 'end':
+                yield 'end', element
+                if element.tag in TEXTLESS_TAGS:
+                    skipping -= 1
+            # A comment's or processing instruction's own text is never page text
+            if element.tail and not skipping:
+                yield 'text', element.tail
+
+
+# Elements whose text is not page text
+TEXTLESS_TAGS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+
+# Font files linked from <link href>
+FONT_HREF = re.compile(r'\\.(woff|woff2|ttf|eot)')
+FAVICON_REL = re.compile(r'^(shortcut )?icon$', re.I)
+
+# Generic anchor text patterns
+GENERIC_ANCHOR_TEXTS = ('click here', 'read more', 'learn more', 'more info', 'details',
+                        'link', 'here', 'this', 'page', 'website', 'site')
+
+# Page parsers by name; lxml only when it is installed
+HTML_PARSERS = {'html.parser': SoupDocument}
+if lxml:
+    HTML_PARSERS['lxml'] = LxmlDocument
+DEFAULT_HTML_PARSER = 'lxml' if lxml else 'html.parser'
+
+def parse_html(html, parser=None):
+    """Parse html with the named parser, by default the fastest installed"""
+    return HTML_PARSERS[parser or DEFAULT_HTML_PARSER](html)
+
+def analyze_link_quality(doc, base_url):
     """Analyze link quality metrics"""
-    domain = urlparse(base_url).netloc
-    all_links = soup.find_all('a', href=True)
+    all_links = [link for link in doc.find_all('a') if doc.get(link, 'href') is not None]
     
     # Initialize counters
     internal_links = []
@@ -162,33 +1518,29 @@ def analyze_link_quality(soup, base_url):
     generic_anchor_texts = 0
     keyword_rich_anchor_texts = 0
     
-    # Generic anchor text patterns
-    generic_patterns = ['click here', 'read more', 'learn more', 'more info', 'details', 
-                       'link', 'here', 'this', 'page', 'website', 'site']
-    
     for link in all_links:
-        href = link['href']
-        full_url = urljoin(base_url, href)
+        href = doc.get(link, 'href')
+        full_url, _, valid, internal = url_resolver.resolve(base_url, href)
         
         # Skip non-valid URLs
-        if not is_valid_url(full_url):
+        if not valid:
             continue
             
         # Check if internal or external
-        if urlparse(full_url).netloc == domain:
+        if internal:
             internal_links.append(full_url)
         else:
             external_links.append(full_url)
         
         # Check for nofollow
-        if link.get('rel') and 'nofollow' in link.get('rel'):
+        if 'nofollow' in (doc.get(link, 'rel') or '').split():
             nofollow_links += 1
         
         # Analyze anchor text
-        anchor_text = link.get_text(strip=True).lower()
+        anchor_text = doc.text(link).lower()
         if not anchor_text:
             empty_anchor_texts += 1
-        elif any(pattern in anchor_text for pattern in generic_patterns):
+        elif any(pattern in anchor_text for pattern in GENERIC_ANCHOR_TEXTS):
             generic_anchor_texts += 1
         elif len(anchor_text.split()) >= 3:  # Assuming keyword-rich has 3+ words
             keyword_rich_anchor_texts += 1
@@ -210,9 +1562,10 @@ def analyze_link_quality(soup, base_url):
         'total_link_count': total_links
     }
 
-def count_resources(soup, url):
+def count_resources(doc, url):
     """Count different types of resources on the page"""
-    domain = urlparse(url).netloc
+    def is_internal(href):
+        return url_resolver.resolve(url, href)[3]
     
     # Initialize counters
     resources = {
@@ -228,66 +1581,79 @@ def count_resources(soup, url):
     }
     
     # Count JavaScript files
-    for script in soup.find_all('script', src=True):
+    for script in doc.find_all('script'):
+        src = doc.get(script, 'src')
+        if src is None:
+            continue
         resources['js_files'] += 1
-        src_url = urljoin(url, script['src'])
-        if urlparse(src_url).netloc == domain:
+        if is_internal(src):
             resources['internal_resources'] += 1
         else:
             resources['external_resources'] += 1
     
+    links = doc.find_all('link')
+
     # Count CSS files
-    for css in soup.find_all('link', rel='stylesheet'):
+    for css in links:
+        if 'stylesheet' not in (doc.get(css, 'rel') or '').split():
+            continue
         resources['css_files'] += 1
-        href_url = urljoin(url, css['href']) if css.get('href') else ''
-        if href_url and urlparse(href_url).netloc == domain:
+        href = doc.get(css, 'href')
+        if href and is_internal(href):
             resources['internal_resources'] += 1
-        elif href_url:
+        elif href:
             resources['external_resources'] += 1
     
     # Count images
-    for img in soup.find_all('img', src=True):
+    for img in doc.find_all('img'):
+        src = doc.get(img, 'src')
+        if src is None:
+            continue
         resources['images'] += 1
-        src_url = urljoin(url, img['src'])
-        if urlparse(src_url).netloc == domain:
+        if is_internal(src):
             resources['internal_resources'] += 1
         else:
             resources['external_resources'] += 1
     
     # Count fonts (approximation based on font-face in style tags and font URLs)
-    for font_link in soup.find_all('link', href=re.compile(r'\\.(woff|woff2|ttf|eot)')):
+    for font_link in links:
+        href = doc.get(font_link, 'href')
+        if href is None or not FONT_HREF.search(href):
+            continue
         resources['fonts'] += 1
-        href_url = urljoin(url, font_link['href'])
-        if urlparse(href_url).netloc == domain:
+        if is_internal(href):
             resources['internal_resources'] += 1
         else:
             resources['external_resources'] += 1
     
     # Count videos
-    for video in soup.find_all(['video', 'iframe']):
-        if video.name == 'video' or (video.name == 'iframe' and any(s in video.get('src', '') for s in ['youtube', 'vimeo', 'dailymotion'])):
+    for video in doc.find_all('video', 'iframe'):
+        src = doc.get(video, 'src', '')
+        if doc.name(video) == 'video' or any(s in src for s in ['youtube', 'vimeo', 'dailymotion']):
             resources['videos'] += 1
-            src_url = urljoin(url, video.get('src', ''))
-            if src_url and urlparse(src_url).netloc == domain:
+            if is_internal(src):
                 resources['internal_resources'] += 1
-            elif src_url:
+            else:
                 resources['external_resources'] += 1
     
     # Count audios
-    for audio in soup.find_all('audio', src=True):
+    for audio in doc.find_all('audio'):
+        src = doc.get(audio, 'src')
+        if src is None:
+            continue
         resources['audios'] += 1
-        src_url = urljoin(url, audio['src'])
-        if urlparse(src_url).netloc == domain:
+        if is_internal(src):
             resources['internal_resources'] += 1
         else:
             resources['external_resources'] += 1
     
     return resources
 
-def extract_metadata(soup, url):
+def extract_metadata(doc, url):
     """Extract metadata from the page"""
+    title = doc.find('title')
     metadata = {
-        'title': soup.title.string if soup.title else "No Title",
+        'title': doc.string(title) if title is not None else "No Title",
         'meta_description': "",
         'meta_keywords': "",
         'favicon': "",
@@ -297,42 +1663,426 @@ def extract_metadata(soup, url):
         'og_image': "",
     }
     
-    for meta in soup.find_all('meta'):
-        if meta.get('name') == 'description':
-            metadata['meta_description'] = meta.get('content', '')
-        elif meta.get('name') == 'keywords':
-            metadata['meta_keywords'] = meta.get('content', '')
-        elif meta.get('property') == 'og:title':
-            metadata['og_title'] = meta.get('content', '')
-        elif meta.get('property') == 'og:description':
-            metadata['og_description'] = meta.get('content', '')
-        elif meta.get('property') == 'og:image':
-            metadata['og_image'] = meta.get('content', '')
-
-    favicon_link = soup.find('link', rel=re.compile(r'^(shortcut )?icon$', re.I))
-    if favicon_link:
-        metadata['favicon'] = urljoin(url, favicon_link.get('href', ''))
+    for meta in doc.find_all('meta'):
+        name = doc.get(meta, 'name')
+        prop = doc.get(meta, 'property')
+        if name == 'description':
+            metadata['meta_description'] = doc.get(meta, 'content', '')
+        elif name == 'keywords':
+            metadata['meta_keywords'] = doc.get(meta, 'content', '')
+        elif prop == 'og:title':
+            metadata['og_title'] = doc.get(meta, 'content', '')
+        elif prop == 'og:description':
+            metadata['og_description'] = doc.get(meta, 'content', '')
+        elif prop == 'og:image':
+            metadata['og_image'] = doc.get(meta, 'content', '')
+
+    favicon_link = canonical_link = None
+    for link in doc.find_all('link'):
+        rel = doc.get(link, 'rel')
+        if rel is None:
+            continue
+        rel = rel.split()
+        if favicon_link is None and any(FAVICON_REL.search(value) for value in rel + [' '.join(rel)]):
+            favicon_link = link
+        if canonical_link is None and 'canonical' in rel:
+            canonical_link = link
+    if favicon_link is not None:
+        metadata['favicon'] = url_resolver.resolve(url, doc.get(favicon_link, 'href', ''))[0]
     
-    canonical_link = soup.find('link', rel='canonical')
-    if canonical_link:
-        metadata['canonical_url'] = canonical_link.get('href', '')
+    if canonical_link is not None:
+        metadata['canonical_url'] = doc.get(canonical_link, 'href', '')
 
     return metadata
 
-def save_results(results):
-    """Save results to JSON and CSV files"""
-    os.makedirs('data', exist_ok=True)
+class PageMetrics:
+    """Gather what extract_metadata, analyze_link_quality and
+    count_resources compute, and the words' count and SimHash, from parse
+    events in document order.
 
-    json_path = 'data/results.json'
-    with open(json_path, 'w', encoding='utf-8') as json_file:
-        json.dump(results, json_file, indent=4, ensure_ascii=False)
+    Call start(name, attrs) and end(name) for each element, with attrs a
+    mapping of its attributes, text() for each piece of page text and
+    cdata() for a CDATA section. The first <title>'s string is not worked
+    out here: pass it to title(). finish() returns (metadata,
+    link_analysis, resources, word_count, fingerprint).
+    """
 
-    csv_path = 'data/results.csv'
-    with open(csv_path, 'w', newline='', encoding='utf-8') as csv_file:
-        if results:
-            fieldnames = results[0].keys()
-            writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-            writer.writeheader()
+    def __init__(self, url):
+        self.url = url
+        self.metadata = {
+            'title': "No Title",
+            'meta_description': "",
+            'meta_keywords': "",
+            'favicon': "",
+            'canonical_url': "",
+            'og_title': "",
+            'og_description': "",
+            'og_image': "",
+        }
+        self.internal_links = []
+        self.external_links = []
+        self.nofollow_links = 0
+        self.empty_anchor_texts = 0
+        self.generic_anchor_texts = 0
+        self.keyword_rich_anchor_texts = 0
+        self.resources = {
+            'js_files': 0,
+            'css_files': 0,
+            'images': 0,
+            'fonts': 0,
+            'videos': 0,
+            'audios': 0,
+            'other': 0,
+            'internal_resources': 0,
+            'external_resources': 0
+        }
+        self.words = SimHasher()
+        self.seen_title = False
+        self.favicon_href = self.canonical_href = None
+        # Text pieces of each <a> being walked, None for links that are not counted
+        self.anchors = []
+
+    def _count_resource(self, href):
+        if url_resolver.resolve(self.url, href)[3]:
+            self.resources['internal_resources'] += 1
+        else:
+            self.resources['external_resources'] += 1
+
+    def title(self, string):
+        if not self.seen_title:
+            self.seen_title = True
+            self.metadata['title'] = string
+
+    def text(self, data):
+        self.words.update(data.split())
+        if self.anchors:
+            piece = data.strip()
+            if piece:
+                for anchor in self.anchors:
+                    if anchor is not None:
+                        anchor.append(piece)
+
+    def cdata(self, data):
+        # Page text and, as get_text() counts CData, part of the open elements' text
+        self.text(data)
+
+    def start(self, name, attrs):
+        url = self.url
+        resources = self.resources
+        if name == 'a':
+            href = attrs.get('href')
+            if href is None:
+                self.anchors.append(None)
+                return
+            full_url, _, valid, internal = url_resolver.resolve(url, href)
+            if not valid:
+                self.anchors.append(None)
+                return
+            self.anchors.append([])
+            if internal:
+                self.internal_links.append(full_url)
+            else:
+                self.external_links.append(full_url)
+            rel = attrs.get('rel') or ''
+            if 'nofollow' in (' '.join(rel) if isinstance(rel, list) else rel).split():
+                self.nofollow_links += 1
+
+        elif name == 'link':
+            rel = attrs.get('rel')
+            href = attrs.get('href')
+            if rel is not None:
+                rel = rel if isinstance(rel, list) else rel.split()
+                if self.favicon_href is None and any(FAVICON_REL.search(value) for value in rel + [' '.join(rel)]):
+                    self.favicon_href = attrs.get('href', '')
+                if self.canonical_href is None and 'canonical' in rel:
+                    self.canonical_href = attrs.get('href', '')
+                if 'stylesheet' in rel:
+                    resources['css_files'] += 1
+                    if href:
+                        self._count_resource(href)
+            if href is not None and FONT_HREF.search(href):
+                resources['fonts'] += 1
+                self._count_resource(href)
+
+        elif name == 'meta':
+            meta_name = attrs.get('name')
+            prop = attrs.get('property')
+            if meta_name == 'description':
+                self.metadata['meta_description'] = attrs.get('content', '')
+            elif meta_name == 'keywords':
+                self.metadata['meta_keywords'] = attrs.get('content', '')
+            elif prop == 'og:title':
+                self.metadata['og_title'] = attrs.get('content', '')
+            elif prop == 'og:description':
+                self.metadata['og_description'] = attrs.get('content', '')
+            elif prop == 'og:image':
+                self.metadata['og_image'] = attrs.get('content', '')
+
+        elif name in ('script', 'img', 'audio'):
+            src = attrs.get('src')
+            if src is not None:
+                resources[{'script': 'js_files', 'img': 'images', 'audio': 'audios'}[name]] += 1
+                self._count_resource(src)
+
+        elif name == 'video' or name == 'iframe':
+            src = attrs.get('src', '')
+            if name == 'video' or any(s in src for s in ['youtube', 'vimeo', 'dailymotion']):
+                resources['videos'] += 1
+                self._count_resource(src)
+
+    def end(self, name):
+        if name != 'a':
+            return
+        anchor = self.anchors.pop()
+        if anchor is None:
+            return
+        anchor_text = ''.join(anchor).lower()
+        if not anchor_text:
+            self.empty_anchor_texts += 1
+        elif any(pattern in anchor_text for pattern in GENERIC_ANCHOR_TEXTS):
+            self.generic_anchor_texts += 1
+        elif len(anchor_text.split()) >= 3:
+            self.keyword_rich_anchor_texts += 1
+
+    def finish(self):
+        # Elements left open end with the page
+        while self.anchors:
+            self.end('a')
+        metadata = self.metadata
+        if self.favicon_href is not None:
+            metadata['favicon'] = url_resolver.resolve(self.url, self.favicon_href)[0]
+        if self.canonical_href is not None:
+            metadata['canonical_url'] = self.canonical_href
+
+        internal_links, external_links = self.internal_links, self.external_links
+        link_analysis = {
+            'internal_links': internal_links,
+            'external_links': external_links,
+            'internal_link_count': len(internal_links),
+            'external_link_count': len(external_links),
+            'nofollow_link_count': self.nofollow_links,
+            'empty_anchor_text_count': self.empty_anchor_texts,
+            'generic_anchor_text_count': self.generic_anchor_texts,
+            'keyword_rich_anchor_text_count': self.keyword_rich_anchor_texts,
+            'internal_external_ratio': len(internal_links) / max(len(external_links), 1),
+            'total_link_count': len(internal_links) + len(external_links)
+        }
+        return metadata, link_analysis, self.resources, self.words.word_count, self.words.digest()
+
+def extract_page(doc, url):
+    """Run extract_metadata, analyze_link_quality and count_resources and
+    count and fingerprint the page's words, all in one walk over doc's
+    events (see PageMetrics).
+
+    Returns (metadata, link_analysis, resources, word_count, fingerprint),
+    the same as the separate analyzers, len(doc.words()) and
+    simhash(doc.words()) give.
+    """
+    metrics = PageMetrics(url)
+    for event, node in doc.events():
+        if event == 'text':
+            metrics.text(node)
+        elif event == 'start':
+            name = doc.name(node)
+            if name == 'title':
+                metrics.title(doc.string(node))
+            else:
+                metrics.start(name, doc.attrs(node))
+        elif event == 'end':
+            metrics.end(doc.name(node))
+        else:
+            metrics.cdata(node)
+    return metrics.finish()
+
+# Elements BeautifulSoup with html.parser closes as soon as they open
+VOID_TAGS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta',
+    'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex',
+    'nextid', 'spacer',
+])
+
+class StreamingExtractor(HTMLParser):
+    """Analyze a page chunk by chunk as it downloads, without building a tree.
+
+    Python's HTML tokenizer is fed the body, and its tokens are turned into
+    the PageMetrics events a BeautifulSoup tree built with html.parser
+    would give, so the results are the html.parser backend's while memory
+    holds a few words and the links found so far rather than the page.
+
+    feed_bytes() takes the body's chunks, decoding them with encoding, and
+    new_links() hands out the internal links found since it was last
+    called, so they can be queued before the download is done. close()
+    finishes the page and sets extracted to what extract_page would have
+    returned. size counts the bytes fed.
+    """
+
+    def __init__(self, url, encoding=None):
+        super().__init__(convert_charrefs=False)
+        self.metrics = PageMetrics(url)
+        try:
+            self.decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+        except LookupError:
+            # A charset Python does not know, read as analyze_raw_page does
+            self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.size = 0
+        self.published = 0
+        self.extracted = None
+        # Names of the open elements, innermost last
+        self.open_tags = []
+        # Void elements whose stray end tag is still to be ignored
+        self.closed_voids = []
+        # Open elements whose text is not page text
+        self.textless = 0
+        # Text since the last token, which BeautifulSoup keeps as one string
+        self.data = []
+        # The first <title>'s children and those of the elements open in it,
+        # as ('string', value) or ('tag', children), to find its string
+        self.title_stack = None
+        self.title_depth = None
+
+    def feed_bytes(self, chunk):
+        self.size += len(chunk)
+        self.feed(self.decoder.decode(chunk))
+
+    def new_links(self):
+        links = self.metrics.internal_links[self.published:]
+        self.published += len(links)
+        return links
+
+    def close(self):
+        self.feed(self.decoder.decode(b'', final=True))
+        super().close()
+        self._flush()
+        if self.title_stack is not None:
+            # An unclosed title holds the rest of the page
+            self.metrics.title(self._string(self.title_stack[0]))
+            self.title_stack = None
+        self.extracted = self.metrics.finish()
+        return self.extracted
+
+    @classmethod
+    def _string(cls, children):
+        """The only string in children, the way Tag.string finds it"""
+        if len(children) != 1:
+            return None
+        kind, value = children[0]
+        return value if kind == 'string' else cls._string(value)
+
+    def _add_string(self, value):
+        if self.title_stack is not None:
+            if not value.strip(' \n\t\f\r'):
+                # BeautifulSoup collapses strings of ASCII whitespace
+                value = '\n' if '\n' in value else ' '
+            self.title_stack[-1].append(('string', value))
+
+    def _flush(self):
+        data = ''.join(self.data)
+        self.data = []
+        if not data:
+            return
+        self._add_string(data)
+        if not self.textless:
+            self.metrics.text(data)
+
+    def _open(self, tag, attrs):
+        self._flush()
+        if self.title_stack is not None:
+            child = []
+            self.title_stack[-1].append(('tag', child))
+            self.title_stack.append(child)
+        if tag == 'title':
+            if not self.metrics.seen_title and self.title_stack is None:
+                self.title_stack = [[]]
+                self.title_depth = len(self.open_tags)
+        else:
+            self.metrics.start(tag, {name: '' if value is None else value for name, value in attrs})
+        if tag in TEXTLESS_TAGS:
+            self.textless += 1
+        self.open_tags.append(tag)
+
+    def _close(self, tag):
+        """Close the innermost open tag named tag, and all inside it"""
+        self._flush()
+        if tag not in self.open_tags:
+            return
+        while True:
+            name = self.open_tags.pop()
+            if name in TEXTLESS_TAGS:
+                self.textless -= 1
+            if self.title_stack is not None:
+                if len(self.open_tags) == self.title_depth:
+                    self.metrics.title(self._string(self.title_stack[0]))
+                    self.title_stack = None
+                else:
+                    self.title_stack.pop()
+            self.metrics.end(name)
+            if name == tag:
+                return
+
+    def handle_starttag(self, tag, attrs):
+        self._open(tag, attrs)
+        if tag in VOID_TAGS:
+            self._close(tag)
+            self.closed_voids.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._open(tag, attrs)
+        self._close(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.closed_voids:
+            self.closed_voids.remove(tag)
+        else:
+            self._close(tag)
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def handle_charref(self, name):
+        code = int(name[1:], 16) if name[0] in 'xX' else int(name)
+        self.data.append(UnicodeDammit.numeric_character_reference(code)[0])
+
+    def handle_entityref(self, name):
+        self.data.append(EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name, '&' + name))
+
+    def handle_comment(self, data):
+        self._flush()
+        self._add_string(data)
+
+    def handle_decl(self, decl):
+        self._flush()
+        self._add_string(decl)
+
+    def handle_pi(self, data):
+        self._flush()
+        self._add_string(data)
+
+    def unknown_decl(self, data):
+        self._flush()
+        if data.upper().startswith('CDATA['):
+            data = data[len('CDATA['):]
+            self.metrics.cdata(data)
+        self._add_string(data)
+
+def save_results(results, failed_urls=None):
+    """Save results to JSON and CSV files, and failed pages to their own JSON file"""
+    os.makedirs('data', exist_ok=True)
+
+    if failed_urls is not None:
+        with open('data/failed_urls.json', 'w', encoding='utf-8') as json_file:
+            json.dump(failed_urls, json_file, indent=4, ensure_ascii=False)
+
+    json_path = 'data/results.json'
+    with open(json_path, 'w', encoding='utf-8') as json_file:
+        json.dump(results, json_file, indent=4, ensure_ascii=False)
+
+    csv_path = 'data/results.csv'
+    with open(csv_path, 'w', newline='', encoding='utf-8') as csv_file:
+        if results:
+            # Rows reused from older runs may lack columns added since
+            fieldnames = list(dict.fromkeys(key for result in results for key in result))
+            writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+            writer.writeheader()
             writer.writerows(results)
             
     # Save a simplified version for easier processing
@@ -357,17 +2107,798 @@ def save_results(results):
     with open(simple_json_path, 'w', encoding='utf-8') as json_file:
         json.dump(simple_results, json_file, indent=4, ensure_ascii=False)
 
-def crawl(url, depth, max_pages=100, timeout=10, requests_per_second=2, rotate_agent_after=10):
-    """Main crawl function with smart rate limiting and user agent rotation"""
-    visited = set()
+def load_previous_results(data_dir='data', strip_params=TRACKING_PARAMS, include_archive=True,
+                          strip_trailing_slash=False):
+    """Return the most recent result row for every URL crawled before.
+
+    Reads results.json and then, unless include_archive is False, the
+    archived runs from newest to oldest, keyed by canonical URL so rows
+    from any earlier run can be reused.
+    """
+    paths = [os.path.join(data_dir, 'results.json')]
+    if include_archive:
+        paths += sorted(glob.glob(os.path.join(data_dir, 'archive', 'results_*.json')), reverse=True)
+
+    previous = {}
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                rows = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for row in rows:
+            if isinstance(row, dict) and row.get('url'):
+                previous.setdefault(canonicalize_url(row['url'], strip_params, strip_trailing_slash), row)
+    return previous
+
+_json_cache_lock = threading.Lock()
+
+def update_json_cache(path, entries, changed):
+    """Write the entries whose keys are in changed into the JSON object at path.
+
+    Keys in changed that are no longer in entries are removed. Everything
+    else in the file is kept, so crawls running side by side (as in a batch)
+    can share one cache file without undoing each other's updates.
+    """
+    with _json_cache_lock:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                on_disk = json.load(f)
+        except (OSError, ValueError):
+            on_disk = {}
+        for key in changed:
+            if key in entries:
+                on_disk[key] = entries[key]
+            else:
+                on_disk.pop(key, None)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(on_disk, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+class ValidatorCache:
+    """Per-URL HTTP validators (ETag / Last-Modified) kept between runs.
+
+    Each entry also stores the page's internal links, since result rows
+    only keep link counts and a 304 response has no body to parse.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # URLs whose entry was added, changed or dropped since the last save
+        self.changed = set()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def conditional_headers(self, url):
+        """Return the If-None-Match / If-Modified-Since headers for url"""
+        entry = self.entries.get(url, {})
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def update(self, url, response_headers):
+        """Remember the validators of a freshly downloaded page"""
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        if etag or last_modified:
+            self.entries[url] = {'etag': etag, 'last_modified': last_modified, 'links': []}
+        else:
+            self.entries.pop(url, None)
+        self.changed.add(url)
+
+    def __contains__(self, url):
+        return url in self.entries
+
+    def set_links(self, url, links, create=False):
+        """Store the internal links of url, adding an entry for it if create is set"""
+        if create and url not in self.entries:
+            self.entries[url] = {'etag': None, 'last_modified': None, 'links': []}
+        if url in self.entries:
+            self.entries[url]['links'] = list(links)
+            self.changed.add(url)
+
+    def links(self, url):
+        return self.entries.get(url, {}).get('links', [])
+
+    def save(self):
+        update_json_cache(self.path, self.entries, self.changed)
+        self.changed.clear()
+
+ROBOTS_USER_AGENT = 'PagesXcrawler'
+ROBOTS_MAX_SIZE = 500 * 1024
+
+class RobotsRules:
+    """The Allow/Disallow rules of one robots.txt group, matched as in RFC 9309.
+
+    The longest matching rule wins and Allow wins ties. Plain rules are
+    looked up in a dict, one probe per distinct rule length. Rules using *
+    or $ are grouped by the literal text before their first *, found the
+    same way, and each group is screened with one combined regular
+    expression before its rules are tried one by one.
+    """
+
+    def __init__(self, rules=(), crawl_delay=None, sitemaps=()):
+        self.rules = [(bool(allow), pattern) for allow, pattern in rules]
+        self.crawl_delay = crawl_delay
+        self.sitemaps = list(sitemaps)
+        self.prefixes = {}
+        groups = defaultdict(list)
+        for allow, pattern in self.rules:
+            if not pattern:
+                continue  # "Disallow:" with no path allows everything
+            if '*' in pattern or pattern.endswith('$'):
+                anchored = pattern.endswith('$')
+                parts = (pattern[:-1] if anchored else pattern).split('*')
+                source = '.*'.join(map(re.escape, parts)) + ('$' if anchored else '')
+                groups[parts[0]].append((len(pattern), allow, source))
+            else:
+                self.prefixes[pattern] = self.prefixes.get(pattern, False) or allow
+        self.lengths = sorted({len(prefix) for prefix in self.prefixes}, reverse=True)
+
+        self.wildcards = {}
+        for prefix, rules in groups.items():
+            # Longest first, and Allow before Disallow at equal length
+            rules.sort(key=lambda rule: (-rule[0], not rule[1]))
+            screen = re.compile('|'.join(f'(?:{source})' for _, _, source in rules))
+            self.wildcards[prefix] = (screen, [(length, allow, re.compile(source))
+                                               for length, allow, source in rules])
+        self.wildcard_lengths = sorted({len(prefix) for prefix in self.wildcards})
+
+    @classmethod
+    def parse(cls, text, user_agent=ROBOTS_USER_AGENT):
+        """Parse robots.txt, keeping the group for user_agent (or for *)"""
+        groups = {}
+        sitemaps = []
+        current = []
+        reading_agents = False
+        for line in text.splitlines():
+            field, _, value = line.split('#', 1)[0].partition(':')
+            field = field.strip().lower()
+            value = value.strip()
+            if field == 'user-agent':
+                if not reading_agents:
+                    current = []
+                    reading_agents = True
+                agent = value.split('/')[0].strip().lower()
+                current.append(groups.setdefault(agent, {'rules': [], 'crawl_delay': None}))
+            elif field in ('allow', 'disallow'):
+                reading_agents = False
+                for group in current:
+                    group['rules'].append((field == 'allow', value))
+            elif field == 'crawl-delay':
+                reading_agents = False
+                try:
+                    delay = float(value)
+                except ValueError:
+                    continue
+                for group in current:
+                    group['crawl_delay'] = delay
+            elif field == 'sitemap' and value:
+                sitemaps.append(value)
+
+        group = groups.get(user_agent.lower()) or groups.get('*') or {'rules': [], 'crawl_delay': None}
+        return cls(group['rules'], group['crawl_delay'], sitemaps)
+
+    def allowed(self, path):
+        """Check a path (with its query string) against the rules"""
+        best_length, best_allow = -1, True
+        for length in self.lengths:
+            if length <= len(path) and path[:length] in self.prefixes:
+                best_length, best_allow = length, self.prefixes[path[:length]]
+                break
+        for prefix_length in self.wildcard_lengths:
+            if prefix_length > len(path):
+                break
+            group = self.wildcards.get(path[:prefix_length])
+            if group is None or not group[0].match(path):
+                continue
+            for length, allow, regex in group[1]:
+                if length < best_length or (length == best_length and (best_allow or not allow)):
+                    break
+                if regex.match(path):
+                    best_length, best_allow = length, allow
+                    break
+        return best_allow
+
+class RobotsCache:
+    """robots.txt rules per host, kept in memory and in a JSON file for ttl hours.
+
+    fetch(robots_url) returns a (status_code, text) tuple and is only called
+    for hosts without a fresh entry. A 4xx means no restrictions; a 5xx or a
+    failed request disallows the whole host and is not saved to disk, so the
+    next run asks again.
+    """
+
+    def __init__(self, fetch, path=None, ttl=24, user_agent=ROBOTS_USER_AGENT):
+        self.fetch = fetch
+        self.path = path
+        self.ttl = ttl * 3600
+        self.user_agent = user_agent
+        self.hosts = {}
+        self.entries = {}
+        self.changed = set()
+        if path:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def rules(self, url):
+        """Return the RobotsRules for url's host, fetching robots.txt if needed"""
+        parsed = urlparse(url)
+        origin = f'{parsed.scheme}://{parsed.netloc}'
+        expires, rules = self.hosts.get(origin, (0, None))
+        if rules is not None and time.time() < expires:
+            return rules
+
+        entry = self.entries.get(origin)
+        if entry is None or time.time() - entry['fetched'] > self.ttl:
+            entry = self._fetch(origin)
+        rules = RobotsRules(entry['rules'], entry['crawl_delay'], entry['sitemaps'])
+        self.hosts[origin] = (entry['fetched'] + self.ttl, rules)
+        return rules
+
+    def _fetch(self, origin):
+        entry = {'fetched': time.time(), 'rules': [], 'crawl_delay': None, 'sitemaps': []}
+        try:
+            status_code, text = self.fetch(origin + '/robots.txt')
+        except requests.RequestException as e:
+            status_code, text = None, str(e)
+        if status_code is None or status_code >= 500:
+            logging.warning(f"Could not fetch {origin}/robots.txt ({status_code or text}), "
+                            f"treating the host as disallowed")
+            entry['rules'] = [(False, '/')]
+            return entry
+        if 200 <= status_code < 300:
+            rules = RobotsRules.parse(text, self.user_agent)
+            entry.update(rules=rules.rules, crawl_delay=rules.crawl_delay, sitemaps=rules.sitemaps)
+        self.entries[origin] = entry
+        self.changed.add(origin)
+        return entry
+
+    def allowed(self, url):
+        """Check whether robots.txt lets us fetch url"""
+        parsed = urlparse(url)
+        path = (parsed.path or '/') + ('?' + parsed.query if parsed.query else '')
+        return self.rules(url).allowed(path)
+
+    def save(self):
+        if not self.path:
+            return
+        update_json_cache(self.path, self.entries, self.changed)
+        self.changed.clear()
+
+SITEMAP_MAX_FILES = 50
+
+def parse_lastmod(value):
+    """Parse a sitemap <lastmod> (W3C datetime) as a naive local datetime, or None"""
+    value = (value or '').strip()
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    for parse in (datetime.fromisoformat,
+                  lambda v: datetime.strptime(v, '%Y-%m'),
+                  lambda v: datetime.strptime(v, '%Y')):
+        try:
+            parsed = parse(value)
+        except ValueError:
+            continue
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone().replace(tzinfo=None)
+        return parsed
+    return None
+
+def open_sitemap(response):
+    """Return a file-like view of a streamed sitemap response, gunzipping .xml.gz bodies"""
+    response.raw.decode_content = True
+    # Let the buffer see end-of-file instead of a closed stream
+    response.raw.auto_close = False
+    stream = io.BufferedReader(response.raw)
+    if stream.peek(2)[:2] == b'\x1f\x8b':
+        stream = gzip.GzipFile(fileobj=stream)
+    return stream
+
+def iter_sitemap(stream):
+    """Yield (kind, loc, lastmod) for each entry of a sitemap or sitemap index.
+
+    kind is 'url' for pages and 'sitemap' for the children of an index. The
+    XML is parsed incrementally and each entry is dropped once yielded, so
+    memory stays flat however many URLs the sitemap lists.
+    """
+    root = None
+    for event, elem in ElementTree.iterparse(stream, events=('start', 'end')):
+        if root is None:
+            root = elem
+        if event != 'end':
+            continue
+        kind = elem.tag.rsplit('}', 1)[-1]
+        if kind not in ('url', 'sitemap'):
+            continue
+        loc = lastmod = None
+        for child in elem:
+            name = child.tag.rsplit('}', 1)[-1]
+            if name == 'loc':
+                loc = (child.text or '').strip()
+            elif name == 'lastmod':
+                lastmod = parse_lastmod(child.text)
+        if loc:
+            yield kind, loc, lastmod
+        root.clear()
+
+def analyze_page(html, url, current_depth, content_size, status_code, wire_size=None, parser=None,
+                 base_url=None):
+    """Parse an HTML page and build its result row.
+
+    parser names one of HTML_PARSERS, by default the fastest installed.
+    Links are resolved against base_url, the URL the page was served from,
+    which defaults to url. Returns a (result, internal_links) tuple so the
+    caller can decide which links to follow next.
+    """
+    # Metadata, links, resources and words in one pass over the page
+    return page_result(url, current_depth, content_size, status_code, wire_size,
+                       *extract_page(parse_html(html, parser), base_url or url))
+
+def page_result(url, current_depth, content_size, status_code, wire_size,
+                metadata, link_analysis, resource_counts, word_count, fingerprint):
+    """Build a page's result row from what extract_page or a
+    StreamingExtractor found in it, returning (result, internal_links)."""
+    internal_links = link_analysis['internal_links']
+
+    # Analyze URL structure
+    url_structure = analyze_url_structure(url)
+
+    # Count images (already counted in resource_counts but kept for backward compatibility)
+    image_count = resource_counts['images']
+
+    crawl_timestamp = datetime.now().isoformat()
+
+    # Prepare result with all the new metrics
+    result = {
+        'url': url,
+        'depth': current_depth,
+        **metadata,
+        # URL structure metrics
+        'url_length': url_structure['url_length'],
+        'url_params_count': url_structure['params_count'],
+        'url_path_depth': url_structure['path_depth'],
+
+        # Link metrics
+        'internal_link_count': link_analysis['internal_link_count'],
+        'external_link_count': link_analysis['external_link_count'],
+        'nofollow_link_count': link_analysis['nofollow_link_count'],
+        'empty_anchor_text_count': link_analysis['empty_anchor_text_count'],
+        'generic_anchor_text_count': link_analysis['generic_anchor_text_count'],
+        'keyword_rich_anchor_text_count': link_analysis['keyword_rich_anchor_text_count'],
+        'internal_external_ratio': link_analysis['internal_external_ratio'],
+        'total_link_count': link_analysis['total_link_count'],
+
+        # Resource metrics
+        'js_files_count': resource_counts['js_files'],
+        'css_files_count': resource_counts['css_files'],
+        'image_count': image_count,
+        'font_count': resource_counts['fonts'],
+        'video_count': resource_counts['videos'],
+        'audio_count': resource_counts['audios'],
+        'internal_resources_count': resource_counts['internal_resources'],
+        'external_resources_count': resource_counts['external_resources'],
+
+        # Basic metrics (kept for backward compatibility)
+        'word_count': word_count,
+        'content_size': content_size,
+        'wire_size': content_size if wire_size is None else wire_size,
+        'decoded_size': content_size,
+        'crawl_timestamp': crawl_timestamp,
+        'status_code': status_code,
+
+        # Near-duplicate detection; duplicate_of is filled in by the crawler
+        'content_simhash': f'{fingerprint:016x}',
+        'duplicate_of': '',
+
+        # Re-crawl bookkeeping; rows reused from an earlier run set unchanged
+        'last_fetched': crawl_timestamp,
+        'unchanged': False
+    }
+
+    return result, internal_links
+
+def analyze_raw_page(body, encoding, url, current_depth, content_size, status_code, wire_size=None,
+                     parser=None, base_url=None):
+    """Decode a fetched body the way requests does and analyze it.
+
+    Takes only plain values so it can run in a worker process. A body that
+    is a StreamingExtractor was analyzed as it downloaded, and only its
+    result row is built. base_url is as for analyze_page.
+    """
+    if isinstance(body, StreamingExtractor):
+        return page_result(url, current_depth, content_size, status_code, wire_size, *body.extracted)
+    try:
+        html = str(body, encoding or 'utf-8', errors='replace')
+    except LookupError:
+        # A charset Python does not know
+        html = str(body, 'utf-8', errors='replace')
+    return analyze_page(html, url, current_depth, content_size, status_code, wire_size=wire_size,
+                        parser=parser, base_url=base_url)
+
+CHECKPOINT_FILE = 'checkpoint.pkl'
+
+def save_checkpoint(checkpoint_dir, state):
+    """Write a crawl checkpoint, replacing the previous one.
+
+    The new file is written in full, then the frontier database is
+    committed, then the file is swapped in. A process killed between the
+    commit and the swap leaves the database a generation ahead of the
+    checkpoint file, and load_checkpoint finishes the swap.
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    path = os.path.join(checkpoint_dir, CHECKPOINT_FILE)
+    frontier = state['frontier']
+    frontier.generation += 1
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    frontier.commit()
+    os.replace(path + '.tmp', path)
+
+def _read_checkpoint(path):
+    """Unpickle a checkpoint file, or return None if it was cut short"""
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (EOFError, pickle.UnpicklingError):
+        return None
+
+def load_checkpoint(checkpoint_dir):
+    """Return the state saved in checkpoint_dir, or None if there is none.
+
+    A new checkpoint file left unswapped is used when the frontier
+    database was committed for it, and discarded otherwise. A checkpoint
+    that does not match its frontier database is not used.
+    """
+    path = os.path.join(checkpoint_dir, CHECKPOINT_FILE)
+    if os.path.exists(path + '.tmp'):
+        state = _read_checkpoint(path + '.tmp')
+        frontier = state and state['frontier']
+        if frontier is not None and frontier.committed_generation() == frontier.generation:
+            os.replace(path + '.tmp', path)
+            return state
+        os.remove(path + '.tmp')
+    if not os.path.exists(path):
+        return None
+    state = _read_checkpoint(path)
+    frontier = state and state['frontier']
+    if frontier is None or frontier.committed_generation() != frontier.generation:
+        logging.warning(f"Checkpoint in {checkpoint_dir} does not match its frontier, ignoring it")
+        return None
+    return state
+
+def crawl(url, depth, max_pages=100, timeout=10, requests_per_second=2, rotate_agent_after=10,
+          engine='sync', concurrency=8, per_host_concurrency=2, parse_workers=0,
+          parse_queue_size=None, strategy='bfs', scorer=None, frontier_dir=None,
+          strip_params=TRACKING_PARAMS, follow_canonical=False, seen_set='set',
+          bloom_capacity=None, bloom_error_rate=0.001, near_duplicate_threshold=3,
+          validator_cache=None, incremental=False, recrawl_after=24, checkpoint_dir=None,
+          checkpoint_every=50, resume=False, max_body_size=10 * 1024 * 1024, robots_txt=True,
+          robots_cache=None, robots_ttl=24, sitemaps=False, adaptive=False,
+          max_requests_per_second=10, max_retries=MAX_RETRIES, retry_base_delay=RETRY_BASE_DELAY,
+          failed_urls=None, request_slot=None, max_duration=None, drain_grace=None,
+          html_parser=None, stream_parse=False, strip_trailing_slash=False):
+    """Main crawl function with smart rate limiting and user agent rotation
+
+    engine selects how pages are fetched: 'sync' fetches one page at a time,
+    'async' keeps up to `concurrency` requests in flight with at most
+    `per_host_concurrency` of them against any single host. With the async
+    engine, parse_workers > 0 moves HTML analysis into that many processes
+    fed by a parse queue of parse_queue_size pages (default 2 per worker).
+    html_parser names the parser pages are analyzed with (see HTML_PARSERS);
+    by default lxml when it is installed and html.parser otherwise.
+
+    stream_parse analyzes each page with a StreamingExtractor while it
+    downloads instead of parsing the whole body afterwards, so memory per
+    page stays flat and the page's internal links are queued chunk by chunk
+    before its download ends. Results are those of html.parser. Links
+    queued early are followed even if the page then turns out to be too
+    large or a near-duplicate. Parse workers are not used with it.
+
+    strategy picks the fetch order: 'bfs' goes level by level, 'best-first'
+    pops the URL with the lowest scorer(url, depth, inlinks) first
+    (score_url by default). frontier_dir keeps a breadth-first frontier and
+    its seen-set in SQLite under that directory instead of in memory.
+
+    Every discovered link is canonicalized (see canonicalize_url) with the
+    given strip_params and strip_trailing_slash before the seen check.
+    Pages are analyzed against the URL they were served from, so their
+    relative links resolve as a browser would, even after a redirect. follow_canonical also marks
+    the <link rel="canonical"> target of each crawled page as seen.
+
+    seen_set picks how seen URLs are stored (see create_seen_set); a Bloom
+    filter is sized for bloom_capacity URLs, by default 100 per page budget.
+    Without seen_set, an on-disk frontier keeps its seen URLs on disk too.
+
+    A page whose text SimHash is within near_duplicate_threshold bits of an
+    earlier page gets that page's url in duplicate_of and its links are not
+    followed; a negative threshold turns this off. Pages with fewer than
+    NEAR_DUPLICATE_MIN_WORDS words are never counted as near-duplicates.
+
+    validator_cache is the path of a JSON ValidatorCache. Pages crawled in an
+    earlier run are then requested conditionally, and on a 304 the previous
+    row from results.json or the archive in the same directory is reused.
+
+    incremental (which implies a validator cache, data/validators.json by
+    default) plans each page against the last run: pages fetched or
+    revalidated less than recrawl_after hours ago are reused without a
+    request, older pages are revalidated when they have validators and
+    downloaded otherwise. Rows of the seed's host from the last run that
+    this run could not reach, for its page or time budget or its depth,
+    are carried forward unchanged; pages that failed, are disallowed by
+    robots.txt or are no longer linked are not.
+
+    checkpoint_dir turns on checkpoints: every checkpoint_every pages, and
+    when the crawl is interrupted, the frontier, seen-set, rate limiter
+    state and results so far are saved there. With resume, a crawl of the
+    same seed picks up from the saved checkpoint; pages that were in flight
+    are fetched again. The checkpoint is removed once a crawl completes.
+
+    Responses are streamed: bodies that are not HTML are never downloaded,
+    and an HTML download is abandoned once it grows past max_body_size
+    bytes (0 for no limit).
+
+    With robots_txt, each host's robots.txt is fetched once and URLs it
+    disallows never enter the frontier; its Crawl-delay slows the rate
+    limiter down for that host. robots_cache is the path of a JSON file
+    that keeps the rules for robots_ttl hours across runs.
+
+    sitemaps seeds the frontier, one level below the seed, with the seed
+    host's pages listed in the sitemaps named in robots.txt (or in
+    /sitemap.xml). Sitemap indexes and gzipped sitemaps are followed, and
+    reading stops once the page budget is queued. An incremental crawl
+    trusts a page's <lastmod> over recrawl_after: the page is reused if it
+    has not changed since it was last fetched and fetched again if it has.
+
+    adaptive replaces the fixed per-host rate with AdaptiveRateLimiter,
+    which starts each host at requests_per_second and one request in
+    flight and then tunes both from response times and errors, up to
+    max_requests_per_second and per_host_concurrency.
+
+    A page whose request fails in a way that may pass (see is_transient) is
+    put aside and fetched again after an exponential backoff with jitter
+    starting at retry_base_delay seconds, up to max_retries times; the rest
+    of the frontier is crawled meanwhile. Pages that fail for good are
+    appended to failed_urls, if given, as dicts naming the error class.
+
+    request_slot, if given, is called for a context manager that every page
+    download is made inside of; crawl_batch uses it to share requests
+    between seeds.
+
+    max_duration gives the crawl a wall-clock budget in seconds, counted
+    from the start of the call. drain_grace seconds before it runs out
+    (timeout by default) no new page is started; pages in flight may
+    finish until the budget is spent and are abandoned after that. The
+    results so far are then returned as usual, the summary says how much
+    of the frontier was left, and with checkpoint_dir the checkpoint is
+    kept so a later run can resume where this one stopped.
+    """
+    url = canonicalize_url(url, strip_params, strip_trailing_slash)
+    if html_parser and html_parser not in HTML_PARSERS:
+        logging.warning(f"The {html_parser} parser is not available, parsing pages with html.parser")
+        html_parser = 'html.parser'
+    checkpoint = load_checkpoint(checkpoint_dir) if checkpoint_dir and resume else None
+    if checkpoint and checkpoint['seed'] != url:
+        logging.warning(f"Checkpoint in {checkpoint_dir} is for {checkpoint['seed']}, starting a fresh crawl")
+        checkpoint = None
+
+    if incremental and not validator_cache:
+        validator_cache = os.path.join('data', 'validators.json')
+    seen = None
+    if seen_set != 'set' or not frontier_dir:
+        seen = create_seen_set(
+            seen_set,
+            capacity=bloom_capacity or max(100_000, 100 * max_pages),
+            error_rate=bloom_error_rate
+        )
+
+    if checkpoint:
+        frontier = checkpoint['frontier']
+        if isinstance(frontier, PriorityFrontier):
+            frontier.score = scorer or score_url
+    elif frontier_dir:
+        if strategy != 'bfs':
+            logging.warning("The on-disk frontier is breadth-first only; ignoring --strategy")
+            strategy = 'bfs'
+        frontier = DiskFrontier(
+            open_frontier_db(os.path.join(frontier_dir, 'frontier.sqlite3'), reset=True),
+            max_depth=depth,
+            seen=seen
+        )
+    elif strategy == 'best-first':
+        frontier = PriorityFrontier(max_depth=depth, seen=seen, score=scorer or score_url)
+    else:
+        frontier = CrawlFrontier(max_depth=depth, seen=seen)
+    canonical_variants = set()
+    simhashes = SimHashIndex(near_duplicate_threshold) if near_duplicate_threshold >= 0 else None
+    near_duplicates = 0
+    if validator_cache:
+        validators = ValidatorCache(validator_cache)
+        previous_results = load_previous_results(os.path.dirname(validator_cache) or '.', strip_params,
+                                                 strip_trailing_slash=strip_trailing_slash)
+    else:
+        validators = None
+        previous_results = {}
+    not_modified = 0
+    bytes_saved = 0
+    skipped_fresh = 0
     results = []
     page_count = 0
-    rate_limiter = RateLimiter(
-        initial_requests_per_second=requests_per_second,
-        rotate_agent_after=rotate_agent_after
-    )
+    if adaptive:
+        rate_limiter = AdaptiveRateLimiter(
+            initial_requests_per_second=requests_per_second,
+            rotate_agent_after=rotate_agent_after,
+            max_requests_per_second=max_requests_per_second,
+            max_concurrency=per_host_concurrency if engine == 'async' else 1
+        )
+        host_limit = rate_limiter.concurrency
+    else:
+        rate_limiter = RateLimiter(
+            initial_requests_per_second=requests_per_second,
+            rotate_agent_after=rotate_agent_after
+        )
+        host_limit = lambda host: per_host_concurrency if engine == 'async' else 1
     total_size = 0
+    total_wire_size = 0
+    skipped_downloads = 0
+    bytes_skipped = 0
+    # Lookups the shared URL resolver had served before this crawl
+    resolver_hits, resolver_misses = url_resolver.hits, url_resolver.misses
     start_time = time.time()
+    # No page is started after admission_cutoff, and pages still in flight
+    # at the deadline are abandoned
+    deadline = start_time + max_duration if max_duration else None
+    admission_cutoff = None
+    if deadline is not None:
+        admission_cutoff = deadline - (timeout if drain_grace is None else drain_grace)
+    # url -> depth of pages popped from the frontier but not yet finished
+    in_flight_pages = {}
+    last_checkpoint = 0
+    robots_blocked = set()
+    # For an incremental crawl's carry-forward: links left out only for
+    # being too deep, and whether the page budget kept links out of the frontier
+    beyond_depth = set()
+    budget_cut = False
+    rate_limited = 0
+    rate_limit_retries = Counter()
+    retry_attempts = Counter()
+    retried = 0
+    if failed_urls is None:
+        failed_urls = []
+    # url -> <lastmod> of pages seeded from sitemaps
+    sitemap_lastmod = {}
+    sitemaps_read = 0
+
+    if checkpoint:
+        results = checkpoint['results']
+        page_count = last_checkpoint = checkpoint['page_count']
+        canonical_variants = checkpoint['canonical_variants']
+        rate_limiter.set_state(checkpoint['rate_limiter'])
+        counters = checkpoint['counters']
+        total_size = counters['total_size']
+        total_wire_size = counters['total_wire_size']
+        skipped_downloads = counters['skipped_downloads']
+        bytes_skipped = counters['bytes_skipped']
+        near_duplicates = counters['near_duplicates']
+        not_modified = counters['not_modified']
+        bytes_saved = counters['bytes_saved']
+        skipped_fresh = counters['skipped_fresh']
+        rate_limited = counters['rate_limited']
+        retried = counters['retried']
+        robots_blocked = counters['robots_blocked']
+        beyond_depth = checkpoint.get('beyond_depth', beyond_depth)
+        budget_cut = counters.get('budget_cut', budget_cut)
+        sitemap_lastmod = checkpoint['sitemap_lastmod']
+        failed_urls.extend(checkpoint['failed_urls'])
+        for pending_url, pending_depth in checkpoint['in_flight']:
+            frontier.requeue(pending_url, pending_depth)
+        if simhashes is not None:
+            for result in results:
+                if (result.get('content_simhash') and not result.get('duplicate_of')
+                        and result.get('word_count', 0) >= NEAR_DUPLICATE_MIN_WORDS):
+                    simhashes.add(int(result['content_simhash'], 16), result['url'])
+        logging.info(f"Resuming from checkpoint: {page_count} pages done, {len(frontier)} queued")
+
+    # One keep-alive pool per host, sized to the requests in flight per host
+    if engine == 'async':
+        session = create_session(max_hosts=max(10, concurrency), connections_per_host=per_host_concurrency)
+    else:
+        session = create_session()
+
+    robots = None
+    if robots_txt:
+        def _fetch_robots(robots_url):
+            with session.get(robots_url, stream=True, timeout=timeout,
+                             headers={'User-Agent': rate_limiter.get_next_user_agent()}) as response:
+                # Only the first ROBOTS_MAX_SIZE bytes are read, the rest is ignored
+                body = bytearray()
+                for chunk in response.iter_content(64 * 1024):
+                    body += chunk[:ROBOTS_MAX_SIZE - len(body)]
+                    if len(body) >= ROBOTS_MAX_SIZE:
+                        break
+                return response.status_code, body.decode('utf-8', errors='replace')
+
+        robots = RobotsCache(_fetch_robots, robots_cache, robots_ttl)
+
+    def _allowed(url):
+        """Check url against its host's robots.txt, applying any Crawl-delay"""
+        if robots is None:
+            return True
+        domain = urlparse(url).netloc
+        crawl_delay = robots.rules(url).crawl_delay
+        if crawl_delay and domain not in rate_limiter.min_delays:
+            rate_limiter.set_min_delay(domain, crawl_delay)
+        if robots.allowed(url):
+            return True
+        robots_blocked.add(url)
+        return False
+
+    def _sitemap_entries():
+        """Yield (url, lastmod) for the seed host's pages in its sitemaps"""
+        nonlocal sitemaps_read
+        seed_host = urlparse(url).netloc
+        listed = robots.rules(url).sitemaps if robots is not None else []
+        pending = deque(listed or [urljoin(url, '/sitemap.xml')])
+        queued = set(pending)
+        while pending and sitemaps_read < SITEMAP_MAX_FILES:
+            sitemap_url = pending.popleft()
+            rate_limiter.wait(urlparse(sitemap_url).netloc)
+            try:
+                with session.get(sitemap_url, stream=True, timeout=timeout,
+                                 headers={'User-Agent': rate_limiter.get_next_user_agent()}) as response:
+                    if response.status_code != 200:
+                        logging.info(f"No sitemap at {sitemap_url} ({response.status_code})")
+                        continue
+                    sitemaps_read += 1
+                    for kind, loc, lastmod in iter_sitemap(open_sitemap(response)):
+                        if kind == 'sitemap':
+                            if loc not in queued:
+                                queued.add(loc)
+                                pending.append(loc)
+                        elif urlparse(loc).netloc == seed_host:
+                            yield loc, lastmod
+            except (requests.RequestException, ElementTree.ParseError, OSError, EOFError) as e:
+                logging.warning(f"Could not read sitemap {sitemap_url}: {e}")
+
+    def _seed_from_sitemaps():
+        """Queue sitemap pages one level below the seed; returns how many were new"""
+        seeded = 0
+        entries = _sitemap_entries()
+        try:
+            for loc, lastmod in entries:
+                if frontier.fifo and len(frontier) >= max_pages - page_count:
+                    break
+                canonical = canonicalize_url(loc, strip_params, strip_trailing_slash)
+                if _allowed(canonical) and frontier.push(canonical, 1):
+                    seeded += 1
+                    if lastmod is not None:
+                        sitemap_lastmod[canonical] = lastmod
+        finally:
+            entries.close()
+        return seeded
+
+    sitemap_seeded = 0
+    if not checkpoint:
+        if _allowed(url):
+            frontier.push(url, 0)
+            if sitemaps:
+                sitemap_seeded = _seed_from_sitemaps()
+                logging.info(f"Queued {sitemap_seeded} pages from {sitemaps_read} sitemaps")
+        else:
+            logging.warning(f"robots.txt disallows crawling {url}")
 
     logging.info(f"""
 Starting crawl with:
@@ -375,20 +2906,23 @@ Starting crawl with:
 - Depth: {depth}
 - Max Pages: {max_pages}
 - Timeout: {timeout}s
-- Rate Limit: {requests_per_second} req/s
+- Rate Limit: {requests_per_second} req/s{f' (adaptive, up to {max_requests_per_second} req/s)' if adaptive else ''}
 - Agent Rotation: every {rotate_agent_after} requests
+- Engine: {engine} (concurrency {concurrency if engine == 'async' else 1})
+- Parse Workers: {parse_workers if engine == 'async' and not stream_parse else 0}{' (streaming pages as they download)' if stream_parse else ''}
+- Strategy: {strategy}{f' (on disk in {frontier_dir})' if frontier_dir else ''}
+- Seen Set: {type(frontier.seen).__name__}
+- robots.txt: {'respected' if robots_txt else 'ignored'}
 """)
 
-    def _crawl(url, current_depth):
-        nonlocal page_count, total_size
-
-        if current_depth > depth or url in visited or page_count >= max_pages:
-            return
-
-        domain = urlparse(url).netloc
-        visited.add(url)
-        page_count += 1
+    if parse_workers and engine != 'async':
+        logging.warning("Parse workers need the async engine; parsing inline instead")
+        parse_workers = 0
+    if parse_workers and stream_parse:
+        logging.warning("Streamed pages are analyzed as they download; not using parse workers")
+        parse_workers = 0
 
+    def _log_progress(current_depth, domain):
         # Progress update
         elapsed_time = time.time() - start_time
         rate_stats = rate_limiter.get_stats()
@@ -416,98 +2950,594 @@ Progress Update:
    +- Time: {elapsed_time:.1f}s
    +- Speed: {rate_stats['requests_per_second']:.2f} req/s
    +- Delay: {rate_limiter.delays[domain]:.2f}s
+   +- Host Limit: {_describe_host(domain)}
 """
         logging.info(progress)
 
-        # Rate limiting and user agent rotation
-        rate_limiter.wait(domain)
+    def _describe_host(domain):
+        """Summarize the rate and in-flight limit currently applied to domain"""
+        stats = rate_limiter.get_host_stats(domain)
+        description = f"{stats['requests_per_second']:.2f} req/s, {host_limit(domain)} in flight"
+        if stats['latency'] is not None:
+            description += f", {stats['latency'] * 1000:.0f} ms latency"
+        return description
+
+    def _handle_failure(url, current_depth, domain, error):
+        """Schedule a retry of a failed request, or give up on the page.
+
+        Timeouts, connection failures and 5xx responses also slow the host
+        down. Returns None when the page was put aside to be retried, like
+        a rate-limited page, and [] when there are no links to follow.
+        """
+        nonlocal page_count, retried
+        response = getattr(error, 'response', None)
+        if response is None or response.status_code >= 500:
+            rate_limiter.handle_error(domain)
+
+        if not is_transient(error):
+            _give_up(url, current_depth, error)
+            return []
+        if retry_attempts[url] >= max_retries:
+            logging.error(f"Giving up on {url} after {max_retries + 1} attempts")
+            _give_up(url, current_depth, error)
+            return []
+        retry_attempts[url] += 1
+        delay = retry_delay(retry_attempts[url], retry_base_delay)
+        logging.info(f"Retrying {url} in {delay:.1f}s (retry {retry_attempts[url]} of {max_retries})")
+        retried += 1
+        page_count -= 1
+        in_flight_pages.pop(url, None)
+        scheduler.defer(url, current_depth, delay)
+        return None
+
+    def _give_up(url, current_depth, error):
+        """Record a page that could not be crawled"""
+        response = getattr(error, 'response', None)
+        failed_urls.append({
+            'url': url,
+            'depth': current_depth,
+            'error': type(error).__name__,
+            'message': str(error),
+            'status_code': response.status_code if response is not None else None,
+            'attempts': retry_attempts.pop(url, 0) + rate_limit_retries.pop(url, 0) + 1,
+            'failed_at': datetime.now().isoformat(),
+        })
+
+    def _admitting():
+        """Whether the time budget still allows starting a page"""
+        return admission_cutoff is None or time.time() < admission_cutoff
+
+    def _until_cutoff(wait):
+        """Cut a wait (None for no limit) short at the admission cutoff"""
+        if admission_cutoff is None:
+            return wait
+        left = max(admission_cutoff - time.time(), 0)
+        return left if wait is None else min(wait, left)
+
+    def _request_timeout():
+        """The request timeout, shortened so no request outlives the deadline"""
+        if deadline is None:
+            return timeout
+        return max(min(timeout, deadline - time.time()), 0.1)
+
+    def _download(url, headers, on_links=None):
+        """Stream url, reading the body only for an HTML page within max_body_size.
+
+        Returns (response, body), with body None when it was not read. With
+        stream_parse, body is the StreamingExtractor that analyzed it and
+        on_links gets the page's internal links as they are found. Raises
+        DeadlineExceeded for a body still arriving at the deadline.
+        Blocks, so the async engine runs it in a thread.
+        """
+        with (request_slot or nullcontext)():
+            response = session.get(url, headers=headers, timeout=_request_timeout(), stream=True)
+            if not (response.ok and is_html(response)):
+                response.close()
+                return response, None
+            if stream_parse:
+                extractor = StreamingExtractor(response.url, response.encoding)
+                return response, stream_body(response, extractor, max_body_size, on_links, deadline=deadline)
+            return response, read_body(response, max_body_size, deadline=deadline)
+
+    def _check_response(url, current_depth, domain, response, body):
+        """Account for a fetched response and return the page to analyze.
+
+        The page is returned as the argument tuple for analyze_raw_page, or
+        None when there is nothing to parse. A rate-limited response also
+        returns None, after pausing the host, and the calling engine
+        requeues the page.
+        """
+        nonlocal total_size, total_wire_size, skipped_downloads, bytes_skipped
+
+        if is_rate_limited(response):
+            pause = rate_limiter.handle_429(domain, parse_retry_after(response.headers.get('Retry-After')))
+            logging.warning(f"Rate limit hit for {domain}, pausing it for {pause:.1f}s")
+            return None
+
+        response.raise_for_status()
+        rate_limiter.handle_success(domain, response.elapsed.total_seconds())
+
+        if body is None:
+            wire_size = get_wire_size(response, b'')
+            total_wire_size += wire_size
+            skipped_downloads += 1
+            bytes_skipped += max(declared_size(response) - wire_size, 0)
+            if is_html(response):
+                logging.warning(f"Skipping {url}: body is larger than {format_size(max_body_size)}")
+            else:
+                logging.info(f"Skipping non-HTML content at {url}")
+            return None
+
+        if stream_parse:
+            content_size = body.size
+            wire_size = get_wire_size(response, b'') or content_size
+        else:
+            content_size = len(body)
+            wire_size = get_wire_size(response, body)
+        total_size += content_size
+        total_wire_size += wire_size
+
+        if validators is not None:
+            validators.update(url, response.headers)
+
+        return (body, response.encoding, url, current_depth,
+                content_size, response.status_code, wire_size, html_parser, response.url)
+
+    def _request_headers(url):
+        """Build request headers, asking for a 304 if we have the page already"""
         headers = {'User-Agent': rate_limiter.get_next_user_agent()}
+        if url in previous_results:
+            headers.update(validators.conditional_headers(url))
+        return headers
 
+    def _is_fresh(url):
+        """Check if an incremental crawl can reuse url without any request"""
+        previous = previous_results.get(url)
+        if not incremental or previous is None or url not in validators:
+            return False
         try:
-            response = requests.get(url, headers=headers, timeout=timeout)
-            content_size = len(response.content)
-            total_size += content_size
-
-            if response.status_code == 429:
-                delay = rate_limiter.handle_429(domain)
-                logging.warning(f"Rate limit hit for {domain}, waiting {delay}s...")
-                time.sleep(delay)
-                return
+            last_fetched = datetime.fromisoformat(previous.get('last_fetched') or previous['crawl_timestamp'])
+        except (KeyError, TypeError, ValueError):
+            return False
+        if url in sitemap_lastmod:
+            # The sitemap says whether the page changed since we fetched it
+            return sitemap_lastmod[url] <= last_fetched
+        return (datetime.now() - last_fetched).total_seconds() < recrawl_after * 3600
 
-            response.raise_for_status()
-            rate_limiter.handle_success(domain)
+    def _reuse_previous(url, current_depth, revalidated):
+        """Record the previous row of an unchanged page and return its links.
 
-            if not response.headers.get('content-type', '').startswith('text/html'):
-                logging.info(f"Skipping non-HTML content at {url}")
-                return
+        revalidated says whether the server just confirmed it with a 304, as
+        opposed to the page being fresh enough to skip.
+        """
+        nonlocal not_modified, bytes_saved, skipped_fresh
+
+        previous = previous_results[url]
+        now = datetime.now().isoformat()
+        bytes_saved += previous.get('wire_size', previous.get('content_size', 0))
+        if revalidated:
+            not_modified += 1
+            logging.info(f"Not modified since last crawl, reusing previous result: {url}")
+        else:
+            skipped_fresh += 1
+            logging.info(f"Crawled recently, reusing previous result without a request: {url}")
+
+        result = {
+            **previous,
+            'url': url,
+            'depth': current_depth,
+            'crawl_timestamp': now,
+            'last_fetched': now if revalidated else previous.get('last_fetched', previous['crawl_timestamp']),
+            'unchanged': True,
+            # Checked again against the pages of this run
+            'duplicate_of': '',
+        }
+        return _record(result, validators.links(url))
+
+    def _record(result, internal_links):
+        """Store a result row and return the internal links to follow."""
+        nonlocal near_duplicates
+        results.append(result)
+
+        if validators is not None:
+            validators.set_links(result['url'], internal_links, create=incremental)
+
+        if (simhashes is not None and result.get('content_simhash')
+                and result.get('word_count', 0) >= NEAR_DUPLICATE_MIN_WORDS):
+            fingerprint = int(result['content_simhash'], 16)
+            original = simhashes.find(fingerprint)
+            if original:
+                # Same template content as a page we already expanded
+                result['duplicate_of'] = original
+                near_duplicates += 1
+                logging.info(f"Near-duplicate of {original}, not following links: {result['url']}")
+                return []
+            simhashes.add(fingerprint, result['url'])
+
+        if follow_canonical and result['canonical_url']:
+            declared = canonicalize_url(urljoin(result['url'], result['canonical_url']), strip_params,
+                                        strip_trailing_slash)
+            if declared != result['url'] and is_valid_url(declared):
+                frontier.seen.add(declared)
+
+        return internal_links
+
+    def _unpublished(body, internal_links):
+        """Drop the links a streamed page had queued while it downloaded"""
+        return internal_links[body.published:] if stream_parse else internal_links
+
+    def _enqueue(internal_links, current_depth):
+        """Push links found at current_depth, queueing no more than the
+        remaining page budget can ever fetch."""
+        nonlocal budget_cut
+        for link in internal_links:
+            if frontier.fifo and len(frontier) + len(scheduler) >= max_pages - page_count:
+                budget_cut = True
+                break
+            canonical = canonicalize_url(link, strip_params, strip_trailing_slash)
+            if not _allowed(canonical):
+                continue
+            if incremental and current_depth >= depth:
+                beyond_depth.add(canonical)
+            if (not frontier.push(canonical, current_depth + 1) and canonical != link
+                    and current_depth < depth):
+                # Only a variant spelling made this a duplicate; count each
+                # variant once, as the raw-URL check would have fetched it once
+                canonical_variants.add(link)
+
+    def _checkpoint():
+        """Save everything needed to resume the crawl from this point."""
+        nonlocal last_checkpoint
+        last_checkpoint = page_count
+        if validators is not None:
+            validators.save()
+        if robots is not None:
+            robots.save()
+        save_checkpoint(checkpoint_dir, {
+            'seed': url,
+            'frontier': frontier,
+            'results': results,
+            'page_count': page_count - len(in_flight_pages),
+            'in_flight': list(in_flight_pages.items()) + scheduler.parked_urls(),
+            'rate_limiter': rate_limiter.get_state(),
+            'canonical_variants': canonical_variants,
+            'sitemap_lastmod': sitemap_lastmod,
+            'beyond_depth': beyond_depth,
+            'failed_urls': failed_urls,
+            'counters': {
+                'total_size': total_size,
+                'total_wire_size': total_wire_size,
+                'skipped_downloads': skipped_downloads,
+                'bytes_skipped': bytes_skipped,
+                'near_duplicates': near_duplicates,
+                'not_modified': not_modified,
+                'bytes_saved': bytes_saved,
+                'skipped_fresh': skipped_fresh,
+                'rate_limited': rate_limited,
+                'retried': retried,
+                'robots_blocked': robots_blocked,
+                'budget_cut': budget_cut,
+            },
+        })
+
+    def _complete(url, internal_links, current_depth):
+        """Queue a finished page's links and checkpoint when one is due."""
+        _enqueue(internal_links, current_depth)
+        in_flight_pages.pop(url, None)
+        if checkpoint_dir and page_count - last_checkpoint >= checkpoint_every:
+            _checkpoint()
+
+    def _requeue(url, current_depth, response):
+        """Park a rate-limited page until its host is eligible again.
+
+        Returns False, giving up on the page, once it has been rate limited
+        MAX_RATE_LIMIT_RETRIES times.
+        """
+        nonlocal page_count, rate_limited
+        if rate_limit_retries[url] >= MAX_RATE_LIMIT_RETRIES:
+            logging.error(f"Giving up on {url} after {MAX_RATE_LIMIT_RETRIES} rate-limited attempts")
+            _give_up(url, current_depth, requests.HTTPError(
+                f"{response.status_code} Rate limited: {url}", response=response))
+            return False
+        rate_limit_retries[url] += 1
+        rate_limited += 1
+        page_count -= 1
+        in_flight_pages.pop(url, None)
+        scheduler.park(url, current_depth, front=True)
+        return True
+
+    def _fetch_page(url, current_depth):
+        """Fetch and analyze one page, returning the internal links to follow.
+
+        Returns None when the page was rate limited or failed and was put
+        back in the queue, or abandoned at the deadline.
+        """
+        nonlocal page_count
+
+        domain = urlparse(url).netloc
+        page_count += 1
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-            metadata = extract_metadata(soup, url)
-
-            # Analyze URL structure
-            url_structure = analyze_url_structure(url)
-
-            # Analyze links
-            link_analysis = analyze_link_quality(soup, url)
-            internal_links = link_analysis['internal_links']
-
-            # Count resources
-            resource_counts = count_resources(soup, url)
-
-            # Count images (already counted in resource_counts but kept for backward compatibility)
-            image_count = resource_counts['images']
-
-            # Prepare result with all the new metrics
-            result = {
-                'url': url,
-                'depth': current_depth,
-                **metadata,
-                # URL structure metrics
-                'url_length': url_structure['url_length'],
-                'url_params_count': url_structure['params_count'],
-                'url_path_depth': url_structure['path_depth'],
-                
-                # Link metrics
-                'internal_link_count': link_analysis['internal_link_count'],
-                'external_link_count': link_analysis['external_link_count'],
-                'nofollow_link_count': link_analysis['nofollow_link_count'],
-                'empty_anchor_text_count': link_analysis['empty_anchor_text_count'],
-                'generic_anchor_text_count': link_analysis['generic_anchor_text_count'],
-                'keyword_rich_anchor_text_count': link_analysis['keyword_rich_anchor_text_count'],
-                'internal_external_ratio': link_analysis['internal_external_ratio'],
-                'total_link_count': link_analysis['total_link_count'],
-                
-                # Resource metrics
-                'js_files_count': resource_counts['js_files'],
-                'css_files_count': resource_counts['css_files'],
-                'image_count': image_count,
-                'font_count': resource_counts['fonts'],
-                'video_count': resource_counts['videos'],
-                'audio_count': resource_counts['audios'],
-                'internal_resources_count': resource_counts['internal_resources'],
-                'external_resources_count': resource_counts['external_resources'],
-                
-                # Basic metrics (kept for backward compatibility)
-                'word_count': len(soup.get_text(separator=' ', strip=True).split()),
-                'content_size': content_size,
-                'crawl_timestamp': datetime.now().isoformat(),
-                'status_code': response.status_code
-            }
-
-            results.append(result)
-
-            for next_url in internal_links:
-                if page_count < max_pages:
-                    _crawl(next_url, current_depth + 1)
-
-        except requests.Timeout:
+        _log_progress(current_depth, domain)
+
+        if _is_fresh(url):
+            return _reuse_previous(url, current_depth, revalidated=False)
+
+        # The scheduler already took a rate limit token for this request
+        headers = _request_headers(url)
+
+        try:
+            response, body = _download(url, headers, lambda links: _enqueue(links, current_depth))
+            if response.status_code == 304 and url in previous_results:
+                rate_limiter.handle_success(domain, response.elapsed.total_seconds())
+                return _reuse_previous(url, current_depth, revalidated=True)
+
+            page = _check_response(url, current_depth, domain, response, body)
+
+            if is_rate_limited(response):
+                return None if _requeue(url, current_depth, response) else []
+            if page is None:
+                return []
+
+            return _unpublished(body, _record(*analyze_raw_page(*page)))
+
+        except DeadlineExceeded:
+            # Left in in_flight_pages, so a checkpoint queues it again
+            logging.warning(f"Time budget spent, abandoning {url} mid-download")
+            return None
+        except requests.Timeout as e:
             logging.error(f"Timeout error for {url}")
+            return _handle_failure(url, current_depth, domain, e)
         except requests.RequestException as e:
             logging.error(f"Request failed for {url}: {e}")
+            return _handle_failure(url, current_depth, domain, e)
         except Exception as e:
             logging.error(f"Unexpected error for {url}: {e}")
+            _give_up(url, current_depth, e)
+        return []
+
+    def _crawl():
+        """Fetch pages one at a time in frontier order, skipping ahead past
+        hosts the rate limiter is holding back."""
+        while scheduler and page_count < max_pages and _admitting():
+            item = scheduler.take()
+            if item is None:
+                # Every queued host is rate limited
+                time.sleep(_until_cutoff(scheduler.wait_time()))
+                continue
+            next_url, current_depth = item
+            in_flight_pages[next_url] = current_depth
+            try:
+                internal_links = _fetch_page(next_url, current_depth)
+            finally:
+                scheduler.release(next_url)
+            if internal_links is not None:
+                _complete(next_url, internal_links, current_depth)
+
+    async def _crawl_async():
+        """Fetch pages from the frontier with a pool of worker tasks.
+
+        With parse_workers set, fetched pages go through a bounded parse queue
+        to a process pool and then to a single writer task, so parsing runs on
+        other cores and a slow parse stage holds back the fetchers.
+        """
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Condition()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+
+        if parse_workers:
+            parse_pool = ProcessPoolExecutor(max_workers=parse_workers)
+            parse_queue = asyncio.Queue(maxsize=parse_queue_size or 2 * parse_workers)
+            write_queue = asyncio.Queue()
+
+        async def _finish(url, internal_links, current_depth):
+            """Queue a page's links, release its in-flight slot and wake the workers."""
+            # Runs before the first await, so no checkpoint can see the page
+            # recorded but its links not yet queued
+            _complete(url, internal_links, current_depth)
+            async with ready:
+                ready.notify_all()
+
+        async def _publish(internal_links, current_depth):
+            """Queue links of a page still downloading and wake the workers."""
+            _enqueue(internal_links, current_depth)
+            async with ready:
+                ready.notify_all()
+
+        async def _fetch(url, current_depth):
+            """Fetch one page and return its internal links.
+
+            Returns None when the page was handed to the parse stage, which
+            then owns finishing it, put back in the queue after a 429 or
+            a transient failure, or abandoned at the deadline.
+            """
+            domain = urlparse(url).netloc
+
+            _log_progress(current_depth, domain)
+
+            if _is_fresh(url):
+                return _reuse_previous(url, current_depth, revalidated=False)
+
+            # The scheduler already took a rate limit token and a host slot
+            headers = _request_headers(url)
+
+            def _on_links(links):
+                # Called from the download thread
+                asyncio.run_coroutine_threadsafe(_publish(links, current_depth), loop)
+
+            try:
+                response, body = await asyncio.to_thread(_download, url, headers, _on_links)
+                if response.status_code == 304 and url in previous_results:
+                    rate_limiter.handle_success(domain, response.elapsed.total_seconds())
+                    return _reuse_previous(url, current_depth, revalidated=True)
+
+                page = _check_response(url, current_depth, domain, response, body)
+
+                if is_rate_limited(response):
+                    return None if _requeue(url, current_depth, response) else []
+                if page is None:
+                    return []
+
+                if parse_workers:
+                    # Blocks while the parse stage is full
+                    await parse_queue.put(page)
+                    return None
+                return _unpublished(body, _record(*analyze_raw_page(*page)))
+
+            except DeadlineExceeded:
+                logging.warning(f"Time budget spent, abandoning {url} mid-download")
+                return None
+            except requests.Timeout as e:
+                logging.error(f"Timeout error for {url}")
+                return _handle_failure(url, current_depth, domain, e)
+            except requests.RequestException as e:
+                logging.error(f"Request failed for {url}: {e}")
+                return _handle_failure(url, current_depth, domain, e)
+            except Exception as e:
+                logging.error(f"Unexpected error for {url}: {e}")
+                _give_up(url, current_depth, e)
+            return []
 
-    _crawl(url, 0)
+        async def _worker():
+            nonlocal page_count
+            while True:
+                async with ready:
+                    while True:
+                        # Wait for work, or for every in-flight page to finish
+                        await ready.wait_for(
+                            lambda: scheduler or not in_flight_pages or page_count >= max_pages
+                        )
+                        if not scheduler or page_count >= max_pages or not _admitting():
+                            return
+                        item = scheduler.take()
+                        if item is not None:
+                            break
+                        # Every queued host is held back: sleep until the first
+                        # is eligible, or until new links arrive or a finished
+                        # request frees a host slot
+                        try:
+                            await asyncio.wait_for(ready.wait(), _until_cutoff(scheduler.wait_time()))
+                        except asyncio.TimeoutError:
+                            pass
+                    next_url, current_depth = item
+                    page_count += 1
+                    in_flight_pages[next_url] = current_depth
+
+                # A cancelled fetch stays in flight, so a checkpoint requeues it
+                try:
+                    internal_links = await _fetch(next_url, current_depth)
+                finally:
+                    scheduler.release(next_url)
+                if internal_links is not None:
+                    await _finish(next_url, internal_links, current_depth)
+                else:
+                    # Its host slot is free again
+                    async with ready:
+                        ready.notify_all()
+
+        async def _parse_worker():
+            while True:
+                page = await parse_queue.get()
+                try:
+                    result, internal_links = await loop.run_in_executor(
+                        parse_pool, analyze_raw_page, *page
+                    )
+                    await write_queue.put((result, internal_links))
+                except Exception as e:
+                    logging.error(f"Unexpected error parsing {page[2]}: {e}")
+                    _give_up(page[2], page[3], e)
+                    await _finish(page[2], [], page[3])
+                finally:
+                    parse_queue.task_done()
+
+        async def _writer():
+            while True:
+                result, internal_links = await write_queue.get()
+                try:
+                    await _finish(result['url'], _record(result, internal_links), result['depth'])
+                finally:
+                    write_queue.task_done()
+
+        stages = []
+        if parse_workers:
+            stages += [asyncio.create_task(_parse_worker()) for _ in range(parse_workers)]
+            stages.append(asyncio.create_task(_writer()))
+        workers = [asyncio.create_task(_worker()) for _ in range(concurrency)]
+
+        async def _drain():
+            # Workers return once the page budget is spent, the frontier is
+            # empty with nothing left in flight or no page may be started
+            await asyncio.gather(*workers)
+            if parse_workers:
+                # Pages still in the parse stage are finished, not dropped
+                await parse_queue.join()
+                await write_queue.join()
+
+        try:
+            await asyncio.wait_for(
+                _drain(), None if deadline is None else max(deadline - time.time(), 0)
+            )
+        except asyncio.TimeoutError:
+            logging.warning(f"Time budget spent, abandoning {len(in_flight_pages)} pages in flight")
+        finally:
+            for task in workers + stages:
+                task.cancel()
+            await asyncio.gather(*workers, *stages, return_exceptions=True)
+            if parse_workers:
+                parse_pool.shutdown(cancel_futures=True)
+
+    # Fresh pages are reused without a request, so they need no rate limit token
+    scheduler = HostScheduler(frontier, rate_limiter, exempt=_is_fresh, host_limit=host_limit)
+    try:
+        if engine == 'async':
+            asyncio.run(_crawl_async())
+        else:
+            _crawl()
+    except BaseException:
+        if checkpoint_dir:
+            _checkpoint()
+            logging.info(f"Crawl stopped early, checkpoint saved to {checkpoint_dir}")
+        raise
+    else:
+        # Abandoned pages are still in in_flight_pages and count as unfinished
+        abandoned = len(in_flight_pages)
+        out_of_time = (deadline is not None and not _admitting() and page_count - abandoned < max_pages
+                       and bool(scheduler or in_flight_pages))
+        if out_of_time:
+            logging.warning(f"Time budget of {max_duration:g}s spent with {len(frontier)} URLs in the "
+                            f"frontier, {len(scheduler)} waiting on their host and {abandoned} abandoned")
+            if checkpoint_dir:
+                _checkpoint()
+                logging.info(f"Checkpoint saved to {checkpoint_dir}, resume to crawl the rest")
+        elif checkpoint_dir and os.path.exists(os.path.join(checkpoint_dir, CHECKPOINT_FILE)):
+            os.remove(os.path.join(checkpoint_dir, CHECKPOINT_FILE))
+    finally:
+        session.close()
+        frontier.close()
+        if validators is not None:
+            validators.save()
+        if robots is not None:
+            robots.save()
+
+    if incremental:
+        # Carry forward what the last run saw on this site but this run could
+        # not reach for its page budget, time budget or depth. Pages that
+        # failed, are now disallowed or are no longer linked are gone.
+        seed_host = urlparse(url).netloc
+        crawled = {result['url'] for result in results}
+        gone = {failure['url'] for failure in failed_urls} | robots_blocked
+        stopped_short = budget_cut or out_of_time or bool(scheduler)
+        last_run = load_previous_results(os.path.dirname(validator_cache) or '.', strip_params,
+                                         include_archive=False, strip_trailing_slash=strip_trailing_slash)
+        for previous_url, previous in last_run.items():
+            if urlparse(previous_url).netloc != seed_host or previous_url in crawled or previous_url in gone:
+                continue
+            if stopped_short or previous_url in beyond_depth:
+                results.append({
+                    **previous,
+                    'url': previous_url,
+                    'last_fetched': previous.get('last_fetched', previous.get('crawl_timestamp', '')),
+                    'unchanged': True,
+                })
 
     # Calculate totals
     total_images = sum(result.get('image_count', 0) for result in results)
@@ -523,6 +3553,8 @@ Progress Update:
     
     # Final summary
     stats = rate_limiter.get_stats()
+    resolver_hits = url_resolver.hits - resolver_hits
+    resolver_lookups = resolver_hits + url_resolver.misses - resolver_misses
     logging.info(f"""
 Crawl Completed:
 +- Pages: {page_count}
@@ -537,13 +3569,391 @@ Crawl Completed:
       +- Internal: {total_internal_links}
       +- External: {total_external_links}
       +- Nofollow: {total_nofollow_links}
-   +- Data: {format_size(total_size)}
+   +- Frontier:
+      +- Left: {len(frontier)}
+      +- Stopped by Time Budget: {f"yes, {len(scheduler)} URLs waiting on their host and {abandoned} in flight abandoned" if out_of_time else 'no'}
+      +- Duplicate Links: {frontier.duplicates}
+      +- Fetches Avoided by Canonicalization: {len(canonical_variants)}
+      +- Near-Duplicate Pages Not Expanded: {near_duplicates}
+      +- Blocked by robots.txt: {len(robots_blocked)}
+      +- Seeded From Sitemaps: {sitemap_seeded}
+   +- Reused From Earlier Runs:
+      +- Skipped as Fresh: {skipped_fresh}
+      +- Not Modified (304): {not_modified} pages
+      +- Not Downloaded: {format_size(bytes_saved)}
+   +- Data: {format_size(total_size)} decoded, {format_size(total_wire_size)} on the wire
+   +- Rate Limited: {rate_limited} responses, pages requeued
+   +- Retried: {retried} transient failures, {len(failed_urls)} pages failed for good
+   +- Host Limits: {'; '.join(f"{host}: {_describe_host(host)}" for host in list(rate_limiter.delays)[:10]) or 'none'}
+   +- Downloads Skipped: {skipped_downloads} non-HTML or oversized ({format_size(bytes_skipped)} not downloaded)
+   +- URL Cache: {f"{resolver_hits / resolver_lookups:.1%} of {resolver_lookups} hrefs resolved from cache" if resolver_lookups else ('in the parse workers' if parse_workers else 'no hrefs resolved')}
    +- Time: {stats['elapsed_time']:.1f}s
    +- Speed: {stats['requests_per_second']:.2f} req/s
 """)
 
     return results
 
+def parse_seeds_file(path, max_pages=100):
+    """Read a batch of seeds, one `URL DEPTH [--max-pages N] [--weight W]` per line.
+
+    Blank lines and lines starting with # are skipped. Returns a list of
+    dicts with url, depth, max_pages and weight; raises ValueError naming
+    the line of the first bad entry.
+    """
+    seeds = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                fields = shlex.split(line)
+                options = dict(zip(fields[2::2], fields[3::2]))
+                if len(fields) < 2 or len(fields) % 2 or set(options) - {'--max-pages', '--weight'}:
+                    raise ValueError
+                seed = {
+                    'url': fields[0],
+                    'depth': int(fields[1]),
+                    'max_pages': int(options.get('--max-pages', max_pages)),
+                    'weight': float(options.get('--weight', 1)),
+                }
+            except ValueError:
+                raise ValueError(f"{path}:{number}: expected URL DEPTH [--max-pages N] [--weight W], "
+                                 f"got {line!r}") from None
+            if (not is_valid_url(seed['url']) or seed['depth'] < 0 or seed['max_pages'] < 1
+                    or seed['weight'] <= 0):
+                raise ValueError(f"{path}:{number}: invalid seed {line!r}")
+            seeds.append(seed)
+    return seeds
+
+def crawl_seed(seed, index, share, deadline=None, **crawl_kwargs):
+    """Crawl one seed of a batch, returning its (results, failed_urls).
+
+    Both lists are tagged with the seed's url. index names the seed's
+    subdirectory of checkpoint_dir and frontier_dir, and share is the
+    FairShare its requests go through. deadline, a time.time() value,
+    becomes the crawl's max_duration.
+    """
+    failed_urls = []
+    if deadline is not None:
+        crawl_kwargs['max_duration'] = max(deadline - time.time(), 0.001)
+    for key in ('checkpoint_dir', 'frontier_dir'):
+        if crawl_kwargs.get(key):
+            crawl_kwargs[key] = os.path.join(
+                crawl_kwargs[key], f"{index:03d}-{urlparse(seed['url']).netloc.replace(':', '_')}"
+            )
+    results = crawl(seed['url'], seed['depth'], max_pages=seed['max_pages'], failed_urls=failed_urls,
+                    request_slot=lambda: share.slot(seed['url']), **crawl_kwargs)
+    for row in results + failed_urls:
+        row['seed'] = seed['url']
+    return results, failed_urls
+
+def crawl_batch(seeds, max_sites=8, slots=None, fairness='round-robin', failed_urls=None,
+                **crawl_kwargs):
+    """Crawl several seeds in one process and return all their results.
+
+    seeds are dicts as returned by parse_seeds_file. Up to max_sites seeds
+    are crawled at the same time, each by its own crawl() with its own
+    frontier and rate limiter, while a FairShare of `slots` requests
+    (max_sites by default) keeps one busy or slow site from crowding out
+    the rest. Every result row and failed_urls entry gets a 'seed' key.
+    Other keyword arguments are passed on to crawl(); a checkpoint_dir or
+    frontier_dir gets a subdirectory per seed.
+
+    A seed whose crawl raises is logged and skipped. Ctrl-C stops every
+    crawl at its next request. A max_duration is a budget for the whole
+    batch: each seed's crawl gets what is left of it when the seed starts,
+    and seeds not started by then are skipped.
+    """
+    share = FairShare(slots or max_sites, {seed['url']: seed['weight'] for seed in seeds}, fairness)
+    if failed_urls is None:
+        failed_urls = []
+    max_duration = crawl_kwargs.pop('max_duration', None)
+    deadline = time.time() + max_duration if max_duration else None
+
+    def _run(index, seed):
+        start = time.time()
+        if deadline is not None and start >= deadline:
+            return None
+        return *crawl_seed(seed, index, share, deadline, **crawl_kwargs), time.time() - start
+
+    logging.info(f"Starting batch of {len(seeds)} seeds, {max_sites} at a time, "
+                 f"{share.slots} requests in flight ({fairness})")
+    results = []
+    summary = []
+    pool = ThreadPoolExecutor(max_workers=max_sites, thread_name_prefix='seed')
+    try:
+        futures = [pool.submit(_run, index, seed) for index, seed in enumerate(seeds)]
+        for seed, future in zip(seeds, futures):
+            try:
+                outcome = future.result()
+            except Exception as e:
+                logging.error(f"Crawl of {seed['url']} failed: {e}")
+                summary.append(f"{seed['url']}: failed ({e})")
+                continue
+            if outcome is None:
+                summary.append(f"{seed['url']}: not started, time budget spent")
+                continue
+            seed_results, seed_failed, elapsed = outcome
+            results.extend(seed_results)
+            failed_urls.extend(seed_failed)
+            summary.append(f"{seed['url']}: {len(seed_results)} pages, "
+                           f"{len(seed_failed)} failed, {elapsed:.1f}s")
+    except BaseException:
+        pool.shutdown(wait=False, cancel_futures=True)
+        share.close()
+        raise
+    finally:
+        pool.shutdown()
+
+    logging.info("\nBatch Completed:\n" + '\n'.join(f"+- {line}" for line in summary) + "\n")
+    return results
+
+def shard_for(url, shards):
+    """Return the shard, from 0 to shards - 1, that crawls url's host"""
+    return url_fingerprint(urlparse(url).netloc) % shards
+
+class ShardStore:
+    """SQLite file through which a sharded crawl's coordinator and workers talk.
+
+    The coordinator fills it with the crawl options and the batch's seeds,
+    each assigned to the shard of its host. Workers, in other processes or
+    on other machines that share the file over a filesystem with working
+    locks, claim their own shard's seeds one at a time and write back each
+    seed's result rows and failures. A crawl only follows links on the host
+    it is crawling, so every URL a worker discovers belongs to its own shard
+    and the store is the only thing workers share.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Autocommit, so claim() and finish() can take the write lock up front
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS seeds (
+                id INTEGER PRIMARY KEY, url TEXT, depth INTEGER, max_pages INTEGER, weight REAL,
+                shard INTEGER, state TEXT, started REAL, finished REAL, error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS seeds_by_shard ON seeds (shard, state, id);
+            CREATE TABLE IF NOT EXISTS rows (seed_id INTEGER, kind TEXT, row TEXT);
+        ''')
+
+    @contextmanager
+    def _write(self):
+        """Run the with block as one transaction holding the database's write lock"""
+        with self.lock:
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                yield
+            except BaseException:
+                self.db.execute('ROLLBACK')
+                raise
+            self.db.execute('COMMIT')
+
+    def create(self, seeds, shards, options):
+        """Start a new sharded crawl of seeds, dropping anything left from the last one"""
+        with self._write():
+            for table in ('meta', 'seeds', 'rows'):
+                self.db.execute(f'DELETE FROM {table}')
+            self.db.executemany('INSERT INTO meta (key, value) VALUES (?, ?)', [
+                ('shards', json.dumps(shards)),
+                ('options', json.dumps(options)),
+            ])
+            self.db.executemany(
+                'INSERT INTO seeds (id, url, depth, max_pages, weight, shard, state) '
+                'VALUES (?, ?, ?, ?, ?, ?, \'queued\')',
+                [(index, seed['url'], seed['depth'], seed['max_pages'], seed['weight'],
+                  shard_for(seed['url'], shards)) for index, seed in enumerate(seeds)]
+            )
+
+    def _meta(self, key):
+        with self.lock:
+            row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @property
+    def shards(self):
+        return self._meta('shards')
+
+    @property
+    def options(self):
+        return self._meta('options')
+
+    def claim(self, shard):
+        """Take the next queued seed of shard, or return None if it has none left"""
+        with self._write():
+            row = self.db.execute(
+                'SELECT id, url, depth, max_pages, weight FROM seeds '
+                'WHERE shard = ? AND state = \'queued\' ORDER BY id LIMIT 1', (shard,)
+            ).fetchone()
+            if row is not None:
+                self.db.execute('UPDATE seeds SET state = \'claimed\', started = ? WHERE id = ?',
+                                (time.time(), row[0]))
+        if row is None:
+            return None
+        return dict(zip(('id', 'url', 'depth', 'max_pages', 'weight'), row))
+
+    def release_claims(self, shard):
+        """Queue again the seeds a stopped worker of shard had claimed but not finished"""
+        with self.lock:
+            self.db.execute('UPDATE seeds SET state = \'queued\' WHERE shard = ? AND state = \'claimed\'',
+                            (shard,))
+
+    def finish(self, seed_id, results, failed_urls, error=None):
+        """Store a claimed seed's result rows and failures, or the error its crawl raised"""
+        with self._write():
+            self.db.executemany(
+                'INSERT INTO rows (seed_id, kind, row) VALUES (?, ?, ?)',
+                [(seed_id, 'result', json.dumps(row)) for row in results]
+                + [(seed_id, 'failed', json.dumps(row)) for row in failed_urls]
+            )
+            self.db.execute('UPDATE seeds SET state = ?, finished = ?, error = ? WHERE id = ?',
+                            ('failed' if error else 'done', time.time(), error, seed_id))
+
+    def progress(self):
+        """Return the number of seeds in each state ('queued', 'claimed', 'done', 'failed')"""
+        with self.lock:
+            return dict(self.db.execute('SELECT state, COUNT(*) FROM seeds GROUP BY state'))
+
+    def shard_summary(self):
+        """Return (shard, seeds, seeds finished, result rows) for every shard with seeds"""
+        with self.lock:
+            return self.db.execute('''
+                SELECT shard, COUNT(*), SUM(state IN ('done', 'failed')),
+                       (SELECT COUNT(*) FROM rows JOIN seeds AS s ON s.id = rows.seed_id
+                        WHERE s.shard = seeds.shard AND kind = 'result')
+                FROM seeds GROUP BY shard ORDER BY shard
+            ''').fetchall()
+
+    def collect(self):
+        """Return every stored (results, failed_urls), in seed order"""
+        with self.lock:
+            rows = self.db.execute('SELECT kind, row FROM rows ORDER BY seed_id, rowid').fetchall()
+        results = [json.loads(row) for kind, row in rows if kind == 'result']
+        failed_urls = [json.loads(row) for kind, row in rows if kind == 'failed']
+        return results, failed_urls
+
+    def close(self):
+        self.db.close()
+
+def crawl_worker(store_path, shard, max_sites=1, slots=None, fairness='round-robin'):
+    """Crawl the seeds of one shard of a ShardStore until none are left.
+
+    Runs up to max_sites seeds at once sharing a FairShare of slots
+    requests, like crawl_batch, with the crawl options the coordinator put
+    in the store. Each seed's results go back to the store as soon as it is
+    done. Run one worker per shard: a starting worker takes back the seeds
+    its shard had claimed, assuming an earlier worker for it was stopped.
+    A max_duration among the options is counted from the worker's start;
+    seeds not claimed by then stay queued. Returns the number of seeds
+    crawled.
+    """
+    store = ShardStore(store_path)
+    options = store.options
+    if 'strip_params' in options:
+        # JSON has no tuples
+        options['strip_params'] = tuple(options['strip_params'])
+    max_duration = options.pop('max_duration', None)
+    deadline = time.time() + max_duration if max_duration else None
+    store.release_claims(shard)
+    share = FairShare(slots or max_sites, fairness=fairness)
+    crawled = 0
+
+    def _work():
+        nonlocal crawled
+        while (deadline is None or time.time() < deadline) and (seed := store.claim(shard)) is not None:
+            share.weights[seed['url']] = seed['weight']
+            try:
+                results, failed_urls = crawl_seed(seed, seed['id'], share, deadline, **options)
+            except Exception as e:
+                logging.error(f"Crawl of {seed['url']} failed: {e}")
+                store.finish(seed['id'], [], [], error=str(e))
+                continue
+            store.finish(seed['id'], results, failed_urls)
+            crawled += 1
+
+    logging.info(f"Worker for shard {shard} of {store.shards} starting on {store_path}")
+    pool = ThreadPoolExecutor(max_workers=max_sites, thread_name_prefix=f'shard{shard}')
+    try:
+        for future in [pool.submit(_work) for _ in range(max_sites)]:
+            future.result()
+    except BaseException:
+        share.close()
+        raise
+    finally:
+        pool.shutdown()
+        store.close()
+    logging.info(f"Worker for shard {shard} finished after {crawled} seeds")
+    return crawled
+
+def crawl_sharded(seeds, shards, store_path, spawn_workers=True, max_sites=1, slots=None,
+                  fairness='round-robin', poll_interval=1, failed_urls=None, **crawl_kwargs):
+    """Coordinate a crawl of seeds split by host across shards worker processes.
+
+    Fills the ShardStore at store_path, starts one crawl_worker process per
+    shard on this machine unless spawn_workers is off (then workers are
+    started elsewhere with --worker and --store), and waits until every seed
+    is finished or every local worker has exited. crawl_kwargs must be JSON
+    serializable, since workers read them from the store. With a
+    max_duration, seeds still queued once it is spent are left unstarted.
+    Returns the result rows of all seeds, tagged with their seed, and
+    appends their failures to failed_urls.
+    """
+    max_duration = crawl_kwargs.get('max_duration')
+    deadline = time.time() + max_duration if max_duration else None
+    store = ShardStore(store_path)
+    store.create(seeds, shards, crawl_kwargs)
+    logging.info(f"Starting sharded crawl of {len(seeds)} seeds over {shards} shards in {store_path}")
+
+    workers = []
+    if spawn_workers:
+        for shard in range(shards):
+            command = [sys.executable, os.path.abspath(__file__), '--worker', str(shard),
+                       '--store', store_path, '--batch-sites', str(max_sites), '--fairness', fairness]
+            if slots:
+                command += ['--batch-slots', str(slots)]
+            workers.append(subprocess.Popen(command))
+
+    last_progress = None
+    try:
+        while True:
+            progress = store.progress()
+            if progress != last_progress:
+                logging.info(f"Sharded crawl: {progress.get('done', 0) + progress.get('failed', 0)}/"
+                             f"{len(seeds)} seeds finished, {progress.get('claimed', 0)} in progress")
+                last_progress = progress
+            if not progress.get('queued') and not progress.get('claimed'):
+                break
+            if deadline is not None and time.time() >= deadline and not progress.get('claimed'):
+                logging.warning(f"Time budget spent with {progress['queued']} seeds not started")
+                break
+            if workers and all(worker.poll() is not None for worker in workers):
+                logging.error(f"All workers exited with {progress.get('queued', 0) + progress.get('claimed', 0)} "
+                              f"seeds unfinished")
+                break
+            time.sleep(poll_interval)
+    except BaseException:
+        # Workers treat SIGTERM like Ctrl-C and checkpoint if they can
+        for worker in workers:
+            worker.terminate()
+        raise
+    finally:
+        for worker in workers:
+            worker.wait()
+
+    results, stored_failures = store.collect()
+    if failed_urls is not None:
+        failed_urls.extend(stored_failures)
+    logging.info("\nSharded Crawl Completed:\n" + '\n'.join(
+        f"+- Shard {shard}: {finished}/{count} seeds, {pages} pages"
+        for shard, count, finished, pages in store.shard_summary()
+    ) + "\n")
+    store.close()
+    return results
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description='''
@@ -578,16 +3988,56 @@ Examples:
   Full example:
     python crawler.py "https://example.com" 3 --max-pages 50 --timeout 15 --requests-per-second 1 --rotate-agent-after 5
 
+  Concurrent fetching:
+    python crawler.py "https://example.com" 2 --engine async --concurrency 16 --per-host-concurrency 4
+
+  Batch of sites from a file of "URL DEPTH [--max-pages N] [--weight W]" lines:
+    python crawler.py --seeds seeds.txt --batch-sites 10 --fairness weighted
+
+  The same batch split by host over 4 worker processes:
+    python crawler.py --seeds seeds.txt --shards 4 --store data/shards.sqlite3
+
+  Workers on other machines sharing the store (start the coordinator with --no-spawn-workers):
+    python crawler.py --worker 2 --store /shared/shards.sqlite3
+
 Note: Always enclose URLs in quotes to handle special characters correctly.
 '''
     )
 
-    parser.add_argument('url',
+    parser.add_argument('url', nargs='?',
                        help='The URL to crawl (include http:// or https://)')
 
-    parser.add_argument('depth', type=int,
+    parser.add_argument('depth', type=int, nargs='?',
                        help='How many levels deep to crawl (e.g., 2 for homepage and links from it)')
 
+    parser.add_argument('--seeds',
+                       help='Crawl every seed in this file instead of URL DEPTH, one '
+                            '"URL DEPTH [--max-pages N] [--weight W]" per line')
+
+    parser.add_argument('--batch-sites', type=int, default=8,
+                       help='Seeds crawled at the same time with --seeds (default: 8)')
+
+    parser.add_argument('--batch-slots', type=int,
+                       help='Requests in flight across all seeds with --seeds (default: --batch-sites)')
+
+    parser.add_argument('--fairness', choices=['round-robin', 'weighted'], default='round-robin',
+                       help='How --seeds share request slots: equally (round-robin) or by each '
+                            'seed\'s --weight (weighted) (default: round-robin)')
+
+    parser.add_argument('--shards', type=int,
+                       help='Split the crawl by host over this many worker processes that share --store')
+
+    parser.add_argument('--store', default=os.path.join('data', 'shards.sqlite3'),
+                       help='SQLite file shared by the coordinator and workers of a sharded crawl '
+                            '(default: data/shards.sqlite3)')
+
+    parser.add_argument('--no-spawn-workers', action='store_true',
+                       help='With --shards, do not start local workers; run them with --worker instead')
+
+    parser.add_argument('--worker', type=int, metavar='SHARD',
+                       help='Crawl this shard of the sharded crawl in --store, with the options '
+                            'the coordinator was started with, then exit')
+
     parser.add_argument('--max-pages', type=int, default=100,
                        help='Maximum number of pages to crawl (default: 100)')
 
@@ -600,44 +4050,300 @@ Note: Always enclose URLs in quotes to handle special characters correctly.
     parser.add_argument('--rotate-agent-after', type=int, default=10,
                        help='Number of requests before rotating user agent (default: 10)')
 
+    parser.add_argument('--engine', choices=['sync', 'async'], default='sync',
+                       help='Fetch engine: one page at a time (sync) or concurrent (async) (default: sync)')
+
+    parser.add_argument('--concurrency', type=int, default=8,
+                       help='Maximum requests in flight with --engine async (default: 8)')
+
+    parser.add_argument('--per-host-concurrency', type=int, default=2,
+                       help='Maximum requests in flight per host with --engine async (default: 2)')
+
+    parser.add_argument('--parse-workers', type=int, default=0,
+                       help='Processes for HTML analysis with --engine async, 0 parses inline (default: 0)')
+
+    parser.add_argument('--html-parser', choices=['lxml', 'html.parser'],
+                       help='Parser for page analysis (default: lxml if installed, else html.parser)')
+
+    parser.add_argument('--stream-parse', action='store_true',
+                       help='Analyze pages as they download and queue their links early, in flat memory')
+
+    parser.add_argument('--strategy', choices=['bfs', 'best-first'], default='bfs',
+                       help='Fetch order: level by level (bfs) or highest-value URLs first (best-first) (default: bfs)')
+
+    parser.add_argument('--strip-params', default=','.join(TRACKING_PARAMS),
+                       help='Comma-separated query parameters to drop when canonicalizing URLs, '
+                            'a trailing * matches a prefix (default: common tracking parameters)')
+
+    parser.add_argument('--strip-trailing-slash', action='store_true',
+                       help='Treat /dir/ and /dir as the same URL (only for sites that serve both alike)')
+
+    parser.add_argument('--follow-canonical', action='store_true',
+                       help='Treat the rel="canonical" URL of each crawled page as already seen')
+
+    parser.add_argument('--seen-set', choices=['set', 'fingerprint', 'bloom'], default='set',
+                       help='How seen URLs are stored: exact strings (set), 64-bit fingerprints (fingerprint) '
+                            'or an approximate Bloom filter (bloom) (default: set)')
+
+    parser.add_argument('--bloom-error-rate', type=float, default=0.001,
+                       help='False-positive rate for --seen-set bloom (default: 0.001)')
+
+    parser.add_argument('--near-duplicate-threshold', type=int, default=3,
+                       help='Max SimHash bit difference for a page to count as a near-duplicate '
+                            'whose links are not followed, -1 to disable (default: 3)')
+
+    parser.add_argument('--validator-cache', default='data/validators.json',
+                       help='ETag/Last-Modified cache for conditional re-crawls (default: data/validators.json)')
+
+    parser.add_argument('--no-validator-cache', action='store_true',
+                       help='Always download pages in full instead of revalidating them')
+
+    parser.add_argument('--incremental', action='store_true',
+                       help='Re-crawl against the last run: reuse fresh pages, revalidate older ones '
+                            'and carry forward pages not reached')
+
+    parser.add_argument('--recrawl-after', type=float, default=24,
+                       help='Hours after which --incremental revalidates a page instead of reusing it (default: 24)')
+
+    parser.add_argument('--adaptive', action='store_true',
+                       help='Learn each host\'s request rate and concurrency from response times and errors')
+
+    parser.add_argument('--max-requests-per-second', type=float, default=10,
+                       help='Highest per-host rate --adaptive may reach (default: 10)')
+
+    parser.add_argument('--max-duration', type=float,
+                       help='Minutes the crawl may run; near the end no new page is started, '
+                            'results are saved and the unfinished frontier reported')
+
+    parser.add_argument('--drain-grace', type=float,
+                       help='Seconds before --max-duration runs out to stop starting pages and let '
+                            'those in flight finish (default: --timeout)')
+
+    parser.add_argument('--max-retries', type=int, default=MAX_RETRIES,
+                       help=f'Times a page is retried after a timeout, connection error or 5xx (default: {MAX_RETRIES})')
+
+    parser.add_argument('--retry-delay', type=float, default=RETRY_BASE_DELAY,
+                       help=f'Seconds before the first retry, doubling with each attempt (default: {RETRY_BASE_DELAY})')
+
+    parser.add_argument('--ignore-robots', action='store_true',
+                       help='Do not fetch or obey robots.txt')
+
+    parser.add_argument('--robots-cache', default=os.path.join('data', 'robots.json'),
+                       help='JSON file caching robots.txt rules between runs (default: data/robots.json)')
+
+    parser.add_argument('--robots-ttl', type=float, default=24,
+                       help='Hours before a cached robots.txt is fetched again (default: 24)')
+
+    parser.add_argument('--sitemaps', action='store_true',
+                       help='Seed the frontier from the sitemaps in robots.txt or /sitemap.xml')
+
+    parser.add_argument('--max-body-size', type=float, default=10,
+                       help='Abandon HTML pages larger than this many MB, 0 for no limit (default: 10)')
+
+    parser.add_argument('--checkpoint-dir',
+                       help='Periodically save crawl state here so an interrupted crawl can be resumed')
+
+    parser.add_argument('--checkpoint-every', type=int, default=50,
+                       help='Pages between checkpoints with --checkpoint-dir (default: 50)')
+
+    parser.add_argument('--resume', action='store_true',
+                       help='Continue from the checkpoint in --checkpoint-dir, if there is one')
+
+    parser.add_argument('--frontier-dir',
+                       help='Keep the frontier and seen URLs in SQLite under this directory instead of in memory')
+
     args = parser.parse_args()
 
+    # CI job timeouts send SIGTERM; treat it like Ctrl-C so partial results
+    # and a checkpoint are saved
+    def handle_sigterm(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+    if args.worker is not None:
+        if not os.path.exists(args.store):
+            logging.error(f"Error: No sharded crawl in {args.store}")
+            exit(1)
+        try:
+            crawl_worker(args.store, args.worker, max_sites=args.batch_sites,
+                         slots=args.batch_slots, fairness=args.fairness)
+        except KeyboardInterrupt:
+            logging.info(f"Worker for shard {args.worker} stopped")
+            exit(1)
+        exit(0)
+
+    seeds = None
+    if args.seeds:
+        if args.url or args.depth is not None:
+            logging.error("Error: Give either URL DEPTH or --seeds, not both")
+            parser.print_help()
+            exit(1)
+        try:
+            seeds = parse_seeds_file(args.seeds, args.max_pages)
+        except (OSError, ValueError) as e:
+            logging.error(f"Error: Could not read seeds: {e}")
+            exit(1)
+        if not seeds:
+            logging.error(f"Error: No seeds in {args.seeds}")
+            exit(1)
+    elif args.url is None or args.depth is None:
+        logging.error("Error: URL and DEPTH are required unless --seeds is given")
+        parser.print_help()
+        exit(1)
+
     # URL validation
-    if not is_valid_url(args.url):
+    elif not is_valid_url(args.url):
         logging.error("Error: Invalid URL format. URL must start with http:// or https://")
         parser.print_help()
         exit(1)
 
     # Depth validation
-    if args.depth < 0:
+    elif args.depth < 0:
         logging.error("Error: Depth must be non-negative")
         parser.print_help()
         exit(1)
 
+    if args.batch_sites < 1 or (args.batch_slots is not None and args.batch_slots < 1):
+        logging.error("Error: Batch limits must be at least 1")
+        parser.print_help()
+        exit(1)
+
+    if args.shards is not None and args.shards < 1:
+        logging.error("Error: Shards must be at least 1")
+        parser.print_help()
+        exit(1)
+
     # Rate limiting validation
     if args.requests_per_second <= 0:
         logging.error("Error: Requests per second must be positive")
         parser.print_help()
         exit(1)
 
+    # Concurrency validation
+    if args.concurrency < 1 or args.per_host_concurrency < 1:
+        logging.error("Error: Concurrency limits must be at least 1")
+        parser.print_help()
+        exit(1)
+
+    if args.parse_workers < 0:
+        logging.error("Error: Parse workers must be non-negative")
+        parser.print_help()
+        exit(1)
+
+    if args.parse_workers and args.engine != 'async':
+        logging.error("Error: --parse-workers requires --engine async")
+        parser.print_help()
+        exit(1)
+
+    if args.parse_workers and args.stream_parse:
+        logging.error("Error: --parse-workers cannot be used with --stream-parse")
+        parser.print_help()
+        exit(1)
+
+    if not 0 < args.bloom_error_rate < 1:
+        logging.error("Error: Bloom error rate must be between 0 and 1")
+        parser.print_help()
+        exit(1)
+
+    if args.incremental and args.no_validator_cache:
+        logging.error("Error: --incremental needs the validator cache")
+        parser.print_help()
+        exit(1)
+
+    if args.adaptive and args.max_requests_per_second < args.requests_per_second:
+        logging.error("Error: Max requests per second must be at least the starting rate")
+        parser.print_help()
+        exit(1)
+
+    if (args.max_duration is not None and args.max_duration <= 0) or (
+            args.drain_grace is not None and args.drain_grace < 0):
+        logging.error("Error: Max duration must be positive and drain grace non-negative")
+        parser.print_help()
+        exit(1)
+
+    if args.max_retries < 0 or args.retry_delay < 0:
+        logging.error("Error: Retry limits must be non-negative")
+        parser.print_help()
+        exit(1)
+
+    if args.max_body_size < 0:
+        logging.error("Error: Max body size must be non-negative")
+        parser.print_help()
+        exit(1)
+
+    if args.resume and not args.checkpoint_dir:
+        logging.error("Error: --resume requires --checkpoint-dir")
+        parser.print_help()
+        exit(1)
+
+    if args.frontier_dir and args.strategy != 'bfs':
+        logging.error("Error: --frontier-dir only supports --strategy bfs")
+        parser.print_help()
+        exit(1)
+
+    failed_urls = []
     try:
-        results = crawl(
-            args.url,
-            args.depth,
-            args.max_pages,
-            args.timeout,
-            args.requests_per_second,
-            args.rotate_agent_after
+        options = dict(
+            timeout=args.timeout,
+            requests_per_second=args.requests_per_second,
+            rotate_agent_after=args.rotate_agent_after,
+            engine=args.engine,
+            concurrency=args.concurrency,
+            per_host_concurrency=args.per_host_concurrency,
+            parse_workers=args.parse_workers,
+            html_parser=args.html_parser,
+            stream_parse=args.stream_parse,
+            strategy=args.strategy,
+            frontier_dir=args.frontier_dir,
+            strip_params=tuple(p.strip() for p in args.strip_params.split(',') if p.strip()),
+            strip_trailing_slash=args.strip_trailing_slash,
+            follow_canonical=args.follow_canonical,
+            seen_set=args.seen_set,
+            bloom_error_rate=args.bloom_error_rate,
+            near_duplicate_threshold=args.near_duplicate_threshold,
+            validator_cache=None if args.no_validator_cache else args.validator_cache,
+            incremental=args.incremental,
+            recrawl_after=args.recrawl_after,
+            checkpoint_dir=args.checkpoint_dir,
+            checkpoint_every=args.checkpoint_every,
+            resume=args.resume,
+            max_body_size=int(args.max_body_size * 1024 * 1024),
+            robots_txt=not args.ignore_robots,
+            robots_cache=args.robots_cache,
+            robots_ttl=args.robots_ttl,
+            sitemaps=args.sitemaps,
+            adaptive=args.adaptive,
+            max_requests_per_second=args.max_requests_per_second,
+            max_retries=args.max_retries,
+            retry_base_delay=args.retry_delay,
+            failed_urls=failed_urls,
+            max_duration=args.max_duration * 60 if args.max_duration else None,
+            drain_grace=args.drain_grace
         )
-        save_results(results)
+        if args.shards:
+            options.pop('failed_urls')
+            options['strip_params'] = list(options['strip_params'])
+            results = crawl_sharded(
+                seeds or [{'url': args.url, 'depth': args.depth, 'max_pages': args.max_pages, 'weight': 1}],
+                args.shards, args.store, spawn_workers=not args.no_spawn_workers,
+                max_sites=args.batch_sites, slots=args.batch_slots, fairness=args.fairness,
+                failed_urls=failed_urls, **options
+            )
+        elif seeds:
+            results = crawl_batch(seeds, max_sites=args.batch_sites, slots=args.batch_slots,
+                                  fairness=args.fairness, **options)
+        else:
+            results = crawl(args.url, args.depth, args.max_pages, **options)
+        save_results(results, failed_urls)
         logging.info("Results saved successfully")
     except KeyboardInterrupt:
         logging.info("\nCrawl interrupted by user. Saving partial results...")
         if 'results' in locals() and results:
-            save_results(results)
+            save_results(results, failed_urls)
         exit(0)
     except Exception as e:
         logging.error(f"Unexpected error: {str(e)}")
         if 'results' in locals() and results:
-            save_results(results)
+            save_results(results, failed_urls)
         exit(1)
@@ -0,0 +1,76 @@
+"""
+Measure what the single-pass extract_page saves over the separate analyzers.
+
+Parses each page of a corpus once per parser, then times (in CPU time)
+extract_metadata, analyze_link_quality, count_resources and the word count
+and SimHash run one after the other, each walking the page again, against
+extract_page doing all of it in one walk. Parsing is left out of both timings. Checks
+the two give the same results while at it.
+
+Usage:
+  python scripts/benchmark_extraction.py                  # large synthetic pages
+  python scripts/benchmark_extraction.py --corpus saved_pages/ --rounds 3
+"""
+
+import os
+import sys
+import time
+import argparse
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from crawler import (analyze_link_quality, count_resources, extract_metadata,  # noqa: E402
+                     extract_page, parse_html, simhash, HTML_PARSERS)
+from benchmark_parsers import load_corpus, synthetic_corpus  # noqa: E402
+
+URL = 'https://example.test/page'
+
+
+def separate(doc):
+    words = doc.words()
+    return (extract_metadata(doc, URL), analyze_link_quality(doc, URL),
+            count_resources(doc, URL), len(words), simhash(words))
+
+
+def fused(doc):
+    return extract_page(doc, URL)
+
+
+def cpu_per_page(extract, docs, rounds):
+    start = time.process_time()
+    for _ in range(rounds):
+        for doc in docs:
+            extract(doc)
+    return (time.process_time() - start) / (len(docs) * rounds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark single-pass page extraction')
+    parser.add_argument('--corpus', help='Directory of saved .html pages (default: synthetic pages)')
+    parser.add_argument('--pages', type=int, default=100,
+                        help='Synthetic pages to generate, of which the largest are kept (default: 100)')
+    parser.add_argument('--rounds', type=int, default=1, help='Times to extract each page (default: 1)')
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+    else:
+        # The largest of the synthetic pages, 2000 links and paragraphs each
+        corpus = [html for html in synthetic_corpus(args.pages) if len(html) > 100_000]
+    size = sum(len(html) for html in corpus) / len(corpus)
+    print(f"{len(corpus)} pages of {size / 1024:.0f} KB on average, {args.rounds} round(s)")
+    print(f"{'parser':>12}{'separate ms':>13}{'fused ms':>10}{'saved':>8}")
+    for name in HTML_PARSERS:
+        docs = [parse_html(html, name) for html in corpus]
+        for doc in docs:
+            if repr(separate(doc)) != repr(fused(doc)):
+                raise SystemExit(f"extract_page differs from the separate analyzers with {name}")
+        before = cpu_per_page(separate, docs, args.rounds)
+        after = cpu_per_page(fused, docs, args.rounds)
+        print(f"{name:>12}{before * 1000:>13.1f}{after * 1000:>10.1f}{1 - after / before:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark the in-memory and SQLite-backed crawl frontiers.
+
+For each frontier and size, a fresh process pushes N synthetic URLs (every
+push goes through the seen-set check), then pops them all, and reports
+throughput plus how much resident memory the run added.
+
+Usage:
+  python scripts/benchmark_frontier.py                    # 1M and 10M URLs
+  python scripts/benchmark_frontier.py --sizes 100000 1000000
+"""
+
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+
+
+def make_url(i):
+    """Return a realistic-looking URL spread over 1000 hosts."""
+    return f"https://host{i % 1000}.example.com/section/{i % 37}/page-{i}.html?ref={i % 7}"
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (Linux reports KB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_one(kind, size, queue):
+    """Fill and drain one frontier; report results through queue."""
+    import crawler
+
+    baseline = peak_rss_mb()
+    tmpdir = tempfile.mkdtemp()
+    if kind == 'disk':
+        db = crawler.open_frontier_db(os.path.join(tmpdir, 'frontier.sqlite3'), reset=True)
+        frontier = crawler.DiskFrontier(db)
+    else:
+        frontier = crawler.CrawlFrontier()
+
+    start = time.perf_counter()
+    for i in range(size):
+        frontier.push(make_url(i), 1)
+    push_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    while frontier:
+        frontier.pop()
+    pop_time = time.perf_counter() - start
+
+    rss = peak_rss_mb() - baseline
+    frontier.close()
+    queue.put({
+        'kind': kind,
+        'size': size,
+        'push_rate': size / push_time,
+        'pop_rate': size / pop_time,
+        'rss_mb': rss,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark crawl frontier throughput and memory')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 10_000_000],
+                        help='Numbers of URLs to push and pop (default: 1000000 10000000)')
+    parser.add_argument('--kinds', nargs='+', choices=['memory', 'disk'], default=['memory', 'disk'],
+                        help='Frontiers to benchmark (default: both)')
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    print(f"{'frontier':<10}{'urls':>12}{'push/s':>12}{'pop/s':>12}{'peak RSS added':>18}")
+    for size in args.sizes:
+        for kind in args.kinds:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=run_one, args=(kind, size, queue))
+            proc.start()
+            row = queue.get()
+            proc.join()
+            print(f"{row['kind']:<10}{row['size']:>12,}{row['push_rate']:>12,.0f}"
+                  f"{row['pop_rate']:>12,.0f}{row['rss_mb']:>15,.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
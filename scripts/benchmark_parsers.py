@@ -0,0 +1,102 @@
+"""
+Compare the HTML parsers pages can be analyzed with.
+
+Runs analyze_page over a corpus of saved pages with each parser in
+HTML_PARSERS and reports pages per second and peak memory. Each parser runs
+in its own process, so peak memory (the growth of the process's maximum
+resident set while analyzing) includes what lxml allocates outside Python.
+Without --corpus a synthetic corpus of pages of mixed sizes is used.
+
+Usage:
+  python scripts/benchmark_parsers.py                     # 200 synthetic pages
+  python scripts/benchmark_parsers.py --corpus saved_pages/ --rounds 5
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import random
+import resource
+import argparse
+import subprocess
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+
+from crawler import analyze_page, HTML_PARSERS  # noqa: E402
+
+
+def synthetic_corpus(pages, seed=0):
+    """Return pages of 20 to 2000 links and paragraphs, like article and index pages"""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(pages):
+        size = rng.choice([20, 100, 500, 2000])
+        links = ''.join(
+            f'<li><a href="{rng.choice(["/p", "https://other.test/p"])}{j}">Article number {j}</a></li>'
+            for j in range(size)
+        )
+        paragraphs = ''.join(f'<p>Paragraph {j} with <b>some</b> words in it.</p>' for j in range(size))
+        corpus.append(
+            f'<!DOCTYPE html><html><head><title>Page {i}</title>'
+            f'<meta name="description" content="Page {i}"><link rel="stylesheet" href="/site.css">'
+            f'<script src="/app.js"></script></head><body><nav><ul>{links}</ul></nav>'
+            f'<main>{paragraphs}<img src="/hero{i}.jpg"></main></body></html>'
+        )
+    return corpus
+
+
+def load_corpus(path):
+    corpus = []
+    for name in sorted(glob.glob(os.path.join(path, '**', '*.htm*'), recursive=True)):
+        with open(name, encoding='utf-8', errors='replace') as f:
+            corpus.append(f.read())
+    return corpus
+
+
+def run(parser, corpus, rounds):
+    """Analyze the corpus rounds times with one parser, in this process"""
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in corpus:
+            analyze_page(html, 'https://example.test/page', 1, len(html), 200, parser=parser)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    return {'pages': len(corpus) * rounds, 'seconds': elapsed, 'peak_kib': peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark HTML parsers for page analysis')
+    parser.add_argument('--corpus', help='Directory of saved .html pages (default: synthetic pages)')
+    parser.add_argument('--pages', type=int, default=200, help='Synthetic pages to generate (default: 200)')
+    parser.add_argument('--rounds', type=int, default=1, help='Times to analyze the corpus (default: 1)')
+    parser.add_argument('--parser', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.pages)
+    if args.parser:
+        print(json.dumps(run(args.parser, corpus, args.rounds)))
+        return
+
+    size = sum(len(html) for html in corpus)
+    print(f"{len(corpus)} pages, {size / 1024 / 1024:.1f} MB of HTML, {args.rounds} round(s)")
+    print(f"{'parser':>12}{'pages/s':>10}{'MB/s':>8}{'peak MB':>9}{'speedup':>9}")
+    baseline = None
+    for name in HTML_PARSERS:
+        # A fresh process per parser so peak memory is its own
+        output = subprocess.run([sys.executable, __file__, '--parser', name, '--rounds', str(args.rounds)]
+                                + (['--corpus', args.corpus] if args.corpus else ['--pages', str(args.pages)]),
+                                check=True, capture_output=True, text=True).stdout
+        stats = json.loads(output)
+        rate = stats['pages'] / stats['seconds']
+        baseline = baseline or rate
+        print(f"{name:>12}{rate:>10.1f}{size * args.rounds / stats['seconds'] / 1024 / 1024:>8.1f}"
+              f"{stats['peak_kib'] / 1024:>9.1f}{rate / baseline:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compare memory and throughput of the crawler's seen-set implementations.
+
+Each seen-set runs in a fresh process: it adds N synthetic URLs, then looks
+up N URLs of which half were added, and reports add/lookup throughput, the
+peak resident memory the run added and, for the Bloom filter, the observed
+false-positive rate. The URL strings are generated on the fly, so the
+memory figure is what the set itself keeps alive.
+
+Usage:
+  python scripts/benchmark_seen_set.py                 # 1M URLs
+  python scripts/benchmark_seen_set.py --size 5000000 --error-rate 0.0001
+"""
+
+import os
+import sys
+import time
+import argparse
+import resource
+import multiprocessing
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+
+
+def make_url(i):
+    """Return a realistic-looking URL spread over 1000 hosts."""
+    return f"https://host{i % 1000}.example.com/section/{i % 37}/page-{i}.html?ref={i % 7}"
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (Linux reports KB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_one(kind, size, error_rate, queue):
+    """Fill and query one seen-set; report results through queue."""
+    import crawler
+
+    baseline = peak_rss_mb()
+    seen = crawler.create_seen_set(kind, capacity=size, error_rate=error_rate)
+
+    start = time.perf_counter()
+    for i in range(size):
+        seen.add(make_url(i))
+    add_time = time.perf_counter() - start
+
+    # Half the lookups hit, half miss
+    start = time.perf_counter()
+    false_positives = 0
+    for i in range(size // 2, size + size // 2):
+        if make_url(i) in seen and i >= size:
+            false_positives += 1
+    lookup_time = time.perf_counter() - start
+
+    queue.put({
+        'kind': kind,
+        'add_rate': size / add_time,
+        'lookup_rate': size / lookup_time,
+        'rss_mb': peak_rss_mb() - baseline,
+        'false_positive_rate': false_positives / (size - size // 2),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark crawler seen-set memory and throughput')
+    parser.add_argument('--size', type=int, default=1_000_000,
+                        help='Number of URLs to add (default: 1000000)')
+    parser.add_argument('--error-rate', type=float, default=0.001,
+                        help='Target false-positive rate for the Bloom filter (default: 0.001)')
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    print(f"{args.size:,} URLs")
+    print(f"{'seen set':<13}{'add/s':>12}{'lookup/s':>12}{'peak RSS added':>18}{'bytes/URL':>11}{'false pos':>11}")
+    for kind in ['set', 'fingerprint', 'bloom']:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_one, args=(kind, args.size, args.error_rate, queue))
+        proc.start()
+        row = queue.get()
+        proc.join()
+        print(f"{row['kind']:<13}{row['add_rate']:>12,.0f}{row['lookup_rate']:>12,.0f}"
+              f"{row['rss_mb']:>15,.1f} MB{row['rss_mb'] * 2**20 / args.size:>11,.0f}"
+              f"{row['false_positive_rate']:>11.4%}")
+
+
+if __name__ == "__main__":
+    main()
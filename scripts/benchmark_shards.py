@@ -0,0 +1,80 @@
+"""
+Measure how a sharded crawl scales with the number of worker processes.
+
+Starts H local stand-in sites (one port, and so one host, each) whose
+pages answer after a fixed latency, then crawls all of them with
+crawl_sharded over 1, 2, 4, ... worker processes, each crawling one seed
+at a time, and reports pages per second and the speedup over one worker.
+With many hosts the work splits evenly by host hash, so throughput should
+grow close to linearly until the machine runs out of cores or sockets.
+
+Usage:
+  python scripts/benchmark_shards.py                      # 32 hosts, 1-8 workers
+  python scripts/benchmark_shards.py --hosts 64 --pages 20 --latency 0.05 --shards 1 2 4 8 16
+
+Workers log to stderr as usual; add 2>/dev/null to see only the table.
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, 'tests'))
+
+from crawler import crawl_sharded  # noqa: E402
+from local_site import LocalSite, page  # noqa: E402
+
+
+def make_site(pages, latency):
+    """Return the pages of a site whose home page links to pages - 1 others"""
+    def slow(title):
+        def respond(handler):
+            time.sleep(latency)
+            return 200, {'Content-Type': 'text/html'}, page(title)
+        return respond
+
+    site = {f'/p{i}': slow(f'P{i}') for i in range(1, pages)}
+    site['/'] = page('Home', list(site))
+    return site
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sharded crawl throughput')
+    parser.add_argument('--hosts', type=int, default=32, help='Local sites to crawl (default: 32)')
+    parser.add_argument('--pages', type=int, default=10, help='Pages per site (default: 10)')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Seconds each page takes to answer (default: 0.05)')
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='Worker counts to try (default: 1 2 4 8)')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    sites = [LocalSite(make_site(args.pages, args.latency)) for _ in range(args.hosts)]
+    for site in sites:
+        site.__enter__()
+    seeds = [{'url': site.url('/'), 'depth': 1, 'max_pages': args.pages, 'weight': 1} for site in sites]
+    store_path = os.path.join(tempfile.mkdtemp(), 'shards.sqlite3')
+
+    print(f"{'workers':>8}{'pages':>8}{'seconds':>10}{'pages/s':>10}{'speedup':>10}")
+    baseline = None
+    try:
+        for shards in args.shards:
+            start = time.perf_counter()
+            results = crawl_sharded(seeds, shards, store_path, poll_interval=0.05,
+                                    requests_per_second=1000, robots_txt=False)
+            elapsed = time.perf_counter() - start
+            rate = len(results) / elapsed
+            baseline = baseline or rate
+            print(f"{shards:>8}{len(results):>8}{elapsed:>10.2f}{rate:>10.1f}{rate / baseline:>9.2f}x")
+    finally:
+        for site in sites:
+            site.__exit__()
+
+
+if __name__ == "__main__":
+    main()
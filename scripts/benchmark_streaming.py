@@ -0,0 +1,94 @@
+"""
+Compare analyzing pages while they download with parsing them afterwards.
+
+Analyzes a corpus of pages with analyze_page after building a document
+tree with each parser in HTML_PARSERS, and with a StreamingExtractor fed
+each page in 64 KB chunks as stream_parse does, and reports pages per
+second and peak memory. Each way runs in its own process, so peak memory
+(the growth of the process's maximum resident set) is its own. Without
+--corpus, large synthetic pages are used, repeated to the size --scale
+sets, where a tree costs the most.
+
+Usage:
+  python scripts/benchmark_streaming.py                   # 1 MB pages
+  python scripts/benchmark_streaming.py --scale 10        # 10 MB pages
+  python scripts/benchmark_streaming.py --corpus saved_pages/
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from crawler import analyze_page, StreamingExtractor, HTML_PARSERS  # noqa: E402
+from benchmark_parsers import load_corpus, synthetic_corpus  # noqa: E402
+
+URL = 'https://example.test/page'
+CHUNK_SIZE = 64 * 1024
+
+
+def large_corpus(scale):
+    """Return the largest synthetic pages, their <main> repeated to about scale MB"""
+    corpus = []
+    for html in synthetic_corpus(20):
+        if len(html) > 100_000:
+            head, rest = html.split('<main>', 1)
+            main, tail = rest.split('</main>', 1)
+            corpus.append(f"{head}<main>{main * max(scale * 1024 * 1024 // len(html), 1)}</main>{tail}")
+    return corpus
+
+
+def run(mode, corpus):
+    """Analyze the corpus one way, in this process"""
+    bodies = [html.encode('utf-8') for html in corpus]
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    for body in bodies:
+        if mode == 'stream':
+            extractor = StreamingExtractor(URL)
+            for i in range(0, len(body), CHUNK_SIZE):
+                extractor.feed_bytes(body[i:i + CHUNK_SIZE])
+                extractor.new_links()
+            extractor.close()
+        else:
+            analyze_page(str(body, 'utf-8'), URL, 1, len(body), 200, parser=mode)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    return {'pages': len(bodies), 'seconds': elapsed, 'peak_kib': peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streaming page analysis')
+    parser.add_argument('--corpus', help='Directory of saved .html pages (default: synthetic pages)')
+    parser.add_argument('--scale', type=int, default=1, help='Synthetic page size in MB, roughly (default: 1)')
+    parser.add_argument('--mode', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else large_corpus(args.scale)
+    if args.mode:
+        print(json.dumps(run(args.mode, corpus)))
+        return
+
+    size = sum(len(html) for html in corpus) / len(corpus)
+    print(f"{len(corpus)} pages of {size / 1024 / 1024:.1f} MB on average")
+    print(f"{'analysis':>12}{'pages/s':>10}{'MB/s':>8}{'peak MB':>9}")
+    for mode in [*HTML_PARSERS, 'stream']:
+        # A fresh process per way so peak memory is its own
+        output = subprocess.run([sys.executable, __file__, '--mode', mode]
+                                + (['--corpus', args.corpus] if args.corpus else ['--scale', str(args.scale)]),
+                                check=True, capture_output=True, text=True).stdout
+        stats = json.loads(output)
+        print(f"{mode:>12}{stats['pages'] / stats['seconds']:>10.1f}"
+              f"{size * stats['pages'] / stats['seconds'] / 1024 / 1024:>8.1f}{stats['peak_kib'] / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""A tiny in-process HTTP site for exercising the crawler without the network."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def page(title, links=(), body=''):
+    """Return a minimal HTML page linking to each path in links."""
+    anchors = ''.join(f'<a href="{href}">link to {href}</a>' for href in links)
+    return (
+        f'<html><head><title>{title}</title></head>'
+        f'<body><p>{body or title}</p>{anchors}</body></html>'
+    )
+
+
+class LocalSite:
+    """Serve a dict of path -> HTML (or path -> (status, headers, body)) on localhost.
+
+    An entry may also be a callable taking the request handler and returning
+    a (status, headers, body) tuple, for responses that depend on the request.
+    A body that is an iterator of chunks is sent chunk by chunk as it yields
+    them, for downloads that take a while.
+
+    Use as a context manager; `url(path)` builds absolute URLs and `hits`
+    records every path requested in order, apart from /robots.txt, whose
+    requests are counted in `robots_hits`.
+    """
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.hits = []
+        self.robots_hits = 0
+        self.request_headers = []
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/robots.txt':
+                    site.robots_hits += 1
+                else:
+                    site.hits.append(self.path)
+                    site.request_headers.append(dict(self.headers))
+                entry = site.pages.get(self.path)
+                if callable(entry):
+                    entry = entry(self)
+                if entry is None:
+                    status, headers, body = 404, {'Content-Type': 'text/html'}, 'not found'
+                elif isinstance(entry, tuple):
+                    status, headers, body = entry
+                else:
+                    status, headers, body = 200, {'Content-Type': 'text/html; charset=utf-8'}, entry
+                streamed = not isinstance(body, (str, bytes))
+                if streamed:
+                    # Chunked transfer encoding needs HTTP/1.1
+                    self.protocol_version = 'HTTP/1.1'
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if streamed:
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    self.send_header('Connection', 'close')
+                else:
+                    body = body.encode('utf-8') if isinstance(body, str) else body
+                    self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                try:
+                    if not streamed:
+                        self.wfile.write(body)
+                        return
+                    for chunk in body:
+                        data = chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+                        if data:
+                            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                    self.wfile.write(b'0\r\n\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the crawler stopped reading this body
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, path='/'):
+        return f'http://127.0.0.1:{self.server.server_address[1]}{path}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
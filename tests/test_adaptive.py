@@ -0,0 +1,119 @@
+"""Tests for adaptive per-host rate and concurrency control."""
+
+import logging
+import os
+import sys
+import time
+import unittest
+from urllib.parse import urlparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import crawl, AdaptiveRateLimiter, CrawlFrontier, HostScheduler, RateLimiter  # noqa: E402
+from local_site import LocalSite, page  # noqa: E402
+
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+
+    def limiter(self):
+        return AdaptiveRateLimiter(initial_requests_per_second=2, max_requests_per_second=10,
+                                   max_concurrency=4)
+
+    def test_steady_latency_ramps_up_to_the_ceiling(self):
+        limiter = self.limiter()
+        rates = []
+        for _ in range(200):
+            limiter.handle_success('a.test', 0.05)
+            rates.append(limiter.get_host_stats('a.test')['requests_per_second'])
+        self.assertEqual(rates, sorted(rates))
+        self.assertAlmostEqual(rates[-1], 10)
+        self.assertEqual(limiter.concurrency('a.test'), 4)
+
+    def test_rising_latency_backs_off(self):
+        limiter = self.limiter()
+        for _ in range(40):
+            limiter.handle_success('a.test', 0.05)
+        fast = limiter.get_host_stats('a.test')
+        for _ in range(20):
+            limiter.handle_success('a.test', 0.5)
+        slow = limiter.get_host_stats('a.test')
+        self.assertLess(slow['requests_per_second'], fast['requests_per_second'])
+        self.assertLess(slow['concurrency'], fast['concurrency'])
+        self.assertGreater(slow['latency'], fast['latency'])
+
+    def test_errors_halve_rate_and_concurrency(self):
+        limiter = self.limiter()
+        for _ in range(100):
+            limiter.handle_success('a.test', 0.05)
+        limiter.handle_429('a.test')
+        self.assertAlmostEqual(limiter.get_host_stats('a.test')['requests_per_second'], 5)
+        self.assertEqual(limiter.concurrency('a.test'), 2)
+        limiter.handle_error('a.test')
+        self.assertAlmostEqual(limiter.get_host_stats('a.test')['requests_per_second'], 2.5)
+        self.assertEqual(limiter.concurrency('a.test'), 1)
+        self.assertEqual(limiter.concurrency('b.test'), 1)
+
+    def test_crawl_delay_is_a_floor(self):
+        limiter = self.limiter()
+        limiter.set_min_delay('a.test', 1)
+        for _ in range(100):
+            limiter.handle_success('a.test', 0.05)
+        self.assertEqual(limiter.delays['a.test'], 1)
+
+    def test_state_round_trip(self):
+        limiter = self.limiter()
+        for _ in range(10):
+            limiter.handle_success('a.test', 0.05)
+        restored = self.limiter()
+        restored.set_state(limiter.get_state())
+        self.assertEqual(restored.get_host_stats('a.test'), limiter.get_host_stats('a.test'))
+
+
+class TestHostSlots(unittest.TestCase):
+
+    def test_host_limit_parks_until_release(self):
+        frontier = CrawlFrontier(max_depth=1)
+        for url in ['https://a.test/1', 'https://a.test/2', 'https://b.test/1']:
+            frontier.push(url, 1)
+        scheduler = HostScheduler(frontier, RateLimiter(initial_requests_per_second=1000),
+                                  host_limit=lambda host: 1)
+        self.assertEqual(scheduler.take()[0], 'https://a.test/1')
+        self.assertEqual(scheduler.take()[0], 'https://b.test/1')
+        self.assertIsNone(scheduler.take())
+        # Once its token is due, a.test is found to be full and stops waiting on the clock
+        time.sleep(scheduler.wait_time())
+        self.assertIsNone(scheduler.take())
+        self.assertIsNone(scheduler.wait_time())
+
+        scheduler.release('https://a.test/1')
+        self.assertEqual(scheduler.take()[0], 'https://a.test/2')
+        self.assertFalse(scheduler)
+
+
+class TestAdaptiveCrawl(unittest.TestCase):
+
+    SITE = {
+        '/': page('Home', [f'/p{i}' for i in range(10)]),
+        **{f'/p{i}': page(f'P{i}') for i in range(10)},
+    }
+
+    def test_progress_shows_learned_limits(self):
+        for engine in ('sync', 'async'):
+            with self.subTest(engine=engine), LocalSite(self.SITE) as site:
+                with self.assertLogs(level=logging.INFO) as logs:
+                    results = crawl(site.url('/'), 1, requests_per_second=20, engine=engine,
+                                    adaptive=True, max_requests_per_second=100)
+                self.assertEqual(len(results), 11)
+                self.assertEqual(len(site.hits), 11)
+
+            output = '\n'.join(logs.output)
+            self.assertIn('Host Limit: 20.00 req/s, 1 in flight', output)
+            self.assertRegex(output, r'Host Limits: 127\.0\.0\.1:\d+: [\d.]+ req/s, \d in flight, \d+ ms latency')
+            host = urlparse(site.url('/')).netloc
+            self.assertNotIn(f'{host}: 20.00 req/s', output.split('Crawl Completed')[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
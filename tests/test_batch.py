@@ -0,0 +1,165 @@
+"""Tests for multi-seed batch crawls and the fair sharing of request slots."""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from urllib.parse import urlparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import crawl_batch, parse_seeds_file, FairShare  # noqa: E402
+from local_site import LocalSite, page  # noqa: E402
+from test_recrawl import cached_page  # noqa: E402
+
+
+class TestSeedsFile(unittest.TestCase):
+
+    def _write(self, text):
+        path = os.path.join(tempfile.mkdtemp(), 'seeds.txt')
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_parse(self):
+        path = self._write(
+            "# sites to crawl\n"
+            "https://a.test 2\n"
+            "\n"
+            "'https://b.test/?q=1' 1 --max-pages 5 --weight 2.5\n"
+        )
+        self.assertEqual(parse_seeds_file(path, max_pages=50), [
+            {'url': 'https://a.test', 'depth': 2, 'max_pages': 50, 'weight': 1},
+            {'url': 'https://b.test/?q=1', 'depth': 1, 'max_pages': 5, 'weight': 2.5},
+        ])
+
+    def test_bad_lines_name_the_line(self):
+        for line in ['https://a.test', 'https://a.test two', 'ftp://a.test 1',
+                     'https://a.test 1 --weight', 'https://a.test 1 --speed 3',
+                     'https://a.test 1 --weight 0']:
+            with self.subTest(line=line):
+                with self.assertRaisesRegex(ValueError, r'seeds\.txt:2'):
+                    parse_seeds_file(self._write(f"https://ok.test 1\n{line}\n"))
+
+
+class TestFairShare(unittest.TestCase):
+
+    def _grant_order(self, share, waiters):
+        """Queue waiters (seed names) behind a held slot and return the order they are served"""
+        order = []
+        share.acquire('holder')
+
+        def request(seed):
+            with share.slot(seed):
+                order.append(seed)
+
+        threads = []
+        for seed in waiters:
+            queued = share.waiting[seed] + 1
+            threads.append(threading.Thread(target=request, args=(seed,)))
+            threads[-1].start()
+            while share.waiting[seed] < queued:
+                time.sleep(0.001)
+        share.release()
+        for thread in threads:
+            thread.join(5)
+        return order
+
+    def test_round_robin_alternates_between_seeds(self):
+        share = FairShare(1, {'a': 3, 'b': 1})
+        self.assertEqual(self._grant_order(share, ['a'] * 3 + ['b'] * 3), ['a', 'b', 'a', 'b', 'a', 'b'])
+
+    def test_weighted_shares_follow_weights(self):
+        share = FairShare(1, {'a': 3, 'b': 1}, fairness='weighted')
+        order = self._grant_order(share, ['a'] * 6 + ['b'] * 2)
+        self.assertEqual(order, ['a', 'b', 'a', 'a', 'a', 'b', 'a', 'a'])
+
+    def test_slots_limit_requests_in_flight(self):
+        share = FairShare(2)
+        share.acquire('a')
+        share.acquire('b')
+        acquired = threading.Event()
+        thread = threading.Thread(target=lambda: (share.acquire('c'), acquired.set()))
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        share.release()
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+
+    def test_close_stops_waiting_requests(self):
+        share = FairShare(1)
+        share.acquire('a')
+        errors = []
+
+        def request():
+            try:
+                share.acquire('b')
+            except KeyboardInterrupt:
+                errors.append('interrupted')
+
+        thread = threading.Thread(target=request)
+        thread.start()
+        while not share.waiting['b']:
+            time.sleep(0.001)
+        share.close()
+        thread.join(5)
+        self.assertEqual(errors, ['interrupted'])
+
+
+class TestBatchCrawl(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_slow_site_does_not_hold_up_the_others(self):
+        def slow(title):
+            def respond(handler):
+                time.sleep(0.3)
+                return 200, {'Content-Type': 'text/html', 'ETag': f'"{title}"'}, page(title)
+            return respond
+
+        slow_pages = {'/': page('Slow', ['/1', '/2', '/3']), **{f'/{i}': slow(f'S{i}') for i in range(1, 4)}}
+        fast_pages = {
+            '/': cached_page(page('Fast', [f'/{i}' for i in range(20)]), '"fast"'),
+            **{f'/{i}': cached_page(page(f'F{i}'), f'"f{i}"') for i in range(20)},
+        }
+        cache_path = os.path.join(tempfile.mkdtemp(), 'validators.json')
+        failed = []
+        with LocalSite(slow_pages) as slow_site, LocalSite(fast_pages) as fast_site:
+            seeds = [
+                {'url': slow_site.url('/'), 'depth': 1, 'max_pages': 10, 'weight': 1},
+                {'url': fast_site.url('/'), 'depth': 1, 'max_pages': 8, 'weight': 1},
+                {'url': fast_site.url('/missing'), 'depth': 0, 'max_pages': 1, 'weight': 1},
+            ]
+            start = time.time()
+            results = crawl_batch(seeds, max_sites=3, requests_per_second=1000, failed_urls=failed,
+                                  validator_cache=cache_path)
+            elapsed = time.time() - start
+
+        by_seed = {}
+        for result in results:
+            by_seed.setdefault(result['seed'], []).append(urlparse(result['url']).path)
+        self.assertEqual(len(by_seed[seeds[0]['url']]), 4)
+        self.assertEqual(len(by_seed[seeds[1]['url']]), 8)
+        self.assertEqual([(f['seed'], f['status_code']) for f in failed], [(seeds[2]['url'], 404)])
+        # About the time of the slow site alone
+        self.assertLess(elapsed, 0.9 + 0.6)
+
+        # The slow crawl saved last without dropping what the fast one saved
+        with open(cache_path) as f:
+            cached = [urlparse(url).netloc for url in json.load(f)]
+        self.assertEqual(cached.count(urlparse(slow_site.url()).netloc), 3)
+        self.assertEqual(cached.count(urlparse(fast_site.url()).netloc), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""Tests for URL canonicalization ahead of the seen check."""
+
+import logging
+import os
+import sys
+import unittest
+from urllib.parse import urlparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import analyze_page, crawl, canonicalize_url  # noqa: E402
+from local_site import LocalSite, page  # noqa: E402
+
+
+class TestCanonicalizeUrl(unittest.TestCase):
+
+    def test_variants_collapse(self):
+        variants = [
+            'http://host.test/a',
+            'http://host.test/a#top',
+            'http://host.test/a?utm_source=x&utm_medium=y',
+            'HTTP://Host.Test:80/a',
+        ]
+        self.assertEqual({canonicalize_url(u) for u in variants}, {'http://host.test/a'})
+        self.assertEqual(canonicalize_url('http://host.test/a/', strip_trailing_slash=True), 'http://host.test/a')
+
+    def test_query_sorted_and_encoding_kept(self):
+        self.assertEqual(
+            canonicalize_url('https://h.test/s?q=a%20b&page=2&fbclid=123'),
+            'https://h.test/s?page=2&q=a%20b',
+        )
+
+    def test_non_default_port_and_root_path_kept(self):
+        self.assertEqual(canonicalize_url('https://h.test:8443'), 'https://h.test:8443/')
+
+    def test_custom_strip_params(self):
+        self.assertEqual(
+            canonicalize_url('https://h.test/?session=1&id=2&utm_source=x', strip_params=('session',)),
+            'https://h.test/?id=2&utm_source=x',
+        )
+
+    def test_trailing_slash_kept_by_default(self):
+        url = canonicalize_url('https://h.test/dir/')
+        self.assertEqual(url, 'https://h.test/dir/')
+        # Relative links on a directory page resolve inside it
+        _, links = analyze_page('<a href="intro.html">Intro</a>', url, 0, 0, 200)
+        self.assertEqual(links, ['https://h.test/dir/intro.html'])
+
+
+class TestCanonicalCrawl(unittest.TestCase):
+
+    def test_variant_links_fetched_once(self):
+        site_pages = {
+            '/': page('Home', ['/a', '/a/', '/a#top', '/a?utm_source=x']),
+            '/a': page('A'),
+            '/a/': page('A again'),
+        }
+        with LocalSite(site_pages) as site:
+            with self.assertLogs(level=logging.INFO) as logs:
+                results = crawl(site.url('/'), 1, requests_per_second=1000, strip_trailing_slash=True)
+            self.assertEqual(sorted(site.hits), ['/', '/a'])
+        self.assertEqual(len(results), 2)
+        self.assertTrue(any('Fetches Avoided by Canonicalization: 3' in line for line in logs.output))
+
+    def test_relative_links_resolve_against_the_served_url(self):
+        site_pages = {
+            '/docs/': page('Docs', ['intro.html']),
+            '/docs/intro.html': page('Intro'),
+            # A directory linked without its slash redirects to it
+            '/guide': (301, {'Location': '/guide/'}, ''),
+            '/guide/': page('Guide', ['setup.html']),
+            '/guide/setup.html': page('Setup'),
+        }
+        for engine in ('sync', 'async'):
+            for stream_parse in (False, True):
+                with self.subTest(engine=engine, stream_parse=stream_parse), LocalSite(site_pages) as site:
+                    crawl(site.url('/docs/'), 1, requests_per_second=1000, engine=engine,
+                          stream_parse=stream_parse)
+                    crawl(site.url('/guide/'), 1, requests_per_second=1000, engine=engine,
+                          stream_parse=stream_parse, strip_trailing_slash=True)
+                    self.assertEqual(site.hits, ['/docs/', '/docs/intro.html', '/guide', '/guide/',
+                                                 '/guide/setup.html'])
+
+    def test_follow_canonical_marks_target_seen(self):
+        site_pages = {
+            '/': page('Home', ['/print']),
+            '/print': (
+                '<html><head><title>Print</title><link rel="canonical" href="/article"></head>'
+                '<body><a href="/article">article</a></body></html>'
+            ),
+            '/article': page('Article'),
+        }
+        with LocalSite(site_pages) as site:
+            crawl(site.url('/'), 2, requests_per_second=1000)
+            self.assertIn('/article', site.hits)
+        with LocalSite(site_pages) as site:
+            crawl(site.url('/'), 2, requests_per_second=1000, follow_canonical=True)
+            self.assertNotIn('/article', site.hits)
+
+
+if __name__ == "__main__":
+    unittest.main()
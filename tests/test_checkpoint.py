@@ -0,0 +1,214 @@
+"""Tests for saving and resuming crawls from checkpoints."""
+
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import (  # noqa: E402
+    crawl, save_checkpoint, load_checkpoint, open_frontier_db, CrawlFrontier,
+    DiskFrontier, DiskSeenSet, PriorityFrontier, RateLimiter, CHECKPOINT_FILE,
+)
+from local_site import page, LocalSite  # noqa: E402
+
+
+class TestCheckpointState(unittest.TestCase):
+
+    def setUp(self):
+        self.checkpoint_dir = tempfile.mkdtemp()
+
+    def round_trip(self, frontier):
+        save_checkpoint(self.checkpoint_dir, {'frontier': frontier})
+        frontier.close()
+        return load_checkpoint(self.checkpoint_dir)['frontier']
+
+    def test_missing_checkpoint(self):
+        self.assertIsNone(load_checkpoint(self.checkpoint_dir))
+
+    def test_memory_frontier(self):
+        frontier = CrawlFrontier(max_depth=3)
+        for i in range(5):
+            frontier.push(f'https://a.test/{i}', 1)
+        frontier.pop()
+
+        restored = self.round_trip(frontier)
+        self.assertEqual(len(restored), 4)
+        self.assertEqual(restored.pop(), ('https://a.test/1', 1))
+        self.assertFalse(restored.push('https://a.test/0', 1))
+
+    def test_disk_frontier_reopens_database(self):
+        path = os.path.join(self.checkpoint_dir, 'frontier.db')
+        db = open_frontier_db(path, reset=True)
+        frontier = DiskFrontier(db, max_depth=3, seen=DiskSeenSet(db, buffer_size=2), buffer_size=2)
+        for i in range(10):
+            frontier.push(f'https://a.test/{i}', 1)
+        frontier.pop()
+
+        restored = self.round_trip(frontier)
+        self.assertEqual([restored.pop()[0] for _ in range(len(restored))],
+                         [f'https://a.test/{i}' for i in range(1, 10)])
+        self.assertFalse(restored.push('https://a.test/5', 1))
+        restored.close()
+
+    def test_disk_frontier_rolls_back_to_checkpoint(self):
+        path = os.path.join(self.checkpoint_dir, 'frontier.db')
+        db = open_frontier_db(path, reset=True)
+        frontier = DiskFrontier(db, max_depth=3, seen=DiskSeenSet(db, buffer_size=2), buffer_size=2)
+        frontier.push('https://a.test/0', 1)
+        save_checkpoint(self.checkpoint_dir, {'frontier': frontier})
+        for i in range(1, 10):
+            frontier.push(f'https://a.test/{i}', 1)
+        # Simulate a crash: the pushes after the checkpoint were never committed
+        frontier.db.rollback()
+        frontier.db.close()
+
+        restored = load_checkpoint(self.checkpoint_dir)['frontier']
+        self.assertEqual(len(restored), 1)
+        self.assertTrue(restored.push('https://a.test/5', 1))
+        restored.close()
+
+    def _killed_frontier(self):
+        """Checkpoint a disk frontier, pop and push past it and start a second checkpoint"""
+        path = os.path.join(self.checkpoint_dir, 'frontier.db')
+        db = open_frontier_db(path, reset=True)
+        frontier = DiskFrontier(db, max_depth=3, seen=DiskSeenSet(db, buffer_size=2), buffer_size=2)
+        for i in range(6):
+            frontier.push(f'https://a.test/{i}', 1)
+        save_checkpoint(self.checkpoint_dir, {'frontier': frontier})
+        # Drain the on-disk queue, so the first checkpoint's rows are gone
+        while frontier:
+            frontier.pop()
+        for i in range(6, 9):
+            frontier.push(f'https://a.test/{i}', 1)
+        return frontier
+
+    def test_kill_between_commit_and_swap(self):
+        frontier = self._killed_frontier()
+        with mock.patch('crawler.os.replace', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                save_checkpoint(self.checkpoint_dir, {'frontier': frontier})
+        frontier.db.close()
+
+        restored = load_checkpoint(self.checkpoint_dir)['frontier']
+        self.assertEqual([restored.pop()[0] for _ in range(len(restored))],
+                         [f'https://a.test/{i}' for i in range(6, 9)])
+        self.assertEqual(os.listdir(self.checkpoint_dir).count(CHECKPOINT_FILE + '.tmp'), 0)
+        restored.close()
+
+    def test_kill_between_write_and_commit(self):
+        frontier = self._killed_frontier()
+        with mock.patch.object(DiskFrontier, 'commit', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                save_checkpoint(self.checkpoint_dir, {'frontier': frontier})
+        frontier.db.rollback()
+        frontier.db.close()
+
+        restored = load_checkpoint(self.checkpoint_dir)['frontier']
+        self.assertEqual([restored.pop()[0] for _ in range(len(restored))],
+                         [f'https://a.test/{i}' for i in range(6)])
+        self.assertEqual(os.listdir(self.checkpoint_dir).count(CHECKPOINT_FILE + '.tmp'), 0)
+        restored.close()
+
+    def test_priority_frontier(self):
+        frontier = PriorityFrontier(max_depth=3)
+        frontier.push('https://a.test/deep/path/page', 2)
+        frontier.push('https://a.test/', 1)
+
+        restored = self.round_trip(frontier)
+        self.assertIsNone(restored.score)
+        restored.score = frontier.score
+        self.assertEqual(restored.pop()[0], 'https://a.test/')
+
+    def test_rate_limiter_state(self):
+        limiter = RateLimiter(initial_requests_per_second=2, rotate_agent_after=1)
+        limiter.handle_429('a.test')
+        limiter.get_next_user_agent()
+        limiter.get_next_user_agent()
+
+        restored = RateLimiter(initial_requests_per_second=2, rotate_agent_after=1)
+        restored.set_state(limiter.get_state())
+        self.assertEqual(restored.delays['a.test'], limiter.delays['a.test'])
+        self.assertEqual(restored.delays['b.test'], 0.5)
+        self.assertEqual(restored.get_next_user_agent(), limiter.get_next_user_agent())
+
+
+class TestResume(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.checkpoint_dir = tempfile.mkdtemp()
+        pages = {'/': page('Home', [f'/p{i}' for i in range(8)])}
+        for i in range(8):
+            pages[f'/p{i}'] = page(f'Page {i}', [], body=f'distinct words for page number {i} ' * (i + 1))
+        self.site = LocalSite(pages)
+        self.site.__enter__()
+
+    def tearDown(self):
+        self.site.__exit__(None, None, None)
+        logging.disable(logging.NOTSET)
+
+    def interrupted_crawl(self, fail_on_call, **kwargs):
+        """Crawl until the fail_on_call-th request, as if the process was killed.
+
+        The first request of a crawl is for robots.txt.
+        """
+        real_next_user_agent = RateLimiter.get_next_user_agent
+        calls = []
+
+        def next_user_agent(limiter):
+            calls.append(1)
+            if len(calls) == fail_on_call:
+                raise KeyboardInterrupt
+            return real_next_user_agent(limiter)
+
+        with mock.patch.object(RateLimiter, 'get_next_user_agent', next_user_agent):
+            with self.assertRaises(KeyboardInterrupt):
+                crawl(self.site.url('/'), 1, requests_per_second=1000,
+                      checkpoint_dir=self.checkpoint_dir, **kwargs)
+
+    def resume(self, **kwargs):
+        return crawl(self.site.url('/'), 1, requests_per_second=1000,
+                     checkpoint_dir=self.checkpoint_dir, resume=True, **kwargs)
+
+    def assert_complete(self, results):
+        paths = sorted(r['url'].split('/', 3)[3] for r in results)
+        self.assertEqual(paths, [''] + sorted(f'p{i}' for i in range(8)))
+
+    def test_resume_fetches_only_remaining_pages(self):
+        self.interrupted_crawl(6, checkpoint_every=1)
+        self.assertEqual(len(self.site.hits), 4)
+
+        results = self.resume(checkpoint_every=1)
+        self.assert_complete(results)
+        # The interrupted page never reached the server; every page is fetched once
+        self.assertEqual(len(self.site.hits), 9)
+        self.assertFalse(os.path.exists(os.path.join(self.checkpoint_dir, CHECKPOINT_FILE)))
+
+    def test_resume_with_disk_frontier(self):
+        frontier_dir = os.path.join(self.checkpoint_dir, 'frontier')
+        self.interrupted_crawl(4, checkpoint_every=2, frontier_dir=frontier_dir)
+
+        results = self.resume(checkpoint_every=2, frontier_dir=frontier_dir)
+        self.assert_complete(results)
+
+    def test_resume_async_engine(self):
+        self.interrupted_crawl(6, checkpoint_every=1, engine='async', concurrency=2)
+
+        results = self.resume(checkpoint_every=1, engine='async', concurrency=2)
+        self.assert_complete(results)
+
+    def test_checkpoint_for_other_seed_is_ignored(self):
+        self.interrupted_crawl(3, checkpoint_every=1)
+        with LocalSite({'/': page('Other', [])}) as other:
+            results = crawl(other.url('/'), 1, checkpoint_dir=self.checkpoint_dir, resume=True)
+        self.assertEqual(len(results), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
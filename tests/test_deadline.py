@@ -0,0 +1,116 @@
+"""Tests for the wall-clock time budget and the drain at its end."""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+import unittest
+from urllib.parse import urlparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import crawl, crawl_batch, load_checkpoint  # noqa: E402
+from local_site import LocalSite, page  # noqa: E402
+
+
+def slow(title, latency):
+    def respond(handler):
+        time.sleep(latency)
+        return 200, {'Content-Type': 'text/html'}, page(title)
+    return respond
+
+
+def slow_site(pages, latency):
+    site = {f'/p{i}': slow(f'P{i}', latency) for i in range(1, pages)}
+    site['/'] = page('Home', list(site))
+    return site
+
+
+class TestTimeBudget(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_stops_starting_pages_and_checkpoints_the_rest(self):
+        for engine in ('sync', 'async'):
+            checkpoint_dir = tempfile.mkdtemp()
+            with self.subTest(engine=engine), LocalSite(slow_site(30, 0.1)) as site:
+                start = time.time()
+                results = crawl(site.url('/'), 1, requests_per_second=1000, engine=engine,
+                                concurrency=2, per_host_concurrency=2, max_duration=0.8,
+                                drain_grace=0.2, checkpoint_dir=checkpoint_dir)
+                elapsed = time.time() - start
+
+                self.assertLess(elapsed, 0.8 + 0.1)
+                self.assertGreater(len(results), 2)
+                self.assertLess(len(results), 30)
+                # Every page started was finished
+                self.assertEqual(len(results), len(site.hits))
+
+                checkpoint = load_checkpoint(checkpoint_dir)
+                self.assertEqual(len(checkpoint['results']), len(results))
+                resumed = crawl(site.url('/'), 1, requests_per_second=1000, engine=engine,
+                                checkpoint_dir=checkpoint_dir, resume=True)
+                self.assertEqual(len(resumed), 30)
+                self.assertEqual(len(set(site.hits)), 30)
+
+    def test_pages_still_in_flight_at_the_deadline_are_abandoned(self):
+        site_pages = {'/': page('Home', ['/fast', '/hung']), '/fast': page('Fast'),
+                      '/hung': slow('Hung', 3)}
+        checkpoint_dir = tempfile.mkdtemp()
+        with LocalSite(site_pages) as site:
+            start = time.time()
+            results = crawl(site.url('/'), 1, requests_per_second=1000, engine='async',
+                            max_duration=0.6, drain_grace=0.3, checkpoint_dir=checkpoint_dir)
+            elapsed = time.time() - start
+        self.assertLess(elapsed, 0.6 + 0.3)
+        self.assertEqual(sorted(urlparse(r['url']).path for r in results), ['/', '/fast'])
+        in_flight = [urlparse(url).path for url, _ in load_checkpoint(checkpoint_dir)['in_flight']]
+        self.assertEqual(in_flight, ['/hung'])
+
+    def test_bodies_still_downloading_at_the_deadline_are_abandoned(self):
+        def trickle(handler):
+            def body():
+                yield '<html><head><title>Trickle</title></head><body>'
+                for _ in range(30):
+                    time.sleep(0.1)
+                    yield '<p>more</p>'
+                yield '</body></html>'
+            return 200, {'Content-Type': 'text/html; charset=utf-8'}, body()
+
+        site_pages = {'/': page('Home', ['/trickle']), '/trickle': trickle}
+        for stream_parse in (False, True):
+            checkpoint_dir = tempfile.mkdtemp()
+            with self.subTest(stream_parse=stream_parse), LocalSite(site_pages) as site:
+                start = time.time()
+                results = crawl(site.url('/'), 1, requests_per_second=1000, engine='sync',
+                                max_duration=1.0, drain_grace=0.5, checkpoint_dir=checkpoint_dir,
+                                stream_parse=stream_parse)
+                elapsed = time.time() - start
+                self.assertLess(elapsed, 1.0 + 0.3)
+                self.assertEqual([urlparse(r['url']).path for r in results], ['/'])
+                checkpoint = load_checkpoint(checkpoint_dir)
+                self.assertEqual([urlparse(url).path for url, _ in checkpoint['in_flight']], ['/trickle'])
+                self.assertEqual(checkpoint['page_count'], 1)
+
+    def test_batch_budget_skips_seeds_not_started_in_time(self):
+        with LocalSite(slow_site(10, 0.2)) as first, LocalSite(slow_site(3, 0)) as second:
+            seeds = [{'url': site.url('/'), 'depth': 1, 'max_pages': 10, 'weight': 1}
+                     for site in (first, second)]
+            start = time.time()
+            results = crawl_batch(seeds, max_sites=1, requests_per_second=1000,
+                                  max_duration=0.7, drain_grace=0.25)
+            elapsed = time.time() - start
+        self.assertLess(elapsed, 0.7 + 0.1)
+        self.assertEqual({r['seed'] for r in results}, {seeds[0]['url']})
+        self.assertEqual(second.hits, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Tests for streamed downloads, content-type gating and the body size cap."""
+
+import logging
+import os
+import sys
+import unittest
+from urllib.parse import urlparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import crawl, create_session, read_body  # noqa: E402
+from local_site import LocalSite, page  # noqa: E402
+
+BIG = 4 * 1024 * 1024
+
+SITE = {
+    '/': page('Home', ['/report.pdf', '/huge', '/small']),
+    '/report.pdf': (200, {'Content-Type': 'application/pdf'}, b'%PDF' + b'\0' * BIG),
+    '/huge': page('Huge', ['/behind-huge'], body='word ' * (BIG // 5)),
+    '/small': page('Small'),
+    '/behind-huge': page('Behind'),
+}
+
+
+class TestReadBody(unittest.TestCase):
+
+    def test_stops_reading_past_the_cap(self):
+        with LocalSite(SITE) as site:
+            session = create_session()
+            response = session.get(site.url('/huge'), stream=True)
+            self.assertIsNone(read_body(response, 64 * 1024))
+            self.assertLess(response.raw.tell(), BIG)
+
+            response = session.get(site.url('/small'), stream=True)
+            self.assertEqual(read_body(response, 64 * 1024), page('Small').encode())
+            session.close()
+
+
+class TestStreamedCrawl(unittest.TestCase):
+
+    def _crawl(self, **kwargs):
+        with LocalSite(SITE) as site:
+            with self.assertLogs(level='INFO') as logs:
+                results = crawl(site.url('/'), 2, requests_per_second=1000, **kwargs)
+        return sorted(urlparse(r['url']).path for r in results), '\n'.join(logs.output)
+
+    def test_skips_non_html_and_oversized_pages(self):
+        for engine in ('sync', 'async'):
+            with self.subTest(engine=engine):
+                paths, log = self._crawl(engine=engine, max_body_size=1024 * 1024)
+                self.assertEqual(paths, ['/', '/small'])
+                self.assertIn('Skipping non-HTML content', log)
+                self.assertIn('body is larger than 1.00 MB', log)
+                self.assertIn('Downloads Skipped: 2 non-HTML or oversized', log)
+
+    def test_no_size_limit(self):
+        paths, log = self._crawl(max_body_size=0)
+        self.assertEqual(paths, ['/', '/behind-huge', '/huge', '/small'])
+        self.assertIn('Downloads Skipped: 1 non-HTML or oversized', log)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""Tests for the sync and async fetch engines against a local site."""
+
+import gzip
+import os
+import sys
+import unittest
+from urllib.parse import urlparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import crawl, create_session, RateLimiter  # noqa: E402
+from local_site import LocalSite, page  # noqa: E402
+
+SITE = {
+    '/': page('Home', ['/a', '/b', '/c']),
+    '/a': page('A', ['/', '/a1', '/a2']),
+    '/b': page('B', ['/b1']),
+    '/c': page('C'),
+    '/a1': page('A1'),
+    '/a2': page('A2'),
+    '/b1': page('B1'),
+    '/file.zip': (200, {'Content-Type': 'application/zip'}, b'PK'),
+}
+
+
+class TestEngines(unittest.TestCase):
+
+    def _crawl(self, site, **kwargs):
+        return crawl(site.url('/'), 2, requests_per_second=1000, **kwargs)
+
+    def test_async_matches_sync(self):
+        with LocalSite(SITE) as site:
+            sync_results = self._crawl(site)
+        with LocalSite(SITE) as site:
+            async_results = self._crawl(site, engine='async', concurrency=4)
+
+        self.assertEqual(
+            sorted(urlparse(r['url']).path for r in sync_results),
+            sorted(urlparse(r['url']).path for r in async_results),
+        )
+        self.assertEqual(len(async_results), 7)
+        self.assertEqual(set(sync_results[0]), set(async_results[0]))
+
+    def test_parse_pipeline_matches_sync(self):
+        with LocalSite(SITE) as site:
+            sync_results = self._crawl(site)
+        with LocalSite(SITE) as site:
+            pipeline_results = self._crawl(
+                site, engine='async', concurrency=4, parse_workers=2, parse_queue_size=1
+            )
+
+        self.assertEqual(
+            sorted(urlparse(r['url']).path for r in sync_results),
+            sorted(urlparse(r['url']).path for r in pipeline_results),
+        )
+        by_path = {urlparse(r['url']).path: r for r in pipeline_results}
+        self.assertEqual(by_path['/a']['internal_link_count'], 3)
+        self.assertEqual(by_path['/a']['depth'], 1)
+
+    def test_parse_stage_is_drained_at_max_pages(self):
+        site_pages = {f'/p{i}': page(f'P{i}') for i in range(1, 20)}
+        site_pages['/'] = page('Home', list(site_pages))
+        with LocalSite(site_pages) as site:
+            results = crawl(site.url('/'), 1, max_pages=10, requests_per_second=1000,
+                            engine='async', parse_workers=2, per_host_concurrency=8)
+        self.assertEqual(len(results), 10)
+
+    def test_unknown_charset_is_read_as_utf8(self):
+        site_pages = {'/': (200, {'Content-Type': 'text/html; charset=foo-8'}, page('Café', ['/a'])),
+                      '/a': page('A')}
+        for options in ({}, {'engine': 'async', 'parse_workers': 2}):
+            with self.subTest(**options), LocalSite(site_pages) as site:
+                results = self._crawl(site, **options)
+                self.assertEqual([r['title'] for r in results], ['Café', 'A'])
+
+    def test_async_stops_at_max_pages(self):
+        with LocalSite(SITE) as site:
+            results = self._crawl(site, max_pages=3, engine='async', concurrency=4)
+            self.assertLessEqual(len(site.hits), 3)
+        self.assertEqual(len(results), 3)
+
+
+class TestRateLimiterReserve(unittest.TestCase):
+
+    def test_reserve_spaces_requests_per_domain(self):
+        limiter = RateLimiter(initial_requests_per_second=10)
+        self.assertEqual(limiter.reserve('a.test'), 0)
+        self.assertAlmostEqual(limiter.reserve('a.test'), 0.1, delta=0.02)
+        self.assertAlmostEqual(limiter.reserve('a.test'), 0.2, delta=0.02)
+        self.assertEqual(limiter.reserve('b.test'), 0)
+
+
+class TestPooledSession(unittest.TestCase):
+
+    def test_session_pool_sizes(self):
+        session = create_session(max_hosts=16, connections_per_host=4)
+        adapter = session.get_adapter('https://example.com')
+        self.assertEqual(adapter._pool_connections, 16)
+        self.assertEqual(adapter._pool_maxsize, 4)
+        self.assertIn('gzip', session.headers['Accept-Encoding'])
+
+    def test_compressed_page_records_wire_and_decoded_size(self):
+        html = page('Big', body='compressible ' * 2000)
+        site_pages = {
+            '/': (200, {'Content-Type': 'text/html', 'Content-Encoding': 'gzip'},
+                  gzip.compress(html.encode('utf-8'))),
+        }
+        with LocalSite(site_pages) as site:
+            results = crawl(site.url('/'), 0, requests_per_second=1000)
+            self.assertIn('gzip', site.request_headers[0]['Accept-Encoding'])
+
+        result = results[0]
+        self.assertEqual(result['decoded_size'], len(html))
+        self.assertEqual(result['content_size'], result['decoded_size'])
+        self.assertLess(result['wire_size'], result['decoded_size'])
+
+
+if __name__ == "__main__":
+    unittest.main()
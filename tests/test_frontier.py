@@ -0,0 +1,210 @@
+"""Tests for the crawl frontier and the order pages are fetched in."""
+
+import os
+import sys
+import tempfile
+import unittest
+from urllib.parse import urlparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import (  # noqa: E402
+    crawl, CrawlFrontier, DiskFrontier, DiskSeenSet, PriorityFrontier, open_frontier_db, score_url,
+)
+from local_site import LocalSite, page  # noqa: E402
+
+
+class TestCrawlFrontier(unittest.TestCase):
+
+    def test_push_dedupes_and_respects_max_depth(self):
+        frontier = CrawlFrontier(max_depth=1)
+        self.assertTrue(frontier.push('https://a.test/', 0))
+        self.assertFalse(frontier.push('https://a.test/', 1))
+        self.assertFalse(frontier.push('https://a.test/deep', 2))
+        self.assertTrue(frontier.push('https://a.test/x', 1))
+        self.assertEqual(len(frontier), 2)
+        self.assertEqual(frontier.duplicates, 1)
+
+    def test_pops_in_push_order(self):
+        frontier = CrawlFrontier()
+        for i, url in enumerate(['https://a.test/', 'https://a.test/1', 'https://a.test/2']):
+            frontier.push(url, i)
+        self.assertEqual([frontier.pop()[1] for _ in range(3)], [0, 1, 2])
+        self.assertFalse(frontier)
+
+
+class TestDiskFrontier(unittest.TestCase):
+
+    def setUp(self):
+        self.db = open_frontier_db(os.path.join(tempfile.mkdtemp(), 'frontier.sqlite3'), reset=True)
+
+    def test_fifo_order_across_spills(self):
+        frontier = DiskFrontier(self.db, buffer_size=3)
+        urls = [f'https://a.test/{i}' for i in range(20)]
+        for url in urls[:10]:
+            frontier.push(url, 1)
+        popped = [frontier.pop()[0] for _ in range(4)]
+        for url in urls[10:]:
+            frontier.push(url, 2)
+        self.assertEqual(len(frontier), 16)
+        while frontier:
+            popped.append(frontier.pop()[0])
+        self.assertEqual(popped, urls)
+
+    def test_dedupes_against_flushed_urls(self):
+        frontier = DiskFrontier(self.db, buffer_size=2)
+        for i in range(5):
+            frontier.push(f'https://a.test/{i}', 1)
+        self.assertGreater(frontier.seen.stored, 0)
+        self.assertFalse(frontier.push('https://a.test/0', 1))
+        self.assertEqual(len(frontier.seen), 5)
+        frontier.close()
+
+    def test_seen_set_persists(self):
+        seen = DiskSeenSet(self.db, buffer_size=100)
+        seen.add('https://a.test/')
+        seen.flush()
+        self.assertIn('https://a.test/', DiskSeenSet(self.db))
+
+    def test_crawl_with_disk_frontier(self):
+        site_pages = {
+            '/': page('Home', ['/a', '/b']),
+            '/a': page('A', ['/b']),
+            '/b': page('B'),
+        }
+        with LocalSite(site_pages) as site:
+            results = crawl(site.url('/'), 2, requests_per_second=1000,
+                            frontier_dir=tempfile.mkdtemp())
+        self.assertEqual([urlparse(r['url']).path for r in results], ['/', '/a', '/b'])
+
+
+class TestPriorityFrontier(unittest.TestCase):
+
+    def test_pops_lowest_score_first(self):
+        frontier = PriorityFrontier()
+        frontier.push('https://a.test/x/y/z?sort=asc&page=2', 1)
+        frontier.push('https://a.test/about', 1)
+        frontier.push('https://a.test/x/y', 1)
+        self.assertEqual(
+            [frontier.pop()[0] for _ in range(3)],
+            ['https://a.test/about', 'https://a.test/x/y', 'https://a.test/x/y/z?sort=asc&page=2'],
+        )
+
+    def test_inlinks_raise_priority(self):
+        frontier = PriorityFrontier()
+        frontier.push('https://a.test/a/b', 1)
+        frontier.push('https://a.test/c/d', 1)
+        for _ in range(5):
+            frontier.push('https://a.test/c/d', 1)
+        self.assertEqual(len(frontier), 2)
+        self.assertEqual(frontier.pop()[0], 'https://a.test/c/d')
+        self.assertEqual(frontier.pop()[0], 'https://a.test/a/b')
+        self.assertFalse(frontier)
+
+    def test_peek_matches_pop_after_rescoring(self):
+        frontier = PriorityFrontier()
+        frontier.push('https://a.test/a/b', 1)
+        frontier.push('https://a.test/c/d', 1)
+        frontier.push('https://a.test/c/d', 1)
+        self.assertEqual(frontier.peek(), ('https://a.test/c/d', 1))
+        self.assertEqual(frontier.pop(), ('https://a.test/c/d', 1))
+        self.assertEqual(frontier.peek(), ('https://a.test/a/b', 1))
+        self.assertEqual(len(frontier), 1)
+
+    def test_popped_urls_are_not_requeued(self):
+        frontier = PriorityFrontier()
+        frontier.push('https://a.test/', 0)
+        frontier.pop()
+        self.assertFalse(frontier.push('https://a.test/', 1))
+
+    def test_stale_entries_are_compacted(self):
+        frontier = PriorityFrontier()
+        frontier.push('https://a.test/hub', 1)
+        for _ in range(5000):
+            frontier.push('https://a.test/hub', 1)
+        self.assertLess(len(frontier.heap), 2100)
+        self.assertEqual(frontier.pop(), ('https://a.test/hub', 1))
+
+    def test_custom_scorer(self):
+        frontier = PriorityFrontier(score=lambda url, depth, inlinks: -len(url))
+        frontier.push('https://a.test/short', 1)
+        frontier.push('https://a.test/much/longer/path', 1)
+        self.assertEqual(frontier.pop()[0], 'https://a.test/much/longer/path')
+
+    def test_default_score_prefers_shallow_paths(self):
+        self.assertLess(score_url('https://a.test/a', 1, 0), score_url('https://a.test/a/b/c', 1, 0))
+
+
+class TestBreadthFirstCrawl(unittest.TestCase):
+
+    def test_page_budget_goes_to_shallow_pages(self):
+        # A deep branch hangs off the first link; depth-first would follow it
+        site_pages = {
+            '/': page('Home', ['/deep1', '/b', '/c']),
+            '/deep1': page('Deep 1', ['/deep2']),
+            '/deep2': page('Deep 2', ['/deep3']),
+            '/deep3': page('Deep 3'),
+            '/b': page('B'),
+            '/c': page('C'),
+        }
+        with LocalSite(site_pages) as site:
+            results = crawl(site.url('/'), 5, max_pages=4, requests_per_second=1000)
+        self.assertEqual(
+            [urlparse(r['url']).path for r in results],
+            ['/', '/deep1', '/b', '/c'],
+        )
+
+    def test_each_page_fetched_once(self):
+        site_pages = {
+            '/': page('Home', ['/a', '/b']),
+            '/a': page('A', ['/', '/b']),
+            '/b': page('B', ['/', '/a']),
+        }
+        with LocalSite(site_pages) as site:
+            crawl(site.url('/'), 3, requests_per_second=1000)
+            self.assertEqual(sorted(site.hits), ['/', '/a', '/b'])
+
+    def test_deep_chain_does_not_recurse(self):
+        chain_length = sys.getrecursionlimit() + 50
+        site_pages = {
+            f'/{i}': page(f'Page {i}', [f'/{i + 1}']) for i in range(chain_length)
+        }
+        with LocalSite(site_pages) as site:
+            results = crawl(site.url('/0'), chain_length, max_pages=chain_length,
+                            requests_per_second=100000)
+        self.assertEqual(len(results), chain_length)
+
+
+class TestBestFirstCrawl(unittest.TestCase):
+
+    def test_budget_goes_to_best_scoring_pages(self):
+        site_pages = {
+            '/': page('Home', ['/x/y/z?a=1&b=2', '/x/y/w?a=1', '/about', '/contact']),
+            '/about': page('About'),
+            '/contact': page('Contact'),
+        }
+        with LocalSite(site_pages) as site:
+            results = crawl(site.url('/'), 2, max_pages=3, requests_per_second=1000,
+                            strategy='best-first')
+        self.assertEqual(
+            sorted(urlparse(r['url']).path for r in results),
+            ['/', '/about', '/contact'],
+        )
+
+    def test_best_first_order_holds_when_rate_limited(self):
+        site_pages = {
+            '/': page('Home', ['/hub'] + [f'/deep/a/b/c/{i}' for i in range(5)]),
+            '/hub': page('Hub', ['/important']),
+            '/important': page('Important'),
+        }
+        for engine in ('sync', 'async'):
+            with self.subTest(engine=engine), LocalSite(site_pages) as site:
+                results = crawl(site.url('/'), 2, max_pages=3, requests_per_second=4,
+                                strategy='best-first', engine=engine)
+                self.assertEqual([urlparse(r['url']).path for r in results], ['/', '/hub', '/important'])
+
+
+if __name__ == "__main__":
+    unittest.main()
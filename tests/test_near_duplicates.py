@@ -0,0 +1,99 @@
+"""Tests for SimHash near-duplicate detection."""
+
+import os
+import sys
+import unittest
+from urllib.parse import urlparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import crawl, simhash, SimHashIndex  # noqa: E402
+from local_site import LocalSite, page  # noqa: E402
+
+ARTICLE = (
+    "The crawler walks every internal link it finds and records metrics for each page "
+    "it visits including links resources metadata and the size of the downloaded content "
+    "so that the dashboard can chart how a site is put together and where it spends bytes"
+)
+
+
+def distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class TestSimHash(unittest.TestCase):
+
+    def test_similar_text_is_close_and_different_text_is_far(self):
+        base = simhash(ARTICLE.split())
+        edited = simhash((ARTICLE + " today").split())
+        other = simhash("Completely unrelated words about cooking pasta with garlic and olive oil".split())
+        self.assertLessEqual(distance(base, edited), 3)
+        self.assertGreater(distance(base, other), 10)
+
+    def test_case_insensitive(self):
+        self.assertEqual(simhash(ARTICLE.upper().split()), simhash(ARTICLE.split()))
+
+
+class TestSimHashIndex(unittest.TestCase):
+
+    def test_finds_fingerprints_within_threshold(self):
+        index = SimHashIndex(threshold=3)
+        index.add(0b1011 << 40, 'https://a.test/')
+        self.assertEqual(index.find((0b1011 << 40) ^ 0b111), 'https://a.test/')
+        self.assertIsNone(index.find((0b1011 << 40) ^ 0b1111))
+
+
+class TestNearDuplicateCrawl(unittest.TestCase):
+
+    def test_duplicate_pages_are_marked_and_not_expanded(self):
+        site_pages = {
+            '/': page('Home', ['/list?sort=asc', '/list?sort=desc']),
+            '/list?sort=asc': page('List', ['/item1'], body=ARTICLE),
+            '/list?sort=desc': page('List', ['/item2'], body=ARTICLE),
+            '/item1': page('Item one'),
+            '/item2': page('Item two'),
+        }
+        with LocalSite(site_pages) as site:
+            results = crawl(site.url('/'), 2, requests_per_second=1000)
+            self.assertNotIn('/item2', site.hits)
+
+        by_url = {r['url']: r for r in results}
+        duplicate = by_url[site.url('/list?sort=desc')]
+        self.assertEqual(duplicate['duplicate_of'], site.url('/list?sort=asc'))
+        self.assertEqual(by_url[site.url('/list?sort=asc')]['duplicate_of'], '')
+        self.assertEqual(len(duplicate['content_simhash']), 16)
+
+    def test_pages_with_little_text_are_not_compared(self):
+        def gallery(image, link):
+            return f'<html><body><img src="{image}"><a href="{link}"><img src="/next.png"></a></body></html>'
+
+        site_pages = {
+            '/': page('Home', ['/g1', '/g2']),
+            '/g1': gallery('/1.png', '/p1'),
+            '/g2': gallery('/2.png', '/p2'),
+            '/p1': page('Photo one'),
+            '/p2': page('Photo two'),
+        }
+        with LocalSite(site_pages) as site:
+            results = crawl(site.url('/'), 2, requests_per_second=1000)
+        self.assertEqual(sorted(urlparse(r['url']).path for r in results), ['/', '/g1', '/g2', '/p1', '/p2'])
+        self.assertTrue(all(r['duplicate_of'] == '' for r in results))
+
+    def test_negative_threshold_disables_detection(self):
+        site_pages = {
+            '/': page('Home', ['/a', '/b']),
+            '/a': page('List', ['/x'], body=ARTICLE),
+            '/b': page('List', ['/y'], body=ARTICLE),
+            '/x': page('X'),
+            '/y': page('Y'),
+        }
+        with LocalSite(site_pages) as site:
+            results = crawl(site.url('/'), 2, requests_per_second=1000, near_duplicate_threshold=-1)
+        self.assertEqual(sorted(urlparse(r['url']).path for r in results), ['/', '/a', '/b', '/x', '/y'])
+        self.assertTrue(all(r['duplicate_of'] == '' for r in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
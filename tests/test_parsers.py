@@ -0,0 +1,114 @@
+"""Tests for analyzing pages with each of the HTML parsers."""
+
+import logging
+import os
+import sys
+import unittest
+from unittest import mock
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import (analyze_link_quality, analyze_page, count_resources, crawl, extract_metadata,  # noqa: E402
+                     extract_page, parse_html, simhash, HTML_PARSERS)
+from local_site import LocalSite, page  # noqa: E402
+
+PAGE = '''<!DOCTYPE html>
+<html><head><title>Fish &amp; Chips</title>
+<meta name="description" content="Fried"><meta name="keywords" content="fish,chips">
+<meta property="og:title" content="OG Fish"><meta property="og:image" content="/og.png">
+<link rel="shortcut  icon" href="/favicon.ico"><link rel="canonical alternate" href="https://a.test/fish">
+<link rel="stylesheet" href="/site.css"><link rel="stylesheet" href="https://cdn.test/x.css">
+<script src="/app.js"></script><style>p { color: red }</style>
+</head><body>
+<p>Golden <b>battered</b> cod&nbsp;with chips</p>
+<a href="/menu" rel="nofollow noopener">Click here</a>
+<a href="https://other.test/"><span>A</span> three word <i>anchor</i></a>
+<a href="mailto:chef@a.test">Mail</a><a>No href</a><a href="">  </a>
+<script>document.write('<a href="/not-a-link">hidden</a>')</script>
+<template><a href="/templated">templated words</a></template>
+<!-- a comment --><ruby>kanji<rt>reading</rt><rp>(</rp></ruby>
+<img src="/cod.jpg"><video src="/fry.mp4"></video>
+<iframe src="https://www.youtube.com/embed/x"></iframe><iframe src="/map"></iframe>
+<audio src="/sizzle.mp3"></audio>
+</body></html>'''
+
+
+def analyze(parser, html=PAGE):
+    result, links = analyze_page(html, 'https://a.test/fish/', 1, len(html), 200, parser=parser)
+    for key in ('crawl_timestamp', 'last_fetched'):
+        del result[key]
+    return result, links
+
+
+class TestParsers(unittest.TestCase):
+
+    def test_html_parser_analysis(self):
+        result, links = analyze('html.parser')
+        self.assertEqual(links, ['https://a.test/menu', 'https://a.test/fish/', 'https://a.test/templated'])
+        self.assertEqual(
+            {key: result[key] for key in ('title', 'meta_description', 'meta_keywords', 'og_title',
+                                          'og_image', 'favicon', 'canonical_url')},
+            {'title': 'Fish & Chips', 'meta_description': 'Fried', 'meta_keywords': 'fish,chips',
+             'og_title': 'OG Fish', 'og_image': '/og.png', 'favicon': 'https://a.test/favicon.ico',
+             'canonical_url': 'https://a.test/fish'}
+        )
+        self.assertEqual(
+            (result['internal_link_count'], result['external_link_count'], result['nofollow_link_count'],
+             result['empty_anchor_text_count'], result['generic_anchor_text_count'],
+             result['keyword_rich_anchor_text_count']),
+            (3, 1, 1, 2, 1, 0)
+        )
+        self.assertEqual(
+            (result['js_files_count'], result['css_files_count'], result['image_count'],
+             result['video_count'], result['audio_count'], result['internal_resources_count'],
+             result['external_resources_count']),
+            (1, 2, 1, 2, 1, 5, 2)
+        )
+        # Script, style, template and ruby annotations are not page text
+        self.assertEqual(
+            parse_html(PAGE, 'html.parser').words(),
+            ['Fish', '&', 'Chips', 'Golden', 'battered', 'cod', 'with', 'chips', 'Click', 'here',
+             'A', 'three', 'word', 'anchor', 'Mail', 'No', 'href', 'kanji']
+        )
+
+    @unittest.skipUnless('lxml' in HTML_PARSERS, 'lxml is not installed')
+    def test_lxml_gives_the_same_results(self):
+        self.assertEqual(analyze('lxml'), analyze('html.parser'))
+
+    @unittest.skipUnless('lxml' in HTML_PARSERS, 'lxml is not installed')
+    def test_lxml_handles_odd_documents(self):
+        for html in ['', '  \n', '<?xml version="1.0" encoding="utf-8"?><title>X</title>',
+                     '<p>unclosed <div><a href="/a">a<a href="/b">b']:
+            with self.subTest(html=html):
+                self.assertEqual(analyze('lxml', html)[1], analyze('html.parser', html)[1])
+        self.assertEqual(analyze('lxml', '<p>no title</p>')[0]['title'], 'No Title')
+        self.assertIsNone(analyze('lxml', '<title></title>')[0]['title'])
+
+    def test_single_pass_matches_the_separate_analyzers(self):
+        odd = ('<title>T</title><a href="/outer">Outer <a href="/inner">inner link text</a> tail</a>'
+               '<a href="javascript:void(0)">js</a><p>x<![CDATA[cdata words]]>y</p>'
+               '<link rel="stylesheet icon" href="/both.woff2"><title>Second</title>'
+               '<a href="/docs"><![CDATA[Read the docs]]></a>')
+        for parser in HTML_PARSERS:
+            for html in (PAGE, odd, ''):
+                with self.subTest(parser=parser, html=html[:30]):
+                    doc = parse_html(html, parser)
+                    url = 'https://a.test/'
+                    words = doc.words()
+                    separate = (extract_metadata(doc, url), analyze_link_quality(doc, url),
+                                count_resources(doc, url), len(words), simhash(words))
+                    self.assertEqual(repr(extract_page(doc, url)), repr(separate))
+
+    def test_crawl_falls_back_to_html_parser(self):
+        with LocalSite({'/': page('Home', ['/a']), '/a': page('A')}) as site:
+            with mock.patch.dict('crawler.HTML_PARSERS', {'html.parser': HTML_PARSERS['html.parser']},
+                                 clear=True), self.assertLogs(level=logging.WARNING) as logs:
+                results = crawl(site.url('/'), 1, requests_per_second=1000, html_parser='lxml')
+        self.assertEqual(sorted(r['title'] for r in results), ['A', 'Home'])
+        self.assertIn('not available', '\n'.join(logs.output))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""Tests for the token-bucket rate limiter, host scheduler and 429 requeueing."""
+
+import logging
+import os
+import sys
+import time
+import unittest
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import (  # noqa: E402
+    crawl, CrawlFrontier, HostScheduler, RateLimiter, MAX_RATE_LIMIT_RETRIES, parse_retry_after,
+)
+from local_site import LocalSite, page  # noqa: E402
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_try_acquire_never_sleeps(self):
+        limiter = RateLimiter(initial_requests_per_second=10)
+        self.assertEqual(limiter.try_acquire('a.test'), 0)
+        start = time.time()
+        wait = limiter.try_acquire('a.test')
+        self.assertLess(time.time() - start, 0.01)
+        self.assertAlmostEqual(wait, 0.1, delta=0.02)
+        # Nothing was taken, so the wait does not grow
+        self.assertAlmostEqual(limiter.try_acquire('a.test'), 0.1, delta=0.02)
+        self.assertEqual(limiter.try_acquire('b.test'), 0)
+
+    def test_burst(self):
+        limiter = RateLimiter(initial_requests_per_second=10, burst=3)
+        self.assertEqual([limiter.try_acquire('a.test') for _ in range(3)], [0, 0, 0])
+        self.assertGreater(limiter.try_acquire('a.test'), 0)
+
+    def test_429_pauses_host(self):
+        limiter = RateLimiter(initial_requests_per_second=10)
+        self.assertEqual(limiter.handle_429('a.test', retry_after=5), 5)
+        self.assertAlmostEqual(limiter.next_eligible('a.test') - time.time(), 5, delta=0.05)
+        self.assertAlmostEqual(limiter.try_acquire('a.test'), 5, delta=0.05)
+        self.assertAlmostEqual(limiter.delays['a.test'], 0.2)
+        # Without Retry-After the doubled delay is the pause
+        self.assertEqual(limiter.handle_429('b.test'), 0.2)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('120'), 120)
+        in_a_minute = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+        self.assertAlmostEqual(parse_retry_after(in_a_minute), 60, delta=2)
+        self.assertEqual(parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0)
+        self.assertEqual(parse_retry_after('999999'), 600)
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+
+
+class TestHostScheduler(unittest.TestCase):
+
+    def test_skips_past_rate_limited_host(self):
+        frontier = CrawlFrontier(max_depth=1)
+        for url in ['https://slow.test/1', 'https://slow.test/2', 'https://slow.test/3',
+                    'https://fast.test/1', 'https://fast.test/2']:
+            frontier.push(url, 1)
+        limiter = RateLimiter(initial_requests_per_second=1000)
+        limiter.delays['slow.test'] = 0.3
+        scheduler = HostScheduler(frontier, limiter)
+
+        taken = [scheduler.take() for _ in range(3)]
+        self.assertEqual([url for url, _ in taken],
+                         ['https://slow.test/1', 'https://fast.test/1', 'https://fast.test/2'])
+        self.assertIsNone(scheduler.take())
+        self.assertEqual(len(scheduler), 2)
+        self.assertAlmostEqual(scheduler.wait_time(), 0.3, delta=0.05)
+
+        # Once the host is eligible its parked URLs come back in order
+        time.sleep(scheduler.wait_time())
+        self.assertEqual(scheduler.take()[0], 'https://slow.test/2')
+        self.assertIsNone(scheduler.take())
+
+    def test_parked_limit(self):
+        frontier = CrawlFrontier(max_depth=1)
+        for i in range(10):
+            frontier.push(f'https://a.test/{i}', 1)
+        limiter = RateLimiter(initial_requests_per_second=0.01)
+        scheduler = HostScheduler(frontier, limiter, max_parked=3)
+        self.assertEqual(scheduler.take()[0], 'https://a.test/0')
+        self.assertIsNone(scheduler.take())
+        self.assertEqual((len(scheduler), len(frontier)), (3, 6))
+
+    def test_exempt_urls_skip_the_limiter(self):
+        frontier = CrawlFrontier(max_depth=1)
+        frontier.push('https://a.test/1', 1)
+        frontier.push('https://a.test/fresh', 1)
+        limiter = RateLimiter(initial_requests_per_second=0.01)
+        scheduler = HostScheduler(frontier, limiter, exempt=lambda url: url.endswith('fresh'))
+        self.assertEqual(scheduler.take()[0], 'https://a.test/1')
+        self.assertEqual(scheduler.take()[0], 'https://a.test/fresh')
+
+
+class TestRateLimitedCrawl(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_429_is_retried_after_retry_after(self):
+        for engine in ('sync', 'async'):
+            attempts = []
+
+            def limited_once(handler):
+                attempts.append(time.time())
+                if len(attempts) == 1:
+                    return 429, {'Retry-After': '1'}, ''
+                return 200, {'Content-Type': 'text/html'}, page('B')
+
+            site_pages = {'/': page('Home', ['/a', '/b']), '/a': page('A'), '/b': limited_once}
+            with self.subTest(engine=engine), LocalSite(site_pages) as site:
+                results = crawl(site.url('/'), 1, requests_per_second=1000, engine=engine)
+                self.assertEqual(sorted(urlparse(r['url']).path for r in results), ['/', '/a', '/b'])
+                self.assertEqual(len(attempts), 2)
+                self.assertGreaterEqual(attempts[1] - attempts[0], 0.95)
+
+    def test_gives_up_after_retry_limit(self):
+        site_pages = {
+            '/': page('Home', ['/a']),
+            '/a': (429, {'Retry-After': '0'}, ''),
+        }
+        with LocalSite(site_pages) as site:
+            results = crawl(site.url('/'), 1, requests_per_second=1000)
+            self.assertEqual(site.hits.count('/a'), MAX_RATE_LIMIT_RETRIES + 1)
+        self.assertEqual(len(results), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
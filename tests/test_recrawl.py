@@ -0,0 +1,182 @@
+"""Tests for conditional re-crawls driven by the validator cache."""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import crawl, ValidatorCache  # noqa: E402
+from local_site import page, LocalSite  # noqa: E402
+
+
+def cached_page(html, etag):
+    """Serve html with an ETag, answering 304 when the client already has it."""
+    def respond(handler):
+        if handler.headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        return 200, {'Content-Type': 'text/html', 'ETag': etag}, html
+    return respond
+
+
+class TestValidatorCache(unittest.TestCase):
+
+    def test_round_trip(self):
+        path = os.path.join(tempfile.mkdtemp(), 'validators.json')
+        cache = ValidatorCache(path)
+        cache.update('https://a.test/', {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2026 00:00:00 GMT'})
+        cache.set_links('https://a.test/', ['https://a.test/b'])
+        cache.save()
+
+        reloaded = ValidatorCache(path)
+        self.assertEqual(reloaded.conditional_headers('https://a.test/'), {
+            'If-None-Match': '"v1"',
+            'If-Modified-Since': 'Mon, 01 Jan 2026 00:00:00 GMT',
+        })
+        self.assertEqual(reloaded.links('https://a.test/'), ['https://a.test/b'])
+        self.assertEqual(reloaded.conditional_headers('https://a.test/other'), {})
+
+    def test_pages_without_validators_are_dropped(self):
+        cache = ValidatorCache(os.path.join(tempfile.mkdtemp(), 'validators.json'))
+        cache.update('https://a.test/', {'ETag': '"v1"'})
+        cache.update('https://a.test/', {})
+        self.assertEqual(cache.entries, {})
+
+
+class RecrawlTestCase(unittest.TestCase):
+    """Crawl a small site whose pages mostly carry ETags, saving each run to data/."""
+
+    incremental = False
+
+    def setUp(self):
+        self.data_dir = os.path.join(tempfile.mkdtemp(), 'data')
+        self.cache_path = os.path.join(self.data_dir, 'validators.json')
+        self.site_pages = {
+            '/': cached_page(page('Home', ['/a', '/b']), '"home-1"'),
+            '/a': cached_page(page('A', ['/c']), '"a-1"'),
+            '/b': page('B'),
+            '/c': cached_page(page('C'), '"c-1"'),
+        }
+
+    def _crawl(self, site, depth=2, **kwargs):
+        results = crawl(site.url('/'), depth, requests_per_second=1000, validator_cache=self.cache_path,
+                        incremental=self.incremental, **kwargs)
+        os.makedirs(self.data_dir, exist_ok=True)
+        with open(os.path.join(self.data_dir, 'results.json'), 'w', encoding='utf-8') as f:
+            json.dump(results, f)
+        return results
+
+
+class TestConditionalRecrawl(RecrawlTestCase):
+
+    def test_unchanged_pages_reuse_previous_rows(self):
+        with LocalSite(self.site_pages) as site:
+            first = self._crawl(site)
+            with self.assertLogs(level=logging.INFO) as logs:
+                second = self._crawl(site)
+            # Every page is requested again, but only /b has to be resent
+            self.assertEqual(sorted(site.hits), sorted(['/', '/a', '/b', '/c'] * 2))
+
+        self.assertTrue(any('Not Modified (304): 3 pages' in line for line in logs.output))
+        self.assertEqual(sorted(r['url'] for r in first), sorted(r['url'] for r in second))
+        by_url = {r['url']: r for r in second}
+        self.assertEqual(by_url[site.url('/a')]['title'], 'A')
+        self.assertEqual(by_url[site.url('/a')]['internal_link_count'], 1)
+
+    def test_changed_page_is_downloaded(self):
+        with LocalSite(self.site_pages) as site:
+            self._crawl(site)
+            self.site_pages['/a'] = cached_page(page('A v2', ['/c']), '"a-2"')
+            second = self._crawl(site)
+
+        by_url = {r['url']: r for r in second}
+        self.assertEqual(by_url[site.url('/a')]['title'], 'A v2')
+
+    def test_reused_rows_are_checked_for_near_duplicates_again(self):
+        article = ' '.join(f'word{i}' for i in range(40))
+        self.site_pages['/a'] = cached_page(page('Article', ['/c'], body=article), '"a-1"')
+        self.site_pages['/b'] = cached_page(page('Article', ['/c'], body=article), '"b-1"')
+        with LocalSite(self.site_pages) as site:
+            first = self._crawl(site)
+            self.site_pages['/a'] = cached_page(page('Changed', ['/c'], body=article[::-1]), '"a-2"')
+            second = self._crawl(site)
+
+        self.assertEqual({r['url']: r for r in first}[site.url('/b')]['duplicate_of'], site.url('/a'))
+        by_url = {r['url']: r for r in second}
+        self.assertTrue(by_url[site.url('/b')]['unchanged'])
+        self.assertEqual(by_url[site.url('/b')]['duplicate_of'], '')
+
+
+class TestIncrementalCrawl(RecrawlTestCase):
+
+    incremental = True
+
+    def test_fresh_pages_are_not_requested(self):
+        with LocalSite(self.site_pages) as site:
+            first = self._crawl(site)
+            hits_after_first = len(site.hits)
+            second = self._crawl(site)
+            self.assertEqual(len(site.hits), hits_after_first)
+
+        self.assertTrue(all(not r['unchanged'] for r in first))
+        self.assertEqual(len(second), 4)
+        self.assertTrue(all(r['unchanged'] for r in second))
+        by_url = {r['url']: r for r in second}
+        self.assertEqual(by_url[site.url('/c')]['last_fetched'],
+                         {r['url']: r for r in first}[site.url('/c')]['last_fetched'])
+
+    def test_stale_pages_are_revalidated_or_refetched(self):
+        with LocalSite(self.site_pages) as site:
+            self._crawl(site)
+            second = self._crawl(site, recrawl_after=0)
+            self.assertEqual(len(site.hits), 8)
+
+        by_url = {r['url']: r for r in second}
+        self.assertTrue(by_url[site.url('/a')]['unchanged'])
+        self.assertFalse(by_url[site.url('/b')]['unchanged'])
+
+    def test_pages_not_reached_are_carried_forward(self):
+        with LocalSite(self.site_pages) as site:
+            self._crawl(site)
+            second = self._crawl(site, max_pages=2, recrawl_after=0)
+
+        self.assertEqual(len(second), 4)
+        carried = [r for r in second if r['url'] in (site.url('/b'), site.url('/c'))]
+        self.assertTrue(all(r['unchanged'] for r in carried))
+
+    def test_pages_too_deep_this_time_are_carried_forward(self):
+        with LocalSite(self.site_pages) as site:
+            self._crawl(site)
+            second = self._crawl(site, depth=1, recrawl_after=0)
+
+        by_url = {r['url']: r for r in second}
+        self.assertEqual(len(by_url), 4)
+        self.assertTrue(by_url[site.url('/c')]['unchanged'])
+
+    def test_pages_found_gone_are_not_carried_forward(self):
+        changes = {
+            'failed': {'/b': (404, {'Content-Type': 'text/html'}, 'gone')},
+            'unlinked': {'/': cached_page(page('Home', ['/a']), '"home-2"')},
+            'disallowed': {'/robots.txt': (200, {'Content-Type': 'text/plain'}, 'User-agent: *\nDisallow: /b')},
+        }
+        for reason, changed in changes.items():
+            with self.subTest(reason=reason):
+                self.setUp()
+                with LocalSite(self.site_pages) as site:
+                    self._crawl(site)
+                    self.site_pages.update(changed)
+                    failed_urls = []
+                    second = self._crawl(site, recrawl_after=0, failed_urls=failed_urls)
+
+                self.assertEqual(sorted(r['url'] for r in second),
+                                 sorted(site.url(path) for path in ('/', '/a', '/c')))
+                self.assertEqual([f['url'] for f in failed_urls], [site.url('/b')] if reason == 'failed' else [])
+
+
+if __name__ == "__main__":
+    unittest.main()
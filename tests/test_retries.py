@@ -0,0 +1,143 @@
+"""Tests for retrying transient failures with backoff and recording failed pages."""
+
+import logging
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+from urllib.parse import urlparse
+
+import requests
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import crawl, is_transient, retry_delay, CrawlFrontier, HostScheduler, RateLimiter  # noqa: E402
+from local_site import LocalSite, page  # noqa: E402
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f'{status} error', response=response)
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_transient_errors(self):
+        self.assertTrue(is_transient(requests.Timeout()))
+        self.assertTrue(is_transient(requests.ConnectionError()))
+        self.assertTrue(is_transient(requests.exceptions.ChunkedEncodingError()))
+        self.assertTrue(is_transient(http_error(502)))
+        self.assertFalse(is_transient(http_error(404)))
+        self.assertFalse(is_transient(requests.TooManyRedirects()))
+        self.assertFalse(is_transient(ValueError()))
+
+    def test_backoff_doubles_with_jitter(self):
+        for attempt, backoff in [(1, 1), (2, 2), (3, 4), (10, 60)]:
+            delays = {retry_delay(attempt) for _ in range(50)}
+            self.assertTrue(all(backoff / 2 <= delay <= backoff for delay in delays), delays)
+            self.assertGreater(len(delays), 1)
+        with mock.patch('crawler.random.uniform', return_value=0):
+            self.assertEqual(retry_delay(3, base=0.5, cap=10), 1)
+
+
+class TestDeferredUrls(unittest.TestCase):
+
+    def test_deferred_url_waits_without_blocking_the_frontier(self):
+        frontier = CrawlFrontier(max_depth=1)
+        frontier.push('https://a.test/2', 1)
+        scheduler = HostScheduler(frontier, RateLimiter(initial_requests_per_second=1000))
+        scheduler.defer('https://a.test/1', 1, 0.2)
+        self.assertEqual(len(scheduler), 1)
+
+        self.assertEqual(scheduler.take()[0], 'https://a.test/2')
+        self.assertIsNone(scheduler.take())
+        self.assertTrue(scheduler)
+        self.assertAlmostEqual(scheduler.wait_time(), 0.2, delta=0.05)
+        self.assertEqual(scheduler.parked_urls(), [('https://a.test/1', 1)])
+
+        time.sleep(scheduler.wait_time())
+        self.assertEqual(scheduler.take()[0], 'https://a.test/1')
+        self.assertFalse(scheduler)
+
+
+class TestRetriedCrawl(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_flaky_pages_are_retried_and_final_failures_recorded(self):
+        for engine in ('sync', 'async'):
+            attempts = []
+
+            def flaky(handler):
+                attempts.append(time.time())
+                if len(attempts) <= 2:
+                    return 500, {'Content-Type': 'text/html'}, 'try again'
+                return 200, {'Content-Type': 'text/html'}, page('Flaky')
+
+            site_pages = {
+                '/': page('Home', ['/flaky', '/down', '/missing', '/ok']),
+                '/flaky': flaky,
+                '/down': (503, {'Content-Type': 'text/html'}, 'down'),
+                '/ok': page('OK'),
+            }
+            failed = []
+            with self.subTest(engine=engine), LocalSite(site_pages) as site:
+                results = crawl(site.url('/'), 1, requests_per_second=1000, engine=engine,
+                                max_retries=2, retry_base_delay=0.1, failed_urls=failed)
+                self.assertEqual(sorted(urlparse(r['url']).path for r in results), ['/', '/flaky', '/ok'])
+                self.assertGreaterEqual(attempts[2] - attempts[1], 0.1)
+                self.assertEqual(site.hits.count('/down'), 3)
+                self.assertEqual(site.hits.count('/missing'), 1)
+                # The failing page did not hold up the rest of the crawl
+                flaky_hits = [i for i, path in enumerate(site.hits) if path == '/flaky']
+                self.assertLess(site.hits.index('/ok'), flaky_hits[1])
+
+                by_path = {urlparse(f['url']).path: f for f in failed}
+                self.assertEqual(sorted(by_path), ['/down', '/missing'])
+                self.assertEqual((by_path['/down']['error'], by_path['/down']['status_code'],
+                                  by_path['/down']['attempts']), ('HTTPError', 503, 3))
+                self.assertEqual((by_path['/missing']['status_code'], by_path['/missing']['attempts']),
+                                 (404, 1))
+
+    def test_timeouts_are_retried(self):
+        calls = []
+
+        def slow_once(handler):
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.5)
+            return 200, {'Content-Type': 'text/html'}, page('Slow')
+
+        site_pages = {'/': page('Home', ['/slow']), '/slow': slow_once}
+        failed = []
+        with LocalSite(site_pages) as site:
+            results = crawl(site.url('/'), 1, timeout=0.2, requests_per_second=1000,
+                            retry_base_delay=0.05, failed_urls=failed)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(failed, [])
+
+    def test_retries_do_not_use_up_the_page_budget(self):
+        site_pages = {
+            '/': page('Home', ['/down', '/a', '/b']),
+            '/down': (500, {}, ''),
+            '/a': page('A'),
+            '/b': page('B'),
+        }
+        failed = []
+        with LocalSite(site_pages) as site:
+            results = crawl(site.url('/'), 1, max_pages=4, requests_per_second=1000,
+                            retry_base_delay=0.01, failed_urls=failed)
+        self.assertEqual(len(results), 3)
+        self.assertEqual([f['attempts'] for f in failed], [4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+"""Tests for robots.txt parsing, caching and enforcement during crawls."""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import unittest
+from urllib.parse import urlparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import crawl, RateLimiter, RobotsCache, RobotsRules  # noqa: E402
+from local_site import LocalSite, page  # noqa: E402
+
+ROBOTS = """\
+# Comments and unknown fields are ignored
+User-agent: SomeOtherBot
+Disallow: /
+
+User-agent: *
+Disallow: /private
+Allow: /private/open
+Disallow: /*.pdf$
+Disallow: /search?
+Crawl-delay: 0.25
+
+Sitemap: https://a.test/sitemap.xml
+"""
+
+
+class TestRobotsRules(unittest.TestCase):
+
+    def test_longest_match_wins(self):
+        rules = RobotsRules.parse(ROBOTS)
+        self.assertTrue(rules.allowed('/'))
+        self.assertFalse(rules.allowed('/private'))
+        self.assertFalse(rules.allowed('/private/closed'))
+        self.assertTrue(rules.allowed('/private/open/page'))
+        self.assertFalse(rules.allowed('/privateer'))
+        self.assertFalse(rules.allowed('/search?q=x'))
+        self.assertTrue(rules.allowed('/search'))
+
+    def test_wildcards_and_end_anchor(self):
+        rules = RobotsRules.parse(ROBOTS)
+        self.assertFalse(rules.allowed('/docs/report.pdf'))
+        self.assertTrue(rules.allowed('/docs/report.pdf?download=1'))
+        self.assertTrue(rules.allowed('/docs/report.pdfx'))
+
+    def test_allow_wins_ties(self):
+        rules = RobotsRules([(False, '/page'), (True, '/page'), (False, '/p*e'), (True, '/p*e')])
+        self.assertTrue(rules.allowed('/page'))
+        self.assertTrue(rules.allowed('/pie'))
+
+    def test_group_selection(self):
+        self.assertFalse(RobotsRules.parse(ROBOTS, user_agent='SomeOtherBot').allowed('/'))
+        rules = RobotsRules.parse(ROBOTS)
+        self.assertEqual(rules.crawl_delay, 0.25)
+        self.assertEqual(rules.sitemaps, ['https://a.test/sitemap.xml'])
+
+    def test_shared_group_and_empty_disallow(self):
+        rules = RobotsRules.parse("User-agent: a\nUser-agent: PagesXcrawler/2.0\nDisallow:\n")
+        self.assertTrue(rules.allowed('/anything'))
+        self.assertTrue(RobotsRules.parse('').allowed('/anything'))
+
+
+class TestRobotsCache(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'robots.json')
+        self.fetched = []
+
+    def fetch(self, response):
+        def fetch(url):
+            self.fetched.append(url)
+            return response
+        return fetch
+
+    def test_fetches_each_host_once(self):
+        cache = RobotsCache(self.fetch((200, ROBOTS)), self.path)
+        self.assertFalse(cache.allowed('https://a.test/private/x'))
+        self.assertTrue(cache.allowed('https://a.test/public'))
+        self.assertFalse(cache.allowed('https://a.test/search?q=1'))
+        self.assertFalse(cache.allowed('https://b.test/private/x'))
+        self.assertEqual(self.fetched, ['https://a.test/robots.txt', 'https://b.test/robots.txt'])
+
+    def test_disk_cache_respects_ttl(self):
+        cache = RobotsCache(self.fetch((200, ROBOTS)), self.path, ttl=1)
+        cache.rules('https://a.test/')
+        cache.save()
+
+        RobotsCache(self.fetch((200, ROBOTS)), self.path, ttl=1).rules('https://a.test/')
+        self.assertEqual(len(self.fetched), 1)
+
+        with open(self.path) as f:
+            entries = json.load(f)
+        entries['https://a.test']['fetched'] = time.time() - 7200
+        with open(self.path, 'w') as f:
+            json.dump(entries, f)
+        RobotsCache(self.fetch((200, ROBOTS)), self.path, ttl=1).rules('https://a.test/')
+        self.assertEqual(len(self.fetched), 2)
+
+    def test_missing_and_unreachable_robots(self):
+        self.assertTrue(RobotsCache(self.fetch((404, ''))).allowed('https://a.test/x'))
+
+        cache = RobotsCache(self.fetch((503, '')), self.path)
+        self.assertFalse(cache.allowed('https://a.test/x'))
+        cache.save()
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {})
+
+
+class TestRobotsCrawl(unittest.TestCase):
+
+    SITE = {
+        '/robots.txt': (200, {'Content-Type': 'text/plain'},
+                        'User-agent: *\nDisallow: /private\nCrawl-delay: 0.2\n'),
+        '/': page('Home', ['/a', '/private/secret', '/private']),
+        '/a': page('A', ['/private/other']),
+        '/private': page('Private'),
+        '/private/secret': page('Secret'),
+        '/private/other': page('Other'),
+    }
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_disallowed_urls_are_never_requested(self):
+        for engine in ('sync', 'async'):
+            with self.subTest(engine=engine), LocalSite(self.SITE) as site:
+                results = crawl(site.url('/'), 2, requests_per_second=1000, engine=engine)
+                self.assertEqual(sorted(urlparse(r['url']).path for r in results), ['/', '/a'])
+                self.assertEqual(sorted(site.hits), ['/', '/a'])
+                self.assertEqual(site.robots_hits, 1)
+
+    def test_crawl_delay_sets_rate_limit_floor(self):
+        limiter = RateLimiter(initial_requests_per_second=1000)
+        limiter.set_min_delay('a.test', 0.2)
+        self.assertEqual(limiter.delays['a.test'], 0.2)
+        limiter.handle_success('a.test')
+        self.assertEqual(limiter.delays['a.test'], 0.2)
+        limiter.handle_429('a.test')
+        self.assertEqual(limiter.delays['a.test'], 0.4)
+
+        with LocalSite(self.SITE) as site:
+            start = time.time()
+            crawl(site.url('/'), 2, requests_per_second=1000)
+            self.assertGreaterEqual(time.time() - start, 0.2)
+
+    def test_only_the_start_of_a_huge_robots_txt_is_read(self):
+        sent = []
+
+        def huge_robots(handler):
+            def body():
+                yield 'User-agent: *\nDisallow: /private\n'
+                # 64 MB of comments, far past ROBOTS_MAX_SIZE
+                for _ in range(1024):
+                    sent.append(1)
+                    yield '#' * (64 * 1024 - 1) + '\n'
+            return 200, {'Content-Type': 'text/plain'}, body()
+
+        with LocalSite({**self.SITE, '/robots.txt': huge_robots}) as site:
+            results = crawl(site.url('/'), 2, requests_per_second=1000)
+        self.assertEqual(sorted(urlparse(r['url']).path for r in results), ['/', '/a'])
+        self.assertLess(len(sent), 1024)
+
+    def test_ignore_robots(self):
+        with LocalSite(self.SITE) as site:
+            results = crawl(site.url('/'), 2, requests_per_second=1000, robots_txt=False)
+        self.assertEqual(len(results), 5)
+        self.assertEqual(site.robots_hits, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
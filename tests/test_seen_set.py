@@ -0,0 +1,60 @@
+"""Tests for the compact seen-set implementations."""
+
+import os
+import sys
+import unittest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import crawl, BloomFilter, FingerprintSet, create_seen_set  # noqa: E402
+from local_site import LocalSite, page  # noqa: E402
+
+
+class TestFingerprintSet(unittest.TestCase):
+
+    def test_membership_survives_growth(self):
+        seen = FingerprintSet(capacity=4)
+        urls = [f'https://a.test/{i}' for i in range(5000)]
+        for url in urls:
+            seen.add(url)
+        seen.add(urls[0])
+        self.assertEqual(len(seen), 5000)
+        self.assertTrue(all(url in seen for url in urls))
+        self.assertFalse(any(f'https://b.test/{i}' in seen for i in range(5000)))
+        self.assertLessEqual(len(seen.table), 4 * len(seen))
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        bloom = BloomFilter(capacity=20000, error_rate=0.01)
+        for i in range(20000):
+            bloom.add(f'https://a.test/{i}')
+        self.assertTrue(all(f'https://a.test/{i}' in bloom for i in range(20000)))
+        false_positives = sum(f'https://b.test/{i}' in bloom for i in range(20000))
+        self.assertLess(false_positives / 20000, 0.02)
+
+
+class TestSeenSetCrawl(unittest.TestCase):
+
+    def test_compact_seen_sets_crawl_the_same_pages(self):
+        site_pages = {
+            '/': page('Home', ['/a', '/b']),
+            '/a': page('A', ['/', '/b', '/c']),
+            '/b': page('B', ['/a']),
+            '/c': page('C'),
+        }
+        for kind in ['fingerprint', 'bloom']:
+            with self.subTest(kind=kind), LocalSite(site_pages) as site:
+                results = crawl(site.url('/'), 3, requests_per_second=1000, seen_set=kind)
+                self.assertEqual(sorted(site.hits), ['/', '/a', '/b', '/c'])
+                self.assertEqual(len(results), 4)
+
+    def test_create_seen_set_defaults_to_plain_set(self):
+        self.assertIsInstance(create_seen_set(), set)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+"""Tests for host-sharded crawls over worker processes sharing a SQLite store."""
+
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from collections import Counter
+from urllib.parse import urlparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import crawl_sharded, shard_for, ShardStore  # noqa: E402
+from local_site import LocalSite, page  # noqa: E402
+
+
+def seed(url, depth=1, max_pages=10):
+    return {'url': url, 'depth': depth, 'max_pages': max_pages, 'weight': 1}
+
+
+class TestShardFor(unittest.TestCase):
+
+    def test_hosts_stay_on_one_shard(self):
+        self.assertEqual(shard_for('https://a.test/', 4), shard_for('https://a.test/x?y=1', 4))
+        self.assertEqual(shard_for('https://a.test/', 1), 0)
+
+    def test_hosts_spread_evenly(self):
+        counts = Counter(shard_for(f'https://host{i}.test/', 4) for i in range(400))
+        self.assertEqual(sorted(counts), [0, 1, 2, 3])
+        self.assertGreater(min(counts.values()), 70)
+
+
+class TestShardStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = ShardStore(os.path.join(tempfile.mkdtemp(), 'shards.sqlite3'))
+        self.addCleanup(self.store.close)
+
+    def test_claim_finish_collect(self):
+        urls = [f'https://host{i}.test/' for i in range(6)]
+        self.store.create([seed(url) for url in urls], 2, {'timeout': 5})
+        self.assertEqual(self.store.shards, 2)
+        self.assertEqual(self.store.options, {'timeout': 5})
+
+        claimed = []
+        for shard in (0, 1):
+            while (item := self.store.claim(shard)) is not None:
+                self.assertEqual(shard_for(item['url'], 2), shard)
+                claimed.append(item)
+        self.assertEqual(sorted(item['url'] for item in claimed), sorted(urls))
+        self.assertEqual(self.store.progress(), {'claimed': 6})
+
+        for item in reversed(claimed):
+            self.store.finish(item['id'], [{'url': item['url']}], [{'url': item['url'] + 'gone'}])
+        results, failed = self.store.collect()
+        self.assertEqual([row['url'] for row in results], urls)
+        self.assertEqual(len(failed), 6)
+        self.assertEqual(self.store.progress(), {'done': 6})
+
+    def test_restarted_worker_takes_back_its_claims(self):
+        self.store.create([seed('https://a.test/'), seed('https://b.test/')], 1, {})
+        first = self.store.claim(0)
+        self.store.claim(0)
+        self.assertIsNone(self.store.claim(0))
+        self.store.finish(first['id'], [], [])
+
+        self.store.release_claims(0)
+        self.assertEqual(self.store.claim(0)['url'], 'https://b.test/')
+        self.assertEqual(self.store.progress(), {'done': 1, 'claimed': 1})
+
+    def test_create_replaces_the_last_crawl(self):
+        self.store.create([seed('https://a.test/')], 1, {})
+        self.store.finish(self.store.claim(0)['id'], [{'url': 'https://a.test/'}], [])
+        self.store.create([seed('https://b.test/')], 1, {})
+        self.assertEqual(self.store.collect(), ([], []))
+        self.assertEqual(self.store.progress(), {'queued': 1})
+
+
+class TestShardedCrawl(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_worker_processes_crawl_every_seed_once(self):
+        pages = {'/': page('Home', ['/a', '/b', '/gone']), '/a': page('A'), '/b': page('B')}
+        sites = [LocalSite(dict(pages)) for _ in range(4)]
+        for site in sites:
+            site.__enter__()
+            self.addCleanup(site.__exit__)
+
+        failed = []
+        store_path = os.path.join(tempfile.mkdtemp(), 'shards.sqlite3')
+        results = crawl_sharded([seed(site.url('/')) for site in sites], 2, store_path,
+                                poll_interval=0.1, failed_urls=failed, requests_per_second=1000)
+
+        self.assertEqual(len(results), 12)
+        for site in sites:
+            self.assertEqual(sorted(site.hits), ['/', '/a', '/b', '/gone'])
+            rows = [r for r in results if r['seed'] == site.url('/')]
+            self.assertEqual(sorted(urlparse(r['url']).path for r in rows), ['/', '/a', '/b'])
+        self.assertEqual(sorted((urlparse(f['url']).path, f['status_code']) for f in failed), [('/gone', 404)] * 4)
+
+        store = ShardStore(store_path)
+        self.addCleanup(store.close)
+        self.assertEqual(store.progress(), {'done': 4})
+
+
+if __name__ == '__main__':
+    unittest.main()
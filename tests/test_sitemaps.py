@@ -0,0 +1,172 @@
+"""Tests for sitemap parsing and sitemap-seeded crawls."""
+
+import gzip
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import crawl, iter_sitemap, parse_lastmod  # noqa: E402
+from local_site import LocalSite, page  # noqa: E402
+from test_recrawl import cached_page  # noqa: E402
+
+
+def urlset(*entries):
+    """Build a sitemap from (loc, lastmod) pairs; lastmod may be None."""
+    items = ''.join(
+        f'<url><loc>{loc}</loc>{f"<lastmod>{lastmod}</lastmod>" if lastmod else ""}</url>'
+        for loc, lastmod in entries
+    )
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{items}</urlset>')
+
+
+def sitemap_index(*locs):
+    items = ''.join(f'<sitemap><loc>{loc}</loc></sitemap>' for loc in locs)
+    return f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{items}</sitemapindex>'
+
+
+def xml(body):
+    return 200, {'Content-Type': 'application/xml'}, body
+
+
+class TestSitemapParsing(unittest.TestCase):
+
+    def test_urlset_and_index(self):
+        entries = list(iter_sitemap(io.BytesIO(urlset(
+            ('https://a.test/x', '2026-01-02'), ('https://a.test/y', None)).encode())))
+        self.assertEqual(entries, [
+            ('url', 'https://a.test/x', datetime(2026, 1, 2)),
+            ('url', 'https://a.test/y', None),
+        ])
+        index = io.BytesIO(sitemap_index('https://a.test/s1.xml.gz').encode())
+        self.assertEqual(list(iter_sitemap(index)), [('sitemap', 'https://a.test/s1.xml.gz', None)])
+
+    def test_large_sitemap_streams(self):
+        def chunks():
+            yield b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            for i in range(50000):
+                yield f'<url><loc>https://a.test/p{i}</loc></url>'.encode()
+            yield b'</urlset>'
+
+        class Stream:
+            """A body that only exists one small read at a time."""
+            parts = chunks()
+
+            def read(self, size):
+                return next(self.parts, b'')
+
+        entries = iter_sitemap(Stream())
+        self.assertEqual(next(entries)[1], 'https://a.test/p0')
+        self.assertEqual(sum(1 for _ in entries), 49999)
+
+    def test_parse_lastmod(self):
+        self.assertEqual(parse_lastmod('2026-03'), datetime(2026, 3, 1))
+        self.assertEqual(parse_lastmod('2026'), datetime(2026, 1, 1))
+        self.assertEqual(parse_lastmod('2026-03-04T05:06:07Z'),
+                         datetime(2026, 3, 4, 5, 6, 7, tzinfo=timezone.utc).astimezone().replace(tzinfo=None))
+        self.assertIsNone(parse_lastmod('yesterday'))
+        self.assertIsNone(parse_lastmod(None))
+
+
+class TestSitemapSeeding(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def _paths(self, results):
+        return sorted(urlparse(r['url']).path for r in results)
+
+    def test_seeds_orphan_pages_from_well_known_sitemap(self):
+        pages = {
+            '/': page('Home', ['/a']),
+            '/a': page('A'),
+            '/deep/orphan': page('Orphan'),
+        }
+        with LocalSite(pages) as site:
+            pages['/sitemap.xml'] = xml(urlset(
+                (site.url('/deep/orphan'), None), (site.url('/a'), None),
+                ('https://elsewhere.test/page', None)))
+            results = crawl(site.url('/'), 1, requests_per_second=1000, sitemaps=True)
+        self.assertEqual(self._paths(results), ['/', '/a', '/deep/orphan'])
+        depths = {urlparse(r['url']).path: r['depth'] for r in results}
+        self.assertEqual(depths['/deep/orphan'], 1)
+
+    def test_robots_index_and_gzip(self):
+        pages = {
+            '/': page('Home'),
+            '/one': page('One'),
+            '/two': page('Two'),
+        }
+        with LocalSite(pages) as site:
+            pages['/robots.txt'] = (200, {}, f'Sitemap: {site.url("/maps/index.xml")}\n')
+            pages['/maps/index.xml'] = xml(sitemap_index(site.url('/maps/a.xml.gz'), site.url('/maps/b.xml')))
+            pages['/maps/a.xml.gz'] = (200, {'Content-Type': 'application/gzip'},
+                                       gzip.compress(urlset((site.url('/one'), None)).encode()))
+            pages['/maps/b.xml'] = xml(urlset((site.url('/two'), None)))
+            results = crawl(site.url('/'), 1, requests_per_second=1000, sitemaps=True)
+            self.assertNotIn('/sitemap.xml', site.hits)
+        self.assertEqual(self._paths(results), ['/', '/one', '/two'])
+
+    def test_stops_reading_at_page_budget(self):
+        pages = {'/': page('Home')}
+        with LocalSite(pages) as site:
+            pages['/sitemap.xml'] = xml(urlset(*[(site.url(f'/p{i}'), None) for i in range(1000)]))
+            for i in range(1000):
+                pages[f'/p{i}'] = page(f'P{i}')
+            results = crawl(site.url('/'), 1, max_pages=5, requests_per_second=1000, sitemaps=True)
+        self.assertEqual(len(results), 5)
+
+
+class TestSitemapLastmod(unittest.TestCase):
+    """An incremental crawl trusts <lastmod> over the recrawl_after window."""
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.data_dir = os.path.join(tempfile.mkdtemp(), 'data')
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def _crawl(self, site, **kwargs):
+        results = crawl(site.url('/'), 1, requests_per_second=1000, sitemaps=True, incremental=True,
+                        validator_cache=os.path.join(self.data_dir, 'validators.json'), **kwargs)
+        os.makedirs(self.data_dir, exist_ok=True)
+        with open(os.path.join(self.data_dir, 'results.json'), 'w', encoding='utf-8') as f:
+            json.dump(results, f)
+        return results
+
+    def test_lastmod_decides_what_is_fetched(self):
+        pages = {
+            '/': cached_page(page('Home'), '"home"'),
+            '/old': cached_page(page('Old'), '"old"'),
+            '/new': cached_page(page('New'), '"new"'),
+        }
+        past = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+        with LocalSite(pages) as site:
+            pages['/sitemap.xml'] = xml(urlset((site.url('/old'), past), (site.url('/new'), past)))
+            self._crawl(site)
+            self.assertEqual(sorted(site.hits), ['/', '/new', '/old', '/sitemap.xml'])
+
+            future = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+            pages['/sitemap.xml'] = xml(urlset((site.url('/old'), past), (site.url('/new'), future)))
+            del site.hits[:]
+            # recrawl_after=0 would revalidate everything; the sitemap overrides it
+            self._crawl(site, recrawl_after=0)
+            self.assertEqual(sorted(site.hits), ['/', '/new', '/sitemap.xml'])
+
+
+if __name__ == '__main__':
+    unittest.main()
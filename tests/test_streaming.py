@@ -0,0 +1,142 @@
+"""Tests for analyzing pages while they download."""
+
+import logging
+import os
+import sys
+import time
+import unittest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from crawler import analyze_link_quality, crawl, extract_page, parse_html, StreamingExtractor  # noqa: E402
+from local_site import LocalSite, page  # noqa: E402
+from test_parsers import PAGE  # noqa: E402
+
+URL = 'https://a.test/fish/'
+
+ODD_PAGES = [
+    PAGE,
+    '',
+    '<title><!-- note -->Café &amp; bar</title><p>Fish &notanentity; &#150; &#0; &#x41;</p>',
+    '<title><b>Bold</b></title><div/>x<a href="/d"/>y</a><br></br>z</p><a href="/x" href="/y">dup</a>',
+    '<a href="/outer">Outer <a href="/inner">inner link text</a> tail</a><p>x<![CDATA[cdata words]]>y',
+    '<TITLE>Unclosed <A HREF="/u">upper case anchor',
+    '<a href="/docs"><![CDATA[Read the docs]]></a><a href="/empty"><![CDATA[ ]]></a>',
+]
+
+
+def streamed(html, chunk_size, encoding='utf-8'):
+    extractor = StreamingExtractor(URL, encoding)
+    data = html.encode(encoding)
+    for i in range(0, len(data), chunk_size):
+        extractor.feed_bytes(data[i:i + chunk_size])
+    extractor.close()
+    return extractor
+
+
+def without_timestamps(results):
+    return sorted(({key: value for key, value in result.items()
+                    if key not in ('crawl_timestamp', 'last_fetched')} for result in results),
+                  key=lambda result: result['url'])
+
+
+class TestStreamingExtractor(unittest.TestCase):
+
+    def test_matches_html_parser_whatever_the_chunks(self):
+        for html in ODD_PAGES:
+            expected = repr(extract_page(parse_html(html, 'html.parser'), URL))
+            for chunk_size in (1, 7, len(html) + 1):
+                with self.subTest(html=html[:30], chunk_size=chunk_size):
+                    self.assertEqual(repr(streamed(html, chunk_size).extracted), expected)
+
+    def test_cdata_counts_as_anchor_text(self):
+        html = '<a href="/docs"><![CDATA[Read the docs]]></a><a href="/empty"><![CDATA[ ]]></a>'
+        expected = analyze_link_quality(parse_html(html, 'html.parser'), URL)
+        self.assertEqual(expected['empty_anchor_text_count'], 1)
+        self.assertEqual(repr(streamed(html, 5).extracted[1]), repr(expected))
+
+    def test_hands_out_each_internal_link_once(self):
+        chunks = [b'<a href="/a">a</a><a href="https://other.test/">o</a><a hr', b'ef="/b">b</a>']
+        extractor = StreamingExtractor(URL)
+        extractor.feed_bytes(chunks[0])
+        self.assertEqual(extractor.new_links(), ['https://a.test/a'])
+        self.assertEqual(extractor.new_links(), [])
+        extractor.feed_bytes(chunks[1])
+        self.assertEqual(extractor.new_links(), ['https://a.test/b'])
+        extractor.close()
+        self.assertEqual(extractor.published, 2)
+        self.assertEqual(extractor.size, sum(len(chunk) for chunk in chunks))
+
+    def test_decodes_split_characters(self):
+        html = '<title>Ångström</title><p>日本語</p>'
+        for encoding in ('utf-8', 'utf-16'):
+            with self.subTest(encoding=encoding):
+                extractor = streamed(html, 1, encoding)
+                self.assertEqual(extractor.extracted[0]['title'], 'Ångström')
+                self.assertEqual(extractor.extracted[3], 2)
+
+    def test_unknown_charset_is_read_as_utf8(self):
+        extractor = StreamingExtractor(URL, 'foo-8')
+        extractor.feed_bytes('<title>Café</title><a href="/a">a</a>'.encode('utf-8'))
+        self.assertEqual(extractor.new_links(), ['https://a.test/a'])
+        extractor.close()
+        self.assertEqual(extractor.extracted[0]['title'], 'Café')
+
+
+class TestStreamParse(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_results_match_parsing_after_download(self):
+        site_pages = {'/': page('Home', ['/a', '/b']), '/a': page('A', ['/c']), '/b': PAGE,
+                      '/c': page('C', ['/'])}
+        for engine in ('sync', 'async'):
+            with self.subTest(engine=engine), LocalSite(site_pages) as site:
+                expected = crawl(site.url('/'), 2, requests_per_second=1000, engine=engine,
+                                 html_parser='html.parser')
+                hits = list(site.hits)
+                results = crawl(site.url('/'), 2, requests_per_second=1000, engine=engine,
+                                stream_parse=True)
+                self.assertEqual(without_timestamps(results), without_timestamps(expected))
+                self.assertEqual(sorted(site.hits[len(hits):]), sorted(hits))
+
+    def test_links_are_fetched_before_the_page_finishes(self):
+        chunks = ['<html><head><title>Home</title></head><body><a href="/a">A</a>',
+                  '<p>' + 'padding ' * 10000 + '</p><a href="/b">B</a></body></html>']
+        fetched_early = []
+
+        def slow_home(handler):
+            def body():
+                yield chunks[0]
+                deadline = time.time() + 2
+                while '/a' not in site.hits and time.time() < deadline:
+                    time.sleep(0.01)
+                fetched_early.append('/a' in site.hits)
+                yield chunks[1]
+            return 200, {'Content-Type': 'text/html; charset=utf-8'}, body()
+
+        with LocalSite({'/': slow_home, '/a': page('A'), '/b': page('B')}) as site:
+            results = crawl(site.url('/'), 1, requests_per_second=1000, engine='async',
+                            per_host_concurrency=2, stream_parse=True)
+        self.assertEqual(fetched_early, [True])
+        self.assertEqual(sorted(r['title'] for r in results), ['A', 'B', 'Home'])
+        home = next(r for r in results if r['title'] == 'Home')
+        self.assertEqual(home['internal_link_count'], 2)
+        self.assertEqual(home['content_size'], len(''.join(chunks)))
+
+    def test_oversized_pages_are_skipped(self):
+        with LocalSite({'/': page('Home', ['/big']), '/big': page('Big', body='x' * 5000)}) as site:
+            results = crawl(site.url('/'), 1, requests_per_second=1000, max_body_size=1000,
+                            stream_parse=True)
+        self.assertEqual([r['title'] for r in results], ['Home'])
+        self.assertEqual(site.hits, ['/', '/big'])
+
+
+if __name__ == '__main__':
+    unittest.main()
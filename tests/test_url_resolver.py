@@ -0,0 +1,59 @@
+"""Tests for the memoized URL resolution shared by the page analyzers."""
+
+import os
+import sys
+import unittest
+from urllib.parse import urljoin, urlparse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from crawler import is_valid_url, UrlResolver  # noqa: E402
+
+BASES = ['https://a.test/', 'https://a.test/dir/page?x=1#top', 'https://a.test/dir/sub/',
+         'http://a.test/dir/', 'https://b.test:8443/x/y']
+HREFS = ['/', '/x', '//c.test/y', 'x', '../x', '?q', '#f', '', '  /x ', 'HTTP:foo', 'https:bar',
+         'http://a.test/z', 'HTTPS://A.TEST/z', 'mailto:x@a.test', 'javascript:void(0)',
+         'localhost:8080/x', '/\t/evil.test/x', 'ftp://f.test/a']
+
+
+def expected(base, href):
+    url = urljoin(base, href)
+    host = urlparse(url).netloc
+    return url, host, is_valid_url(url), host == urlparse(base).netloc
+
+
+class TestUrlResolver(unittest.TestCase):
+
+    def test_answers_match_resolving_every_time(self):
+        resolver = UrlResolver(capacity=10)
+        for base in BASES:
+            for href in HREFS:
+                with self.subTest(base=base, href=href):
+                    # The second time from the cache
+                    self.assertEqual(resolver.resolve(base, href), expected(base, href))
+                    self.assertEqual(resolver.resolve(base, href), expected(base, href))
+        self.assertGreaterEqual(resolver.hits, len(BASES) * len(HREFS))
+        self.assertEqual(len(resolver.entries), 10)
+
+    def test_site_wide_links_are_shared_between_pages(self):
+        resolver = UrlResolver()
+        pages = [f'https://a.test/section/page{i}' for i in range(10)]
+        for page in pages:
+            for href in ('/about', 'https://cdn.test/app.js', 'mailto:hi@a.test', 'next'):
+                resolver.resolve(page, href)
+        # Only the path-relative link needs an entry per page
+        self.assertEqual(len(resolver.entries), 3 + len(pages))
+        self.assertEqual(resolver.hits, 3 * (len(pages) - 1))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        resolver = UrlResolver(capacity=2)
+        resolver.resolve('https://a.test/', '/a')
+        resolver.resolve('https://a.test/', '/b')
+        resolver.resolve('https://a.test/', '/a')
+        resolver.resolve('https://a.test/', '/c')
+        self.assertEqual([href for _, href in resolver.entries], ['/a', '/c'])
+
+
+if __name__ == '__main__':
+    unittest.main()